@@ -0,0 +1,125 @@
+"""Compare combiner speed and speaker-label stability on a synthetic meeting.
+
+Builds a reference conversation, a Whisper-like transcript (segments of a few
+seconds that sometimes run across a speaker change) and a noisy diarization of it:
+turn boundaries are jittered and short spurious turns of other speakers are
+inserted, as pyannote does on crosstalk and backchannels. Every combiner is run on
+the same input and reported with its runtime, the share of transcript time given
+to the right speaker, and speaker changes per minute next to the reference.
+Combiners whose dependencies are missing (e.g. sentence-transformers) are skipped.
+
+Usage:
+    python benchmarks/combiners.py [--minutes 60] [--speakers 4] [--spurious 0.5] [--methods simple,viterbi]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+
+from utils.result_combiner import COMBINER_MODULES, get_combiner
+
+
+def synthetic_meeting(minutes, speakers, spurious, seed=0):
+    """Return (reference turns, transcript, diarization) for a synthetic meeting."""
+    rng = random.Random(seed)
+    duration = minutes * 60
+    reference = []
+    start = 0.0
+    speaker = 0
+    while start < duration:
+        end = min(duration, start + rng.expovariate(1 / 12.0) + 1.0)
+        reference.append({'start': start, 'end': end, 'speaker': f"SPEAKER_{speaker:02d}"})
+        speaker = (speaker + rng.randrange(1, speakers)) % speakers
+        # Short pauses between turns
+        start = end + rng.uniform(0.0, 0.8)
+
+    transcript = []
+    for turn in reference:
+        t = turn['start']
+        while t < turn['end'] - 0.3:
+            # Whisper segments occasionally run past the end of a turn
+            end = min(t + rng.uniform(2.0, 7.0), turn['end'] + (rng.uniform(0, 1.5) if rng.random() < 0.2 else 0))
+            # Whisper timestamps are themselves a little off
+            jitter = rng.gauss(0, 0.2)
+            transcript.append({'start': max(0.0, t + jitter), 'end': end + jitter, 'text': f"words {len(transcript)}"})
+            t = end
+
+    diarization = []
+    for turn in reference:
+        start = max(0.0, turn['start'] + rng.gauss(0, 0.3))
+        end = max(start + 0.2, turn['end'] + rng.gauss(0, 0.3))
+        t = start
+        # Spurious turns arrive as a Poisson process along the turn
+        blip = t + rng.expovariate(spurious / 10) if spurious > 0 else end
+        while blip < end:
+            # Split the turn around a short turn of another speaker
+            length = rng.uniform(0.2, 2.0)
+            other = f"SPEAKER_{rng.choice([s for s in range(speakers) if f'SPEAKER_{s:02d}' != turn['speaker']]):02d}"
+            diarization.append({'start': t, 'end': blip, 'speaker': turn['speaker']})
+            diarization.append({'start': blip, 'end': min(end, blip + length), 'speaker': other})
+            t = min(end, blip + length)
+            blip = t + rng.expovariate(spurious / 10)
+        diarization.append({'start': t, 'end': end, 'speaker': turn['speaker']})
+    diarization = [d for d in diarization if d['end'] > d['start']]
+    diarization.sort(key=lambda d: d['start'])
+    return reference, transcript, diarization
+
+
+def reference_speaker(segment, reference):
+    best, best_overlap = None, 0.0
+    for turn in reference:
+        overlap = min(segment['end'], turn['end']) - max(segment['start'], turn['start'])
+        if overlap > best_overlap:
+            best, best_overlap = turn['speaker'], overlap
+    return best
+
+
+def score(combined, reference, minutes):
+    """(share of text time with the reference speaker, speaker changes per minute)."""
+    correct = total = 0.0
+    for segment in combined:
+        length = segment['end'] - segment['start']
+        total += length
+        if segment['speaker'] == reference_speaker(segment, reference):
+            correct += length
+    changes = sum(1 for a, b in zip(combined, combined[1:]) if a['speaker'] != b['speaker'])
+    return (correct / total if total else 0.0), changes / minutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark combiners on a synthetic meeting")
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--speakers', type=int, default=4)
+    parser.add_argument('--spurious', type=float, default=0.5, help="Spurious short turns per 10 s of speech")
+    parser.add_argument('--methods', default=','.join(COMBINER_MODULES))
+    args = parser.parse_args()
+
+    reference, transcript, diarization = synthetic_meeting(args.minutes, args.speakers, args.spurious)
+    reference_changes = sum(1 for a, b in zip(reference, reference[1:]) if a['speaker'] != b['speaker'])
+    print(f"{len(transcript)} transcript segments, {len(diarization)} diarization turns, "
+          f"{reference_changes / args.minutes:.1f} reference speaker changes/min")
+    print(f"{'method':<18} {'seconds':>9} {'accuracy':>9} {'changes/min':>12}")
+    for method in args.methods.split(','):
+        try:
+            combiner = get_combiner(method)
+        except ImportError as e:
+            print(f"{method:<18} skipped ({e.name} not installed)")
+            continue
+        start = time.perf_counter()
+        try:
+            combined = combiner.combine([dict(t) for t in transcript], [dict(d) for d in diarization])
+        except ImportError as e:
+            # The semantic combiners load their embedding backend on first use
+            print(f"{method:<18} skipped ({e.name} not installed)")
+            continue
+        seconds = time.perf_counter() - start
+        accuracy, changes = score(combined, reference, args.minutes)
+        print(f"{method:<18} {seconds:>9.3f} {accuracy:>9.1%} {changes:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compare the default CPU diarization path with the tuned CPU performance mode.
+
+Runs the same pyannote pipeline twice on a fixed sample, once with default PyTorch
+settings and once with thread tuning, embedding batch size and optional int8
+quantization applied. Reports runtime per audio hour for both runs and the DER
+change introduced by the tuned path.
+
+Usage:
+    python benchmarks/diarization_cpu.py sample.wav --num-speakers 2 [--reference sample.rttm]
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+
+import torch
+import torchaudio
+from dotenv import load_dotenv
+from pyannote.audio import Pipeline
+from pyannote.metrics.diarization import DiarizationErrorRate
+from diarization.diarizer import apply_cpu_performance_mode, get_cpu_performance_options
+from utils.config_manager import get_config_manager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def load_pipeline(model_name):
+    token = os.getenv('HUGGING_FACE_AUTH_TOKEN')
+    if not token:
+        raise ValueError("HUGGING_FACE_AUTH_TOKEN not found in environment variables")
+    pipeline = Pipeline.from_pretrained(model_name, use_auth_token=token)
+    pipeline.to(torch.device("cpu"))
+    return pipeline
+
+
+def run_diarization(pipeline, waveform, sample_rate, num_speakers):
+    start = time.perf_counter()
+    annotation = pipeline({"waveform": waveform, "sample_rate": sample_rate}, num_speakers=num_speakers)
+    return annotation, time.perf_counter() - start
+
+
+def load_reference(rttm_path):
+    from pyannote.database.util import load_rttm
+    annotations = load_rttm(rttm_path)
+    return next(iter(annotations.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CPU diarization performance mode.")
+    parser.add_argument('audio', help="Fixed sample audio file")
+    parser.add_argument('--num-speakers', type=int, default=2)
+    parser.add_argument('--model', default='pyannote/speaker-diarization-3.1')
+    parser.add_argument('--reference', help="Optional RTTM reference; defaults to the unquantized output")
+    parser.add_argument('--quantize', action='store_true', help="Force int8 quantization of the embedding model")
+    args = parser.parse_args()
+
+    load_dotenv()
+    options = get_cpu_performance_options(get_config_manager().config)
+    options['enabled'] = True
+    if args.quantize:
+        options['quantize_embedding'] = True
+
+    waveform, sample_rate = torchaudio.load(args.audio)
+    audio_hours = waveform.shape[-1] / sample_rate / 3600
+
+    # Baseline first: thread settings are process-wide, so the tuned run has to come second
+    baseline_pipeline = load_pipeline(args.model)
+    baseline, baseline_time = run_diarization(baseline_pipeline, waveform, sample_rate, args.num_speakers)
+    del baseline_pipeline
+
+    tuned_pipeline = load_pipeline(args.model)
+    apply_cpu_performance_mode(tuned_pipeline, options)
+    tuned, tuned_time = run_diarization(tuned_pipeline, waveform, sample_rate, args.num_speakers)
+
+    metric = DiarizationErrorRate()
+    if args.reference:
+        reference = load_reference(args.reference)
+        baseline_der = metric(reference, baseline)
+        tuned_der = metric(reference, tuned)
+    else:
+        baseline_der = 0.0
+        tuned_der = metric(baseline, tuned)
+
+    print(f"\nAudio duration: {audio_hours * 3600:.1f} s")
+    print(f"Settings: {options}")
+    print(f"{'Mode':<10} {'Runtime (s)':>12} {'s / audio hour':>16} {'DER':>8}")
+    print(f"{'default':<10} {baseline_time:>12.2f} {baseline_time / audio_hours:>16.1f} {baseline_der:>8.2%}")
+    print(f"{'tuned':<10} {tuned_time:>12.2f} {tuned_time / audio_hours:>16.1f} {tuned_der:>8.2%}")
+    print(f"DER change: {tuned_der - baseline_der:+.2%}, speed-up: {baseline_time / tuned_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Score combiners against reference annotations and compare them in one table.
+
+A corpus directory holds, per meeting `<name>`, the reference speakers as
+`<name>.rttm`, the reference words as `<name>.ctm`, and the system output as
+`<name>.transcription.json` and `<name>.diarization.json` (or `.diarization.rttm`;
+the checkpoint units of a job can be copied in as they are). Every requested
+combiner is run on every meeting and scored with word-level diarization error
+rate (WDER), speaker-turn boundary precision/recall/F1 within a collar, and
+segment purity. Counts are summed over the corpus before the rates are computed,
+so long meetings weigh more than short ones. A `<name>.combined.jsonl` export, if
+present, is scored as the method 'export'.
+
+`--grid` sweeps a combiner's keyword arguments; each combination becomes its own
+row. `--synthetic N` writes N synthetic meetings (see benchmarks/combiners.py)
+into the corpus directory first, to try the tool without real annotations.
+
+Usage:
+    python benchmarks/evaluate_combiners.py CORPUS [--methods simple,viterbi]
+        [--grid viterbi:switch_penalty=0.3,0.6,1.0] [--collar 1.0] [--json results.json] [--synthetic 5]
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+import itertools
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+sys.path.append(current_dir)
+
+from utils.result_combiner import COMBINER_MODULES, get_combiner
+from evaluation.diarization_metrics import load_corpus, evaluate, summarize, write_rttm
+
+
+def parse_value(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def parse_grid(specs, methods):
+    """{method: [kwargs, ...]} from `method:param=v1,v2` specs; methods without a grid run once with defaults."""
+    grids = {method: {} for method in methods}
+    for spec in specs:
+        method, _, assignment = spec.partition(':')
+        param, _, values = assignment.partition('=')
+        if method not in grids or not param or not values:
+            raise SystemExit(f"Invalid --grid '{spec}', expected method:param=v1,v2 for one of {', '.join(methods)}")
+        grids[method][param] = [parse_value(value) for value in values.split(',')]
+    runs = {}
+    for method, params in grids.items():
+        names = sorted(params)
+        runs[method] = [dict(zip(names, values)) for values in itertools.product(*(params[n] for n in names))]
+    return runs
+
+
+def check_params(combiner, method, kwargs):
+    accepted = inspect.signature(combiner.combine).parameters
+    unknown = [name for name in kwargs if name not in accepted]
+    if unknown:
+        raise SystemExit(f"{method} does not accept {', '.join(unknown)} "
+                         f"(parameters: {', '.join(list(accepted)[2:]) or 'none'})")
+
+
+def write_synthetic(directory, count, minutes, speakers):
+    from combiners import synthetic_meeting
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        name = f"synthetic_{index:02d}"
+        reference, transcript, diarization = synthetic_meeting(minutes, speakers, 0.5, seed=index)
+        write_rttm(os.path.join(directory, name + '.rttm'), reference, name)
+        # One reference word every 0.4 s of each turn
+        with open(os.path.join(directory, name + '.ctm'), 'w', encoding='utf-8') as f:
+            for turn in reference:
+                t = turn['start']
+                while t + 0.3 <= turn['end']:
+                    f.write(f"{name} 1 {t:.2f} 0.30 w\n")
+                    t += 0.4
+        with open(os.path.join(directory, name + '.transcription.json'), 'w', encoding='utf-8') as f:
+            json.dump(transcript, f)
+        with open(os.path.join(directory, name + '.diarization.json'), 'w', encoding='utf-8') as f:
+            json.dump(diarization, f)
+    print(f"Wrote {count} synthetic meetings of {minutes:g} min to {directory}")
+
+
+def add_counts(total, counts):
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate combiners against reference RTTM and CTM annotations")
+    parser.add_argument('corpus', help="Directory of <name>.rttm, <name>.ctm and system output per meeting")
+    parser.add_argument('--methods', default=','.join(COMBINER_MODULES))
+    parser.add_argument('--grid', action='append', default=[], help="method:param=v1,v2 (repeatable)")
+    parser.add_argument('--collar', type=float, default=1.0, help="Seconds within which a turn boundary matches")
+    parser.add_argument('--json', help="Also write the table, with raw counts, to this file")
+    parser.add_argument('--synthetic', type=int, default=0, help="First write this many synthetic meetings")
+    parser.add_argument('--minutes', type=float, default=30, help="Length of each synthetic meeting")
+    parser.add_argument('--speakers', type=int, default=4, help="Speakers in each synthetic meeting")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        write_synthetic(args.corpus, args.synthetic, args.minutes, args.speakers)
+    meetings = load_corpus(args.corpus)
+    if not meetings:
+        raise SystemExit(f"No complete meetings in {args.corpus}")
+    words = sum(len(meeting['words']) for meeting in meetings.values())
+    print(f"{len(meetings)} meetings, {words} reference words, collar {args.collar:g}s")
+
+    methods = args.methods.split(',')
+    rows = []
+    for method, runs in parse_grid(args.grid, methods).items():
+        try:
+            combiner = get_combiner(method)
+            for kwargs in runs:
+                check_params(combiner, method, kwargs)
+                total, seconds = {}, 0.0
+                for meeting in meetings.values():
+                    start = time.perf_counter()
+                    combined = combiner.combine([dict(t) for t in meeting['transcription']],
+                                                [dict(d) for d in meeting['diarization']], **kwargs)
+                    seconds += time.perf_counter() - start
+                    add_counts(total, evaluate(meeting['words'], meeting['turns'], combined, args.collar))
+                rows.append({'method': method, 'params': kwargs, 'seconds': seconds, 'counts': total,
+                             **summarize(total)})
+        except ImportError as e:
+            # The semantic combiners only load their embedding backend on first use
+            print(f"{method:<18} skipped ({e.name} not installed)")
+
+    exported = [meeting for meeting in meetings.values() if 'combined' in meeting]
+    if exported:
+        total = {}
+        for meeting in exported:
+            add_counts(total, evaluate(meeting['words'], meeting['turns'], meeting['combined'], args.collar))
+        rows.append({'method': 'export', 'params': {}, 'seconds': None, 'counts': total, **summarize(total)})
+
+    print(f"{'method':<18} {'params':<24} {'WDER':>7} {'turn P':>7} {'turn R':>7} {'turn F1':>7} "
+          f"{'purity':>7} {'seconds':>8}")
+    for row in rows:
+        params = ','.join(f"{name}={value}" for name, value in row['params'].items()) or '-'
+        seconds = f"{row['seconds']:>8.3f}" if row['seconds'] is not None else f"{'-':>8}"
+        print(f"{row['method']:<18} {params:<24} {row['wder']:>7.1%} {row['boundary_precision']:>7.1%} "
+              f"{row['boundary_recall']:>7.1%} {row['boundary_f1']:>7.1%} {row['purity']:>7.1%} {seconds}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Measure PDF rendering throughput on a synthetic long transcript.
+
+Generates a transcript of `--segments` segments (100k by default, roughly an 8-hour
+meeting) with a few alternating speakers, then renders it once in a single process and
+once with parallel chunk rendering. With `--baseline` the previous layout (one
+`multi_cell` per segment) is timed as well. Reports wall time, pages per second and
+peak resident memory of the rendering process. Parallel rendering
+needs pypdf and more than one core.
+
+Usage:
+    python benchmarks/pdf_throughput.py [--segments 100000] [--workers 4] [--chunk-blocks 2000] [--baseline]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+
+from utils.config_manager import get_config_manager
+from fpdf import FPDF
+from utils.output_generator import get_pdf_options, write_pdf, shutdown_pdf_pool
+from utils.telemetry import PeakRssSampler
+
+WORDS = ("we should ship the release next week once the migration is done and the numbers "
+         "from the pilot look good so let us review the open questions and agree on owners").split()
+
+
+def synthetic_transcript(count, speakers=4, seed=0):
+    rng = random.Random(seed)
+    transcript = []
+    start = 0.0
+    speaker = 0
+    for _ in range(count):
+        duration = rng.uniform(1.0, 6.0)
+        # Speakers usually talk for a few segments in a row
+        if rng.random() < 0.4:
+            speaker = rng.randrange(speakers)
+        transcript.append({
+            'speaker': str(speaker + 1),
+            'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 24))),
+            'start': start,
+            'end': start + duration
+        })
+        start += duration + rng.uniform(0.0, 0.5)
+    return transcript
+
+
+def write_pdf_baseline(transcript, path, options):
+    """The layout create_pdf used before block rendering: one multi_cell per segment."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font("Arial", size=options['font_size'])
+    for item in transcript:
+        pdf.multi_cell(0, options['line_spacing'] * options['font_size'],
+                       f"Speaker {item['speaker']}: {item['text']}", align='L', border=0)
+        pdf.ln()
+    pdf.output(path)
+    return pdf.page_no()
+
+
+def run(transcript, options, label, output_dir, render=write_pdf):
+    path = os.path.join(output_dir, f"{label}.pdf")
+    with PeakRssSampler(interval=0.01) as sampler:
+        start = time.perf_counter()
+        pages = render(transcript, path, options)
+        seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    peak = f"{sampler.peak / (1024 * 1024):7.0f} MB peak RSS" if sampler.peak else ""
+    print(f"{label:<10} {pages:>7} pages  {seconds:8.2f}s  {pages / seconds:8.1f} pages/s  {size_mb:6.1f} MB file  {peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF generation on a synthetic transcript")
+    parser.add_argument('--segments', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=0, help="Chunk workers; 0 uses up to 4 cores")
+    parser.add_argument('--chunk-blocks', type=int, default=2000)
+    parser.add_argument('--skip-single', action='store_true', help="Only run the parallel renderer")
+    parser.add_argument('--baseline', action='store_true', help="Also time the per-segment multi_cell layout")
+    args = parser.parse_args()
+
+    transcript = synthetic_transcript(args.segments)
+    options = get_pdf_options(get_config_manager().config)
+    print(f"Rendering {len(transcript)} segments")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        if args.baseline:
+            run(transcript, options, 'baseline', output_dir, render=write_pdf_baseline)
+        if not args.skip_single:
+            # A chunk size above the block count keeps everything in this process
+            run(transcript, dict(options, chunk_blocks=len(transcript) + 1), 'single', output_dir)
+        # Peak RSS is the main process only; each worker holds one chunk at a time
+        run(transcript, dict(options, parallel_workers=args.workers, chunk_blocks=args.chunk_blocks),
+            'parallel', output_dir)
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
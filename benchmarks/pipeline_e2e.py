@@ -0,0 +1,323 @@
+"""Benchmark the full job pipeline headlessly with stub engines.
+
+Runs `run_job` end to end (extract, diarize, transcribe, combine, PDF and format
+export) on synthetic WAV recordings, with the model-backed engines replaced by
+stubs. The stubs take a configurable time per audio second (`--whisper-rtf`,
+`--diarize-rtf`, `--groq-rtf` plus `--groq-latency` per request), a one-off model load
+per worker, and produce `--segments-per-minute` transcript segments over the speaker
+turns that were used to synthesize the audio. By default they sleep, like model code
+that releases the GIL; `--busy` makes them spin in Python instead to expose GIL
+contention.
+
+Reports, for a single job, end-to-end time, the critical path through the stage graph
+and the overlap efficiency (critical path / wall time; 1.0 means orchestration adds
+nothing beyond the unavoidable dependency chain), and for a batch of jobs the
+throughput and speedup per worker count. No GUI, models, Hugging Face token or network
+access are needed; the benchmark runs in a temporary workspace with its own config, so
+checkpoints, telemetry and the search and speaker indexes of the real setup are not touched.
+
+Usage:
+    python benchmarks/pipeline_e2e.py [--duration 600] [--engine whisper|groq] [--workers 1,2,4] [--jobs 8]
+                                      [--whisper-rtf 0.05] [--diarize-rtf 0.04] [--busy] [--json report.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import wave
+import zlib
+import random
+import shutil
+import weakref
+import argparse
+import tempfile
+import functools
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.abspath(os.path.join(current_dir, '..', 'src'))
+sys.path.append(src_dir)
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+STEP_SECONDS = 10.0
+
+WORDS = ("we should ship the release next week once the migration is done and the numbers "
+         "from the pilot look good so let us review the open questions and agree on owners").split()
+
+
+def speaker_turns(duration, speakers, seed):
+    """Deterministic [(start, end, speaker)] plan shared by the synthetic audio and the stubs."""
+    rng = random.Random(seed)
+    turns = []
+    start = 0.0
+    speaker = 0
+    while start < duration:
+        end = min(duration, start + rng.uniform(2.0, 20.0))
+        turns.append((start, end, speaker))
+        speaker = (speaker + rng.randrange(1, speakers)) % speakers if speakers > 1 else 0
+        start = end
+    return turns
+
+
+def file_seed(path):
+    return zlib.crc32(os.path.basename(path).encode('utf-8'))
+
+
+def write_synthetic_audio(path, duration, speakers):
+    """Write a 16 kHz mono WAV with one voiced tone per speaker turn, syllable-rate modulation and noise."""
+    rng = np.random.default_rng(file_seed(path))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        for start, end, speaker in speaker_turns(duration, speakers, file_seed(path)):
+            t = np.arange(int((end - start) * SAMPLE_RATE)) / SAMPLE_RATE
+            pitch = 110.0 + 45.0 * speaker
+            voice = sum(np.sin(2 * math.pi * pitch * h * t) / h for h in range(1, 5))
+            envelope = 0.5 + 0.5 * np.sin(2 * math.pi * 4.0 * t) ** 2
+            signal = 0.25 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+            f.writeframes((np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes())
+
+
+def wav_duration(path):
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+class StubEngines:
+    """Drop-in for runner.ModelEngines that simulates model latency and output."""
+
+    def __init__(self, whisper_rtf=0.05, diarize_rtf=0.04, groq_rtf=0.01, groq_latency=0.5,
+                 groq_chunk_seconds=600.0, load_seconds=2.0, segments_per_minute=12, speakers=3, busy=False):
+        self.whisper_rtf = whisper_rtf
+        self.diarize_rtf = diarize_rtf
+        self.groq_rtf = groq_rtf
+        self.groq_latency = groq_latency
+        self.groq_chunk_seconds = groq_chunk_seconds
+        self.load_seconds = load_seconds
+        self.segments_per_minute = segments_per_minute
+        self.speakers = speakers
+        self.busy = busy
+        # Model caches that already paid the load time
+        self._loaded = weakref.WeakSet()
+
+    def _work(self, seconds, reporter):
+        if reporter is not None:
+            reporter.token.raise_if_cancelled()
+        if not self.busy:
+            time.sleep(seconds)
+            return
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+
+    def _run(self, duration, seconds_per_audio_second, reporter, request_latency=0.0, step=STEP_SECONDS):
+        done = 0.0
+        while done < duration:
+            chunk = min(step, duration - done)
+            self._work(request_latency + chunk * seconds_per_audio_second, reporter)
+            done += chunk
+            if reporter is not None:
+                reporter.update(done / duration, done)
+
+    def warm_up(self, options, models):
+        if models not in self._loaded:
+            self._work(self.load_seconds, None)
+            self._loaded.add(models)
+
+    def diarize(self, audio_path, options, models, reporter=None, embeddings=None):
+        duration = wav_duration(audio_path)
+        self._run(duration, self.diarize_rtf, reporter)
+        turns = speaker_turns(duration, self.speakers, file_seed(audio_path))
+        if embeddings is not None:
+            rng = np.random.default_rng(file_seed(audio_path))
+            for speaker in range(self.speakers):
+                embeddings[f"SPEAKER_{speaker:02d}"] = rng.standard_normal(192).tolist()
+        return [{'start': start, 'end': end, 'speaker': f"SPEAKER_{speaker:02d}"}
+                for start, end, speaker in turns], 'cpu'
+
+    def transcribe(self, audio_path, options, models, reporter=None, checkpoint=None):
+        duration = wav_duration(audio_path)
+        if options['transcription_method'] == 'groq':
+            self._run(duration, self.groq_rtf, reporter, self.groq_latency, self.groq_chunk_seconds)
+            device = 'groq'
+        else:
+            self._run(duration, self.whisper_rtf, reporter)
+            device = 'cpu'
+        rng = random.Random(file_seed(audio_path))
+        count = max(1, int(duration / 60.0 * self.segments_per_minute))
+        length = duration / count
+        transcription = [{'start': i * length, 'end': (i + 1) * length,
+                          'text': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 24)))}
+                         for i in range(count)]
+        return transcription, device
+
+
+def prepare_workspace(workspace):
+    """Give the benchmark its own Config/config.json so the real setup's state is left alone."""
+    config = {}
+    repo_config = os.path.join(current_dir, '..', 'Config', 'config.json')
+    if os.path.exists(repo_config):
+        with open(repo_config, 'r') as f:
+            config = json.load(f)
+    config.update({
+        'use_cuda': False,
+        'output_directory': os.path.join(workspace, 'transcriptions'),
+        'checkpointing': dict(config.get('checkpointing', {}), enabled=False),
+        'telemetry': dict(config.get('telemetry', {}), enabled=False),
+        'profiling': dict(config.get('profiling', {}), enabled=False),
+        'stage_executor': dict(config.get('stage_executor', {}), enabled=False),
+        'search_index': dict(config.get('search_index', {}), enabled=False),
+        'speaker_index': dict(config.get('speaker_index', {}), enabled=False)
+    })
+    os.makedirs(os.path.join(workspace, 'Config'), exist_ok=True)
+    with open(os.path.join(workspace, 'Config', 'config.json'), 'w') as f:
+        json.dump(config, f, indent=4)
+    # The config manager resolves Config/ relative to the working directory
+    os.chdir(workspace)
+
+
+def critical_path(deps, durations):
+    """Length of the longest dependency chain, weighting each stage by its measured duration."""
+    finish = {}
+
+    def visit(name):
+        if name not in finish:
+            finish[name] = durations.get(name, 0.0) + max((visit(d) for d in deps[name]), default=0.0)
+        return finish[name]
+
+    return max((visit(name) for name in deps), default=0.0)
+
+
+def run_single(path, options, engines, repeat):
+    from pipeline.runner import ModelCache, run_job, build_stages, resolve_job_options
+    models = ModelCache()
+    # Model loading is reported separately; it is paid once per worker, not per job
+    engines.warm_up(options, models)
+    graph = build_stages(path, resolve_job_options(options), models, engines)
+    deps = {name: list(stage.deps) for name, stage in graph.stages.items()}
+
+    runs = []
+    for _ in range(repeat):
+        started = {}
+        durations = {}
+
+        def on_event(event):
+            now = time.perf_counter()
+            if event.status == 'started':
+                started[event.stage] = now
+            elif event.status == 'done':
+                durations[event.stage] = now - started.get(event.stage, now)
+
+        start = time.perf_counter()
+        run_job(path, options, models, engines=engines, on_event=on_event)
+        wall = time.perf_counter() - start
+        path_seconds = critical_path(deps, durations)
+        runs.append({
+            'wall_seconds': wall,
+            'critical_path_seconds': path_seconds,
+            'serial_seconds': sum(durations.values()),
+            'overlap_efficiency': path_seconds / wall if wall else 0.0,
+            'orchestration_overhead_seconds': wall - path_seconds,
+            'stages': durations
+        })
+    return min(runs, key=lambda r: r['wall_seconds'])
+
+
+def run_scaling(paths, options, engines, worker_counts, audio_seconds):
+    from pipeline.batch import BatchJobQueue
+    from pipeline.runner import run_job
+    job_runner = functools.partial(run_job, engines=engines)
+    rows = []
+    for workers in worker_counts:
+        job_queue = BatchJobQueue(workers, job_runner)
+        start = time.perf_counter()
+        job_queue.start()
+        for path in paths:
+            job_queue.submit(path, options)
+        results = job_queue.join()
+        wall = time.perf_counter() - start
+        failed = [r for r in results if r['status'] != 'done']
+        if failed:
+            raise RuntimeError(f"{len(failed)} job(s) failed: {failed[0].get('error')}")
+        rows.append({'workers': workers, 'wall_seconds': wall, 'audio_hours_per_hour': audio_seconds / wall})
+    # Relative to the first worker count, normally 1
+    for row in rows:
+        row['speedup'] = rows[0]['wall_seconds'] / row['wall_seconds']
+        row['parallel_efficiency'] = row['speedup'] * rows[0]['workers'] / row['workers']
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the job pipeline end to end with stub engines")
+    parser.add_argument('--duration', type=float, default=600.0, help="Seconds of synthetic audio per job")
+    parser.add_argument('--speakers', type=int, default=3)
+    parser.add_argument('--engine', choices=['whisper', 'groq'], default='whisper')
+    parser.add_argument('--combine-method', default='simple')
+    parser.add_argument('--formats', default='srt,vtt,jsonl,md', help="Export formats besides the PDF ('' for none)")
+    parser.add_argument('--whisper-rtf', type=float, default=0.05, help="Stub Whisper seconds per audio second")
+    parser.add_argument('--diarize-rtf', type=float, default=0.04, help="Stub pyannote seconds per audio second")
+    parser.add_argument('--groq-rtf', type=float, default=0.01, help="Stub Groq seconds per audio second")
+    parser.add_argument('--groq-latency', type=float, default=0.5, help="Stub Groq seconds per request")
+    parser.add_argument('--load-seconds', type=float, default=2.0, help="Stub model load time per worker")
+    parser.add_argument('--segments-per-minute', type=float, default=12.0)
+    parser.add_argument('--busy', action='store_true', help="Stubs spin in Python (hold the GIL) instead of sleeping")
+    parser.add_argument('--repeat', type=int, default=3, help="Single-job runs; the fastest is reported")
+    parser.add_argument('--workers', default='1,2,4', help="Worker counts for the scaling run")
+    parser.add_argument('--jobs', type=int, default=8, help="Jobs in the scaling run")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workspace = tempfile.mkdtemp(prefix='meetnote_bench_')
+    try:
+        prepare_workspace(workspace)
+        from utils.exporters import parse_formats
+
+        engines = StubEngines(args.whisper_rtf, args.diarize_rtf, args.groq_rtf, args.groq_latency,
+                              load_seconds=args.load_seconds, segments_per_minute=args.segments_per_minute,
+                              speakers=args.speakers, busy=args.busy)
+        options = {
+            'num_speakers': args.speakers,
+            'transcription_method': 'groq' if args.engine == 'groq' else 'local',
+            'combine_method': args.combine_method,
+            'formats': parse_formats(args.formats)
+        }
+        worker_counts = [int(w) for w in args.workers.split(',')]
+        audio_dir = os.path.join(workspace, 'audio')
+        os.makedirs(audio_dir)
+        paths = []
+        for i in range(max(1, args.jobs)):
+            path = os.path.join(audio_dir, f"meeting_{i:03d}.wav")
+            write_synthetic_audio(path, args.duration, args.speakers)
+            paths.append(path)
+        print(f"{len(paths)} synthetic recordings of {args.duration:.0f}s, {args.engine} stub, "
+              f"{'busy' if args.busy else 'sleeping'} engines")
+
+        single = run_single(paths[0], options, engines, args.repeat)
+        print(f"\nSingle job: {single['wall_seconds']:.2f}s end to end, "
+              f"critical path {single['critical_path_seconds']:.2f}s, "
+              f"stage time {single['serial_seconds']:.2f}s")
+        print(f"Overlap efficiency {single['overlap_efficiency']:.1%}, "
+              f"orchestration overhead {single['orchestration_overhead_seconds'] * 1000:.0f} ms")
+        for stage, seconds in sorted(single['stages'].items(), key=lambda item: -item[1]):
+            print(f"  {stage:<12} {seconds:8.3f}s")
+
+        scaling = run_scaling(paths, options, engines, worker_counts, args.duration * len(paths))
+        print(f"\n{'workers':>7} {'wall':>9} {'audio h/h':>10} {'speedup':>8} {'efficiency':>10}")
+        for row in scaling:
+            print(f"{row['workers']:>7} {row['wall_seconds']:>8.2f}s {row['audio_hours_per_hour']:>10.1f} "
+                  f"{row['speedup']:>7.2f}x {row['parallel_efficiency']:>10.1%}")
+
+        if json_path:
+            with open(json_path, 'w') as f:
+                json.dump({'args': vars(args), 'single_job': single, 'scaling': scaling}, f, indent=4)
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
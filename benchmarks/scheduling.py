@@ -0,0 +1,111 @@
+"""Compare batch schedules on a mixed-length workload with stub engines.
+
+Writes synthetic recordings of `--durations` seconds, fills the job history with a
+few calibration jobs, then processes the whole set once per schedule with a
+BatchJobQueue. Reports the mean and median turnaround (time from the start of the
+batch until a job's transcript is written) and the makespan, plus how far the
+history's predicted job time was from the measured one. Shortest-expected-job-first
+leaves the makespan unchanged but lets short recordings finish before long ones,
+which lowers the mean turnaround.
+
+Uses the stub engines and temporary workspace of pipeline_e2e.py, so no models,
+GPU or network access are needed.
+
+Usage:
+    python benchmarks/scheduling.py [--durations 2400,60,900,120,1800,300,90,600] [--workers 1]
+        [--schedules fifo,sjf] [--whisper-rtf 0.004] [--diarize-rtf 0.003]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import functools
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+
+from pipeline_e2e import StubEngines, prepare_workspace, write_synthetic_audio
+
+
+def run_schedule(paths, options, engines, workers, schedule):
+    from pipeline.batch import BatchJobQueue
+    from pipeline.runner import run_job
+    finished = {}
+    job_queue = BatchJobQueue(workers, functools.partial(run_job, engines=engines),
+                              on_result=lambda entry: finished.setdefault(entry['file'], time.perf_counter()),
+                              schedule=schedule)
+    for path in paths:
+        job_queue.submit(path, options)
+    start = time.perf_counter()
+    job_queue.start()
+    results = job_queue.join()
+    failed = [r for r in results if r['status'] != 'done']
+    if failed:
+        raise RuntimeError(f"{len(failed)} job(s) failed: {failed[0].get('error')}")
+    turnarounds = [finished[path] - start for path in paths]
+    errors = [abs(r['expected_seconds'] - r['seconds']) / r['seconds'] for r in results if 'expected_seconds' in r]
+    return {
+        'schedule': schedule,
+        'order': [os.path.basename(r['file']) for r in results],
+        'mean_turnaround': statistics.mean(turnarounds),
+        'median_turnaround': statistics.median(turnarounds),
+        'makespan': max(turnarounds),
+        'prediction_error': statistics.mean(errors) if errors else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FIFO and shortest-expected-job-first batch schedules")
+    parser.add_argument('--durations', default='2400,60,900,120,1800,300,90,600',
+                        help="Seconds of synthetic audio per job, in submission order")
+    parser.add_argument('--calibration', default='60,600,1200', help="Durations of the jobs run to fill the history")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--schedules', default='fifo,sjf')
+    parser.add_argument('--speakers', type=int, default=3)
+    parser.add_argument('--whisper-rtf', type=float, default=0.004, help="Stub Whisper seconds per audio second")
+    parser.add_argument('--diarize-rtf', type=float, default=0.003, help="Stub pyannote seconds per audio second")
+    parser.add_argument('--load-seconds', type=float, default=0.5, help="Stub model load time per worker")
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix='meetnote_sched_')
+    try:
+        prepare_workspace(workspace)
+        engines = StubEngines(args.whisper_rtf, args.diarize_rtf, load_seconds=args.load_seconds,
+                              speakers=args.speakers)
+        options = {'num_speakers': args.speakers, 'transcription_method': 'local', 'combine_method': 'simple',
+                   'formats': []}
+        audio_dir = os.path.join(workspace, 'audio')
+        os.makedirs(audio_dir)
+
+        def write(prefix, durations):
+            paths = []
+            for i, duration in enumerate(float(d) for d in durations.split(',')):
+                path = os.path.join(audio_dir, f"{prefix}_{i:02d}_{duration:.0f}s.wav")
+                write_synthetic_audio(path, duration, args.speakers)
+                paths.append(path)
+            return paths
+
+        calibration = write('calibration', args.calibration)
+        paths = write('meeting', args.durations)
+        run_schedule(calibration, options, engines, args.workers, 'fifo')
+        print(f"{len(paths)} jobs, {args.workers} worker(s), history from {len(calibration)} calibration job(s)")
+
+        print(f"\n{'schedule':<9} {'mean':>8} {'median':>8} {'makespan':>9} {'pred. err':>9}")
+        for schedule in args.schedules.split(','):
+            # Separate output directories, so every schedule processes every file
+            run_options = dict(options, output_directory=os.path.join(workspace, f"out_{schedule}"))
+            row = run_schedule(paths, run_options, engines, args.workers, schedule)
+            error = f"{row['prediction_error']:.1%}" if row['prediction_error'] is not None else '-'
+            print(f"{schedule:<9} {row['mean_turnaround']:>7.2f}s {row['median_turnaround']:>7.2f}s "
+                  f"{row['makespan']:>8.2f}s {error:>9}")
+            print(f"          order: {', '.join(row['order'])}")
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
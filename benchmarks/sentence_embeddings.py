@@ -0,0 +1,101 @@
+"""Compare the PyTorch and ONNX sentence-embedding backends of the semantic combiners.
+
+Encodes a synthetic set of meeting utterances with both backends and reports load
+time (imports included), sentences per second and, as a parity check, how far the
+ONNX backend's cosine similarities between consecutive utterances - the quantity the
+semantic combiners threshold - are from PyTorch's. It also counts how often the two
+backends fall on different sides of the combiners' thresholds. Exits with status 1
+if the largest difference exceeds `--tolerance`, so it can gate a new export.
+
+The ONNX export is written to `--onnx-directory` on first use (this needs torch,
+sentence-transformers, onnx and onnxruntime); later runs load it without torch.
+
+Usage:
+    python benchmarks/sentence_embeddings.py [--models paraphrase-MiniLM-L3-v2,all-MiniLM-L6-v2]
+        [--sentences 2000] [--full-precision] [--tolerance 0.05]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, '..', 'src'))
+
+import numpy as np
+from utils.sentence_embeddings import get_sentence_embedding_options, get_sentence_encoder
+
+# Similarity thresholds used by the semantic combiners
+THRESHOLDS = (0.2, 0.7)
+
+OPENERS = ["I think", "So", "Okay, so", "Right,", "Well,", "Yeah,", "Can we", "Let's", "Actually,", "I'm not sure"]
+SUBJECTS = ["the budget", "the release", "the customer data", "the new model", "next week's review",
+            "the test results", "the hiring plan", "our roadmap", "the migration", "the contract"]
+PREDICATES = ["needs another pass", "should ship on Friday", "is over by ten percent", "looks good to me",
+              "is blocked on legal", "came back with two failures", "can wait until the next quarter",
+              "was discussed last time", "depends on the vendor", "is the top priority"]
+TAILS = ["", "", " to be honest", " if everyone agrees", " as far as I know", ", right?", " for now"]
+
+
+def synthetic_sentences(count, seed=0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(OPENERS)} {rng.choice(SUBJECTS)} {rng.choice(PREDICATES)}{rng.choice(TAILS)}."
+            for _ in range(count)]
+
+
+def consecutive_similarities(embeddings):
+    normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    return (normalized[:-1] * normalized[1:]).sum(axis=1)
+
+
+def measure(model_name, options, sentences):
+    start = time.perf_counter()
+    encoder = get_sentence_encoder(model_name, options)
+    encoder.encode(sentences[:8])
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    embeddings = encoder.encode(sentences)
+    seconds = time.perf_counter() - start
+    return encoder.backend, load, len(sentences) / seconds, np.asarray(embeddings, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and parity-check the sentence-embedding backends")
+    parser.add_argument('--models', default='paraphrase-MiniLM-L3-v2,all-MiniLM-L6-v2')
+    parser.add_argument('--sentences', type=int, default=2000)
+    parser.add_argument('--onnx-directory', default='models/onnx')
+    parser.add_argument('--full-precision', action='store_true', help="Export float32 instead of int8")
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help="Largest allowed difference between the backends' cosine similarities")
+    args = parser.parse_args()
+
+    sentences = synthetic_sentences(args.sentences)
+    base = {'onnx_directory': args.onnx_directory, 'full_precision': args.full_precision, 'threads': args.threads}
+    failed = False
+    print(f"{'model':<26} {'backend':<8} {'load s':>7} {'sent/s':>9} {'max |dcos|':>11} {'mean |dcos|':>12} "
+          f"{'flips':>6}")
+    for model_name in args.models.split(','):
+        results = {}
+        for backend in ('torch', 'onnx'):
+            options = get_sentence_embedding_options({'sentence_embeddings': dict(base, backend=backend)})
+            results[backend] = measure(model_name, options, sentences)
+        reference = consecutive_similarities(results['torch'][3])
+        for backend, (actual, load, rate, embeddings) in results.items():
+            similarities = consecutive_similarities(embeddings)
+            difference = np.abs(similarities - reference)
+            flips = sum(int(np.count_nonzero((similarities > t) != (reference > t))) for t in THRESHOLDS)
+            print(f"{model_name:<26} {actual:<8} {load:>7.2f} {rate:>9.0f} {difference.max():>11.4f} "
+                  f"{difference.mean():>12.4f} {flips:>6}")
+            if backend == 'onnx':
+                if actual != 'onnx':
+                    print(f"{'':<26} ONNX backend unavailable, fell back to PyTorch")
+                elif difference.max() > args.tolerance:
+                    print(f"{'':<26} parity FAILED: {difference.max():.4f} > {args.tolerance}")
+                    failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
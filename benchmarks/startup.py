@@ -0,0 +1,93 @@
+"""Measure GUI startup: time to first paint and the slowest imports on the way there.
+
+Launches run.py with MEETNOTE_STARTUP_PROBE set, which makes the app draw its main
+window once and exit. The wall time until the window reports its first paint is
+compared against a target, and `python -X importtime` output is parsed to list the
+modules with the largest cumulative import time. Heavy modules (torch, pyannote,
+faster_whisper, ...) found in the import trace are reported separately since none of
+them should be needed before the window appears.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--target 1.5] [--top 15]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RUN_SCRIPT = os.path.join(current_dir, '..', 'run.py')
+
+HEAVY_MODULES = ['torch', 'torchaudio', 'pyannote', 'faster_whisper', 'ctranslate2', 'groq',
+                 'sentence_transformers', 'sklearn', 'cv2', 'pydub', 'mutagen']
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def launch(importtime=False):
+    env = dict(os.environ, MEETNOTE_STARTUP_PROBE='1')
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd.append(RUN_SCRIPT)
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env)
+    first_paint = None
+    for line in proc.stdout:
+        if line.strip() == 'FIRST_PAINT':
+            first_paint = time.perf_counter() - started
+    _, stderr = proc.communicate()
+    if first_paint is None:
+        raise RuntimeError(f"Application exited without painting (code {proc.returncode}):\n{stderr[-2000:]}")
+    return first_paint, stderr
+
+
+def parse_importtime(stderr):
+    """Return {top-level module: cumulative seconds} for packages imported at top level."""
+    totals = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        # Only count outermost imports so nested modules are not double counted
+        if len(indent) > 1:
+            continue
+        root = module.split('.')[0]
+        totals[root] = totals.get(root, 0.0) + int(cumulative) / 1e6
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure MeetNote time to first paint")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target', type=float, default=1.5, help="Target time to first paint in seconds")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # First launch warms the OS file cache and is not counted
+    launch()
+    timings = [launch()[0] for _ in range(args.runs)]
+    _, stderr = launch(importtime=True)
+    totals = parse_importtime(stderr)
+
+    print(f"\nSlowest imports before first paint:")
+    for module, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {module:<28} {seconds * 1000:8.1f} ms")
+
+    heavy = [module for module in HEAVY_MODULES if module in totals]
+    if heavy:
+        print(f"\nHeavy modules imported before first paint: {', '.join(heavy)}")
+
+    median = statistics.median(timings)
+    print(f"\nTime to first paint: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s "
+          f"over {args.runs} runs (target {args.target:.2f}s)")
+    if median > args.target or heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
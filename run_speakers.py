@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Get the absolute path of the current file (run_speakers.py)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Add the src directory to the Python path
+src_dir = os.path.join(current_dir, 'src')
+sys.path.append(src_dir)
+
+# Import and run the speaker index tool
+from src.diarization.speaker_index import main
+
+if __name__ == "__main__":
+    sys.exit(main())
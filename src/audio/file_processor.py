@@ -6,6 +6,9 @@ import ffmpeg
 
 logger = logging.getLogger(__name__)
 
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.flac']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv']
+
 def process_file(file_path):
     """Process the input file, extracting audio if necessary."""
     file_type = _analyze_file(file_path)
@@ -21,13 +24,33 @@ def _analyze_file(file_path):
     _, ext = os.path.splitext(file_path)
     ext = ext.lower()
     
-    if ext in ['.mp3', '.wav', '.m4a', '.flac']:
+    if ext in AUDIO_EXTENSIONS:
         return 'audio'
-    elif ext in ['.mp4', '.avi', '.mov', '.mkv']:
+    elif ext in VIDEO_EXTENSIONS:
         return 'video'
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
+def is_supported_file(file_path):
+    """Return True if `_analyze_file` accepts the file's extension."""
+    return os.path.splitext(file_path)[1].lower() in AUDIO_EXTENSIONS + VIDEO_EXTENSIONS
+
+def probe_audio(file_path):
+    """Return (duration_seconds, sample_rate, channels) from the file's metadata; unknown values are None."""
+    from mutagen import File as MutagenFile
+    try:
+        audio = MutagenFile(file_path)
+    except Exception:
+        audio = None
+    if audio is None:
+        return None, None, None
+    info = audio.info
+    return getattr(info, 'length', None), getattr(info, 'sample_rate', None), getattr(info, 'channels', None)
+
+def get_audio_duration(file_path):
+    """Return the duration in seconds from the file's metadata, or None if it can't be read."""
+    return probe_audio(file_path)[0]
+
 def extract_audio(file_path):
     """Extract audio from video file to a temporary MP3 file."""
     logger.info(f"Extracting audio from video: {file_path}")
@@ -44,4 +67,63 @@ def extract_audio(file_path):
         return output_path
     except ffmpeg.Error as e:
         logger.error(f"Error extracting audio: {e.stderr.decode()}")
-        raise
\ No newline at end of file
+        raise
+
+def decode_window(file_path, start, duration, sample_rate=16000):
+    """Decode `duration` seconds from `start` as mono float32 samples without loading the rest of the file.
+
+    ffmpeg seeks to `start` and streams only the window, so memory stays proportional
+    to the window rather than to the recording.
+    """
+    import numpy as np
+    try:
+        out, _ = (
+            ffmpeg
+            .input(file_path, ss=start, t=duration)
+            .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=str(sample_rate))
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        logger.error(f"Error decoding audio window at {start:.0f}s: {e.stderr.decode()}")
+        raise
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def get_stream_duration(file_path):
+    """Duration in seconds from the file's metadata, or from ffprobe when the metadata has none.
+
+    Unlike get_audio_duration it never returns None, for callers that must know the
+    length, such as the windowed and streaming decoders.
+    """
+    return probe_audio(file_path)[0] or float(ffmpeg.probe(file_path)['format']['duration'])
+
+def cut_audio_chunk(file_path, start, duration, chunk_path):
+    """Write `duration` seconds from `start` to `chunk_path` as mp3 with one ffmpeg call; returns the path."""
+    (
+        ffmpeg
+        .input(file_path, ss=start, t=duration)
+        .output(chunk_path + '.tmp', format='mp3', acodec='libmp3lame', ac=1)
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    os.replace(chunk_path + '.tmp', chunk_path)
+    return chunk_path
+
+def split_audio_stream(file_path, chunk_seconds, output_dir, duration=None):
+    """Cut the file into mp3 chunks of `chunk_seconds` with one ffmpeg call per chunk.
+
+    Unlike decoding the whole file with pydub, memory use does not grow with the
+    recording's length. Returns a list of [chunk_path, offset_seconds]; chunks already
+    present in `output_dir` are reused.
+    """
+    duration = duration or get_stream_duration(file_path)
+    chunks = []
+    index = 0
+    offset = 0.0
+    while offset < duration:
+        chunk_path = os.path.join(output_dir, f"groq_chunk_{index:04d}.mp3")
+        if not os.path.exists(chunk_path):
+            cut_audio_chunk(file_path, offset, chunk_seconds, chunk_path)
+        chunks.append([chunk_path, offset])
+        index += 1
+        offset += chunk_seconds
+    return chunks
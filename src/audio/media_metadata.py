@@ -0,0 +1,89 @@
+import os
+import json
+import logging
+import threading
+from utils.atomic_io import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+def get_file_browser_options(config):
+    options = {
+        'metadata_workers': 4,
+        'metadata_cache': 'cache/media_metadata.json'
+    }
+    options.update(config.get('file_browser', {}))
+    return options
+
+def probe_duration(file_path):
+    """Return the media duration in seconds, or None if it can't be determined."""
+    # Imported here so they don't delay the first paint of the window
+    from mutagen import File as MutagenFile
+    try:
+        audio = MutagenFile(file_path)
+        if audio is not None and hasattr(audio.info, 'length'):
+            return float(audio.info.length)
+    except Exception:
+        pass
+
+    import cv2
+    video = cv2.VideoCapture(file_path)
+    try:
+        fps = video.get(cv2.CAP_PROP_FPS)
+        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+        if fps > 0 and frame_count > 0:
+            return frame_count / fps
+    except Exception:
+        pass
+    finally:
+        video.release()
+    return None
+
+class MediaMetadataCache:
+    """Persistent probe results keyed by (path, size, mtime).
+
+    An entry is only returned while the file's size and mtime match what was probed,
+    so edited or replaced recordings are probed again. Safe to use from worker
+    threads; `save` writes the file atomically and only when something changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable metadata cache {path}: {str(e)}")
+
+    def lookup(self, file_path, stats):
+        """Return (hit, duration) for a file whose os.stat result is `stats`."""
+        with self._lock:
+            entry = self._entries.get(os.path.abspath(file_path))
+        if entry and entry['size'] == stats.st_size and entry['mtime_ns'] == stats.st_mtime_ns:
+            return True, entry['duration']
+        return False, None
+
+    def store(self, file_path, stats, duration):
+        with self._lock:
+            self._entries[os.path.abspath(file_path)] = {
+                'size': stats.st_size,
+                'mtime_ns': stats.st_mtime_ns,
+                'duration': duration
+            }
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            # Drop entries for files that no longer exist
+            entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+            self._entries = entries
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, entries)
+        except OSError as e:
+            logger.warning(f"Could not save metadata cache {self.path}: {str(e)}")
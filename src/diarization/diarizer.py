@@ -1,34 +1,160 @@
+import weakref
+import numpy as np
 import torch
 import torchaudio
-from pyannote.audio import Pipeline
-from pyannote.audio.pipelines.utils.hook import ProgressHook
 import logging
-from utils.config_manager import ConfigManager
+from utils.config_manager import get_config_manager
+from utils.telemetry import measure
+from utils.cpu import available_cpu_cores
 
 logger = logging.getLogger(__name__)
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
-def diarize_audio(pipeline, file_path, n_speakers):
+# Pipelines that already went through apply_cpu_performance_mode (quantization must only happen once)
+_tuned_pipelines = weakref.WeakSet()
+
+def get_cpu_performance_options(config):
+    defaults = {
+        'enabled': False,
+        'intra_op_threads': 0,
+        'inter_op_threads': 0,
+        'quantize_embedding': False,
+        'embedding_batch_size': 32
+    }
+    options = dict(defaults)
+    options.update(config.get('diarization', {}).get('cpu_performance', {}))
+    return options
+
+def configure_torch_threads(intra_op_threads=0, inter_op_threads=0, cores=None):
+    """Set PyTorch intra/inter-op thread pools. A value of 0 derives the count from `cores` (default: the host's)."""
+    cores = cores or available_cpu_cores()
+    intra = intra_op_threads or cores
+    inter = inter_op_threads or max(1, min(4, cores // 4))
+
+    torch.set_num_threads(intra)
+    try:
+        torch.set_num_interop_threads(inter)
+    except RuntimeError:
+        # The inter-op pool can only be sized before the first parallel op runs in this process
+        inter = torch.get_num_interop_threads()
+        logger.warning(f"[Diarization] Inter-op thread pool already started, keeping {inter} threads.")
+
+    logger.info(f"[Diarization] CPU threads - intra-op: {intra}, inter-op: {inter} ({cores} cores available)")
+    return intra, inter
+
+def quantize_embedding_model(pipeline):
+    """Apply dynamic int8 quantization to the Linear/LSTM layers of the pipeline's embedding model."""
+    embedding = getattr(pipeline, '_embedding', None)
+    model = getattr(embedding, 'model_', None)
+    if not isinstance(model, torch.nn.Module):
+        logger.warning("[Diarization] Embedding model is not a PyTorch module, skipping int8 quantization.")
+        return False
+
+    embedding.model_ = torch.ao.quantization.quantize_dynamic(
+        model.cpu().eval(), {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8)
+    logger.info("[Diarization] Applied dynamic int8 quantization to the embedding model.")
+    return True
+
+def apply_cpu_performance_mode(pipeline, options, cores=None):
+    configure_torch_threads(options['intra_op_threads'], options['inter_op_threads'], cores)
+
+    if pipeline in _tuned_pipelines:
+        return
+    if options['embedding_batch_size'] and hasattr(pipeline, 'embedding_batch_size'):
+        pipeline.embedding_batch_size = options['embedding_batch_size']
+        logger.info(f"[Diarization] Embedding batch size set to {pipeline.embedding_batch_size}")
+    if options['quantize_embedding']:
+        quantize_embedding_model(pipeline)
+    _tuned_pipelines.add(pipeline)
+
+# Share of the total pipeline time spent in each pyannote step, used to turn hook calls into one fraction
+DIARIZATION_STEP_WEIGHTS = {
+    'segmentation': 0.3,
+    'speaker_counting': 0.05,
+    'embeddings': 0.6,
+    'discrete_diarization': 0.05
+}
+
+class DiarizationProgress:
+    """pyannote hook that forwards step progress to a callback and honours a cancellation token.
+
+    Calls are also passed to `hook` (normally pyannote's ProgressHook) so terminal output is kept.
+    """
+
+    def __init__(self, hook=None, callback=None, cancel_token=None, duration=None):
+        self.hook = hook
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.duration = duration
+        self.steps = {}
+
+    def __call__(self, step_name, step_artifact, file=None, total=None, completed=None):
+        if self.hook is not None:
+            self.hook(step_name, step_artifact, file=file, total=total, completed=completed)
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+        if self.callback is None:
+            return
+        self.steps[step_name] = completed / total if total else 1.0
+        fraction = sum(DIARIZATION_STEP_WEIGHTS.get(step, 0.0) * done for step, done in self.steps.items())
+        audio_seconds = fraction * self.duration if self.duration else None
+        self.callback(min(fraction, 1.0), audio_seconds)
+
+def _load_audio(audio):
+    """Accept a file path or an already decoded {"waveform", "sample_rate"} mapping."""
+    if isinstance(audio, dict):
+        return audio['waveform'], audio['sample_rate']
+    return torchaudio.load(audio)
+
+def _select_device(pipeline, config, torch_threads=None):
+    if config['use_cuda'] and torch.cuda.is_available():
+        device = torch.device("cuda:0")
+        torch.cuda.empty_cache()
+        logger.info(f"[Diarization] CUDA available: {torch.cuda.is_available()}")
+        logger.info(f"[Diarization] Current device: {torch.cuda.current_device()}")
+        logger.info(f"[Diarization] Device name: {torch.cuda.get_device_name(0)}")
+    else:
+        device = torch.device("cpu")
+        logger.warning("[Diarization] CUDA not available or not enabled. Using CPU for diarization.")
+        cpu_options = get_cpu_performance_options(config)
+        if cpu_options['enabled']:
+            if torch_threads:
+                # The stage executor's diarization worker: stay within its share of the cores
+                cpu_options = dict(cpu_options, intra_op_threads=torch_threads,
+                                   inter_op_threads=min(cpu_options['inter_op_threads'], torch_threads))
+            apply_cpu_performance_mode(pipeline, cpu_options, cores=torch_threads)
+    return device
+
+def diarize_audio(pipeline, file_path, n_speakers, progress=None, cancel_token=None, telemetry=None, embeddings=None,
+                  torch_threads=None):
+    """Diarize a file path or decoded waveform and return (segments, used_device).
+
+    If `embeddings` is a dict, it is filled with one centroid embedding (a list of
+    floats) per speaker label, as computed by the pipeline's own clustering.
+    `torch_threads` caps the CPU performance mode's thread pools, for callers that
+    were given a share of the cores.
+    """
     config = config_manager.config
-    logger.info(f"[Diarization] Starting diarization for file: {file_path}")
+    source = file_path if isinstance(file_path, str) else "in-memory waveform"
+    logger.info(f"[Diarization] Starting diarization for file: {source}")
     try:
-        waveform, sample_rate = torchaudio.load(file_path)
-        
-        if config['use_cuda'] and torch.cuda.is_available():
-            device = torch.device("cuda:0")
-            torch.cuda.empty_cache()
-            waveform = waveform.to(device)
-            logger.info(f"[Diarization] CUDA available: {torch.cuda.is_available()}")
-            logger.info(f"[Diarization] Current device: {torch.cuda.current_device()}")
-            logger.info(f"[Diarization] Device name: {torch.cuda.get_device_name(0)}")
-        else:
-            device = torch.device("cpu")
-            logger.warning("[Diarization] CUDA not available or not enabled. Using CPU for diarization.")
+        with measure(telemetry, 'decode'):
+            waveform, sample_rate = _load_audio(file_path)
+        waveform = waveform.to(_select_device(pipeline, config, torch_threads))
 
         # Perform diarization
+        from pyannote.audio.pipelines.utils.hook import ProgressHook
+        duration = waveform.shape[-1] / sample_rate
+        extra = {'return_embeddings': True} if embeddings is not None else {}
         with ProgressHook() as hook:
             diarization = pipeline({"waveform": waveform, "sample_rate": sample_rate}, 
-                                   hook=hook, num_speakers=n_speakers)
+                                   hook=DiarizationProgress(hook, progress, cancel_token, duration),
+                                   num_speakers=n_speakers, **extra)
+        if embeddings is not None:
+            diarization, centroids = diarization
+            # Rows of `centroids` follow the order of diarization.labels()
+            for label, centroid in zip(diarization.labels(), centroids):
+                embeddings[label] = [float(x) for x in centroid]
         
         # Remove the device check from here
         used_device = 'cuda' if torch.cuda.is_available() and config['use_cuda'] else 'cpu'
@@ -43,4 +169,101 @@ def diarize_audio(pipeline, file_path, n_speakers):
         return diarization_results, used_device
     except Exception as e:
         logger.error(f"[Diarization] Error during diarization: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+# Sample rate pyannote's models expect; windows are decoded at this rate directly
+WINDOW_SAMPLE_RATE = 16000
+
+def _link_speakers(labels, vectors, speech, centroids, weights, n_speakers, threshold):
+    """Map one window's speaker labels onto global speaker indices.
+
+    Window centroids are matched to the running global centroids greedily by cosine
+    similarity, one window speaker per global speaker. Unmatched speakers start a new
+    global speaker until `n_speakers` exist, then join the closest one. `centroids` and
+    `weights` (speech-weighted sums and seconds of speech) are updated in place.
+    """
+    vectors = np.nan_to_num(np.asarray(vectors, dtype=np.float64)[:len(labels)])
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = np.zeros((len(labels), 0))
+    if centroids:
+        means = np.asarray(centroids) / np.asarray(weights)[:, None]
+        scores = unit @ (means / np.maximum(np.linalg.norm(means, axis=1, keepdims=True), 1e-12)).T
+
+    mapping = {}
+    taken = set()
+    pairs = sorted(((scores[i, j], i, j) for i in range(len(labels)) for j in range(scores.shape[1])
+                    if scores[i, j] >= threshold), reverse=True)
+    for _, i, j in pairs:
+        if i not in mapping and j not in taken:
+            mapping[i] = j
+            taken.add(j)
+    # Speakers with the most speech claim new global slots first
+    for i in sorted(range(len(labels)), key=lambda i: -speech[labels[i]]):
+        if i in mapping:
+            continue
+        if n_speakers is None or len(centroids) < n_speakers:
+            centroids.append(np.zeros(vectors.shape[1]))
+            weights.append(0.0)
+            mapping[i] = len(centroids) - 1
+        else:
+            mapping[i] = int(np.argmax(scores[i]))
+    for i, j in mapping.items():
+        centroids[j] += vectors[i] * speech[labels[i]]
+        weights[j] += speech[labels[i]]
+    return {labels[i]: f"SPEAKER_{j:02d}" for i, j in mapping.items()}
+
+def diarize_audio_windowed(pipeline, file_path, n_speakers, window_seconds, progress=None, cancel_token=None,
+                           telemetry=None, embeddings=None, link_threshold=0.5):
+    """Diarize a long recording one window at a time and return (segments, used_device).
+
+    Only `window_seconds` of audio are decoded and held at once. Each window is
+    diarized with at most `n_speakers` speakers and its speakers are linked to the
+    ones found so far by their centroid embeddings (see `_link_speakers`), so labels
+    stay consistent across windows. Turns are cut at window boundaries. Speakers who
+    only talk in different windows and sound alike may be merged, which full-file
+    clustering would keep apart.
+    """
+    from pyannote.audio.pipelines.utils.hook import ProgressHook
+    from audio.file_processor import get_stream_duration, decode_window
+    config = config_manager.config
+    logger.info(f"[Diarization] Starting windowed diarization ({window_seconds:.0f}s windows) for file: {file_path}")
+    try:
+        device = _select_device(pipeline, config)
+        duration = get_stream_duration(file_path)
+        windows = max(1, int(np.ceil(duration / window_seconds)))
+        centroids, weights = [], []
+        diarization_results = []
+        for index in range(windows):
+            start = index * window_seconds
+            with measure(telemetry, 'decode'):
+                samples = decode_window(file_path, start, window_seconds, WINDOW_SAMPLE_RATE)
+            window_duration = len(samples) / WINDOW_SAMPLE_RATE
+            if window_duration == 0:
+                break
+            waveform = torch.from_numpy(samples).unsqueeze(0).to(device)
+            window_progress = None
+            if progress is not None:
+                window_progress = lambda fraction, _, i=index, s=start: progress(
+                    (i + fraction) / windows, s + fraction * window_duration)
+            with ProgressHook() as hook:
+                diarization, window_centroids = pipeline(
+                    {"waveform": waveform, "sample_rate": WINDOW_SAMPLE_RATE},
+                    hook=DiarizationProgress(hook, window_progress, cancel_token, window_duration),
+                    max_speakers=n_speakers, return_embeddings=True)
+            labels = diarization.labels()
+            speech = {label: diarization.label_duration(label) for label in labels}
+            mapping = _link_speakers(labels, window_centroids, speech, centroids, weights, n_speakers, link_threshold)
+            diarization_results.extend({'start': turn.start + start, 'end': turn.end + start, 'speaker': mapping[speaker]}
+                                       for turn, _, speaker in diarization.itertracks(yield_label=True))
+            del waveform, samples
+
+        if embeddings is not None:
+            for j, (centroid, weight) in enumerate(zip(centroids, weights)):
+                embeddings[f"SPEAKER_{j:02d}"] = [float(x) for x in centroid / max(weight, 1e-12)]
+        used_device = 'cuda' if device.type == 'cuda' else 'cpu'
+        logger.info(f"[Diarization] Windowed diarization completed on {used_device.upper()} "
+                    f"with {len(centroids)} speakers over {windows} windows.")
+        return diarization_results, used_device
+    except Exception as e:
+        logger.error(f"[Diarization] Error during diarization: {str(e)}")
+        raise
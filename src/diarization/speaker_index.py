@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    identity_id INTEGER NOT NULL REFERENCES identities(id),
+    meeting TEXT NOT NULL,
+    label TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vectors_meeting ON vectors(meeting);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def get_speaker_index_options(config):
+    options = {
+        'enabled': False,
+        'directory': 'speakers',
+        # Cosine similarity a new speaker needs to be matched to an enrolled identity
+        'threshold': 0.6,
+        'new_identity_prefix': 'Person',
+        # Use an approximate (faiss HNSW) index once this many vectors are stored, if faiss is installed
+        'ann_threshold': 100000
+    }
+    options.update(config.get('speaker_index', {}))
+    return options
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+class SpeakerIndex:
+    """Persistent store of per-meeting speaker centroids with named identities.
+
+    Each diarized speaker of a meeting adds one L2-normalized float32 row to
+    `embeddings.f32`, which is read back as a memory-mapped (rows, dim) matrix.
+    Row metadata and identity names live in SQLite; writes take an IMMEDIATE
+    transaction that also serializes appends to the vector file, so several jobs or
+    processes can identify speakers at the same time. Matching scores every stored
+    row with one matrix product per chunk of rows and keeps the best score per
+    identity; with faiss installed and `ann_threshold` rows or more, an HNSW index
+    supplies the candidate rows instead.
+    """
+
+    CHUNK_ROWS = 65536
+
+    def __init__(self, directory, threshold=0.6, new_identity_prefix='Person', ann_threshold=100000):
+        self.directory = directory
+        self.threshold = threshold
+        self.new_identity_prefix = new_identity_prefix
+        self.ann_threshold = ann_threshold
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, 'embeddings.f32')
+        self._db_path = os.path.join(directory, 'speakers.db')
+        self._local = threading.local()
+        self._ann = None
+        self._ann_rows = 0
+        self._ann_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _dim(self, connection):
+        row = connection.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        return int(row[0]) if row else None
+
+    def _row_count(self, connection):
+        return connection.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+
+    def _matrix(self, rows, dim):
+        if rows == 0:
+            return np.zeros((0, dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, dim))
+
+    def _row_identities(self, connection, rows):
+        """Identity id per stored row, -1 for rows of re-indexed meetings."""
+        owners = np.full(rows, -1, dtype=np.int64)
+        for row, identity_id in connection.execute("SELECT row, identity_id FROM vectors WHERE active = 1"):
+            owners[row] = identity_id
+        return owners
+
+    def _candidate_scores(self, queries, matrix, owners):
+        """Return (identity ids, best cosine similarity per query and identity)."""
+        identity_ids = np.unique(owners[owners >= 0])
+        if len(identity_ids) == 0:
+            return identity_ids, np.zeros((len(queries), 0), dtype=np.float32)
+        column = np.searchsorted(identity_ids, np.where(owners >= 0, owners, identity_ids[0]))
+        best = np.full((len(queries), len(identity_ids)), -np.inf, dtype=np.float32)
+
+        ann_rows = self._ann_search(queries, matrix) if len(matrix) >= self.ann_threshold else None
+        if ann_rows is not None:
+            for q, rows in enumerate(ann_rows):
+                rows = rows[(rows >= 0) & (owners[rows] >= 0)]
+                scores = matrix[rows] @ queries[q]
+                np.maximum.at(best[q], column[rows], scores)
+            return identity_ids, best
+
+        for start in range(0, len(matrix), self.CHUNK_ROWS):
+            chunk = np.asarray(matrix[start:start + self.CHUNK_ROWS])
+            active = owners[start:start + len(chunk)] >= 0
+            scores = queries @ chunk[active].T
+            columns = column[start:start + len(chunk)][active]
+            for q in range(len(queries)):
+                np.maximum.at(best[q], columns, scores[q])
+        return identity_ids, best
+
+    def _ann_search(self, queries, matrix, k=64):
+        try:
+            import faiss
+        except ImportError:
+            return None
+        with self._ann_lock:
+            if self._ann is None:
+                self._ann = faiss.IndexHNSWFlat(matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+                self._ann_rows = 0
+            # Rows are append-only, so only the new ones need adding
+            for start in range(self._ann_rows, len(matrix), self.CHUNK_ROWS):
+                self._ann.add(np.ascontiguousarray(matrix[start:start + self.CHUNK_ROWS]))
+            self._ann_rows = len(matrix)
+            _, rows = self._ann.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        return rows
+
+    def identify(self, meeting, embeddings):
+        """Map a meeting's speaker labels to identity names and enroll their centroids.
+
+        `embeddings` maps diarization labels to centroid vectors. Each label is matched
+        to the most similar enrolled identity above `threshold`, never giving two labels
+        of the same meeting the same identity; unmatched labels become new identities.
+        Re-identifying a meeting replaces its previous rows. Returns {label: name}.
+        """
+        if not embeddings:
+            return {}
+        meeting = os.path.abspath(meeting)
+        labels = sorted(embeddings)
+        queries = _normalize(np.asarray([embeddings[label] for label in labels], dtype=np.float32))
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            dim = self._dim(connection)
+            if dim is None:
+                dim = queries.shape[1]
+                connection.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+            elif dim != queries.shape[1]:
+                raise ValueError(f"Speaker embeddings have {queries.shape[1]} dimensions, the index uses {dim}")
+            rows = self._row_count(connection)
+            # A meeting's earlier rows still count for matching, so re-running it keeps its identities
+            identity_ids, best = self._candidate_scores(queries, self._matrix(rows, dim),
+                                                        self._row_identities(connection, rows))
+            assignment = self._assign(labels, identity_ids, best)
+            connection.execute("UPDATE vectors SET active = 0 WHERE meeting = ?", (meeting,))
+
+            names = dict(connection.execute("SELECT id, name FROM identities"))
+            mapping = {}
+            for i, label in enumerate(labels):
+                identity_id = assignment.get(label)
+                if identity_id is None:
+                    identity_id = self._new_identity(connection)
+                    names[identity_id] = connection.execute(
+                        "SELECT name FROM identities WHERE id = ?", (identity_id,)).fetchone()[0]
+                mapping[label] = names[identity_id]
+                connection.execute(
+                    "INSERT INTO vectors (row, identity_id, meeting, label, added_at) VALUES (?, ?, ?, ?, ?)",
+                    (rows + i, identity_id, meeting, label, time.time()))
+
+            # Still inside the transaction, so no other writer can append in between
+            with open(self.vectors_path, 'ab') as f:
+                f.seek(rows * dim * 4)
+                f.truncate()
+                f.write(queries.astype(np.float32).tobytes())
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        logger.info(f"[Speakers] {os.path.basename(meeting)}: " +
+                    ", ".join(f"{label} -> {name}" for label, name in mapping.items()))
+        return mapping
+
+    def _assign(self, labels, identity_ids, best):
+        """Greedy one-to-one matching of labels to identities by descending similarity."""
+        pairs = [(best[i, j], i, j) for i in range(len(labels)) for j in range(len(identity_ids))
+                 if best[i, j] >= self.threshold]
+        assignment = {}
+        taken = set()
+        for score, i, j in sorted(pairs, reverse=True):
+            if labels[i] in assignment or j in taken:
+                continue
+            assignment[labels[i]] = int(identity_ids[j])
+            taken.add(j)
+        return assignment
+
+    def _new_identity(self, connection):
+        number = connection.execute("SELECT COUNT(*) FROM identities").fetchone()[0] + 1
+        while True:
+            name = f"{self.new_identity_prefix} {number}"
+            try:
+                return connection.execute("INSERT INTO identities (name, created_at) VALUES (?, ?)",
+                                          (name, time.time())).lastrowid
+            except sqlite3.IntegrityError:
+                number += 1
+
+    def rename(self, old_name, new_name):
+        """Rename an identity; if `new_name` exists, merge `old_name` into it."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            old = connection.execute("SELECT id FROM identities WHERE name = ?", (old_name,)).fetchone()
+            if old is None:
+                raise KeyError(old_name)
+            existing = connection.execute("SELECT id FROM identities WHERE name = ?", (new_name,)).fetchone()
+            if existing is None:
+                connection.execute("UPDATE identities SET name = ? WHERE id = ?", (new_name, old[0]))
+            else:
+                connection.execute("UPDATE vectors SET identity_id = ? WHERE identity_id = ?", (existing[0], old[0]))
+                connection.execute("DELETE FROM identities WHERE id = ?", (old[0],))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def identities(self):
+        """[(name, number of meeting centroids)] sorted by name."""
+        return self._connection().execute(
+            "SELECT i.name, COUNT(v.row) FROM identities i "
+            "LEFT JOIN vectors v ON v.identity_id = i.id AND v.active = 1 "
+            "GROUP BY i.id ORDER BY i.name").fetchall()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_speaker_index(options):
+    """One SpeakerIndex per directory in this process."""
+    directory = os.path.abspath(options['directory'])
+    with _indexes_lock:
+        if directory not in _indexes:
+            _indexes[directory] = SpeakerIndex(directory, options['threshold'],
+                                               options['new_identity_prefix'], options['ann_threshold'])
+        return _indexes[directory]
+
+def apply_speaker_names(segments, mapping):
+    """Replace diarization labels in combined segments with identity names."""
+    return [dict(segment, speaker=mapping.get(segment['speaker'], segment['speaker'])) for segment in segments]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="List and name speakers recognised across meetings.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="List identities and how many meetings they appear in")
+    rename = subparsers.add_parser('rename', help="Rename an identity, merging it if the new name exists")
+    rename.add_argument('old_name')
+    rename.add_argument('new_name')
+    parser.add_argument('--directory', help="Index directory (default: speaker_index.directory from the config)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from utils.config_manager import get_config_manager
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    options = get_speaker_index_options(get_config_manager().config)
+    if args.directory:
+        options['directory'] = args.directory
+    index = get_speaker_index(options)
+
+    if args.command == 'list':
+        for name, meetings in index.identities():
+            print(f"{name:<30} {meetings:>5} meeting(s)")
+        return 0
+    try:
+        index.rename(args.old_name, args.new_name)
+    except KeyError:
+        logger.error(f"[Speakers] No identity named {args.old_name}")
+        return 1
+    print(f"Renamed {args.old_name} to {args.new_name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
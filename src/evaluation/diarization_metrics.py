@@ -0,0 +1,218 @@
+import os
+import json
+import logging
+import numpy as np
+from utils.viterbi_combiner import affinity_matrix
+from utils.exporters import read_jsonl_export
+
+logger = logging.getLogger(__name__)
+
+def read_rttm(path):
+    """Speaker turns [{'start', 'end', 'speaker'}] from the SPEAKER lines of an RTTM file."""
+    turns = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 8 and fields[0] == 'SPEAKER':
+                start, duration = float(fields[3]), float(fields[4])
+                turns.append({'start': start, 'end': start + duration, 'speaker': fields[7]})
+    return sorted(turns, key=lambda turn: turn['start'])
+
+def write_rttm(path, turns, file_id=None):
+    file_id = file_id or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'w', encoding='utf-8') as f:
+        for turn in turns:
+            f.write(f"SPEAKER {file_id} 1 {turn['start']:.3f} {turn['end'] - turn['start']:.3f} "
+                    f"<NA> <NA> {turn['speaker']} <NA> <NA>\n")
+
+def read_ctm(path):
+    """Reference words [{'start', 'end', 'word'}] from a CTM file (file channel start duration word ...)."""
+    words = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) >= 5 and not line.startswith(';;'):
+                start, duration = float(fields[2]), float(fields[3])
+                words.append({'start': start, 'end': start + duration, 'word': fields[4]})
+    return words
+
+def read_segments(path):
+    """Segments from JSON, JSON-lines or RTTM.
+
+    Accepts a JSON list of segments, a JSON-lines export, an RTTM file, or a
+    checkpoint unit such as `diarization.json`, which stores [segments, device].
+    """
+    if path.endswith('.rttm'):
+        return read_rttm(path)
+    if path.endswith('.jsonl'):
+        return read_jsonl_export(path)[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if len(data) == 2 and isinstance(data[0], list) and isinstance(data[1], str):
+        data = data[0]
+    return data
+
+def _intervals(segments):
+    starts = np.array([segment['start'] for segment in segments], dtype=np.float64)
+    ends = np.array([segment['end'] for segment in segments], dtype=np.float64)
+    order = np.argsort(starts, kind='stable')
+    return starts[order], ends[order], order
+
+def label_at(times, segments):
+    """Index into `segments` of the segment covering each time, -1 where none does.
+
+    Where segments overlap (overlapped speech in a reference), the latest-starting
+    one that covers the time wins, falling back to the longest-running earlier one.
+    """
+    if not segments:
+        return np.full(len(times), -1)
+    starts, ends, order = _intervals(segments)
+    # The segment with the furthest end so far covers any time its later neighbours don't
+    running = np.maximum.accumulate(ends)
+    owner = np.maximum.accumulate(np.where(ends == running, np.arange(len(ends)), 0))
+    index = np.searchsorted(starts, times, side='right') - 1
+    clipped = np.maximum(index, 0)
+    latest = (index >= 0) & (times < ends[clipped])
+    earlier = (index >= 0) & (times < running[clipped])
+    return np.where(latest, order[clipped], np.where(earlier, order[owner[clipped]], -1))
+
+def _best_mapping(counts):
+    """Hypothesis-to-reference label mapping maximizing agreeing counts (rows: reference, columns: hypothesis)."""
+    try:
+        from scipy.optimize import linear_sum_assignment
+        rows, columns = linear_sum_assignment(-counts)
+    except ImportError:
+        # Greedy on the largest cells; optimal in the usual case of a dominant diagonal
+        rows, columns, used_rows, used_columns = [], [], set(), set()
+        for flat in np.argsort(-counts, axis=None):
+            row, column = np.unravel_index(flat, counts.shape)
+            if row not in used_rows and column not in used_columns:
+                rows.append(row)
+                columns.append(column)
+                used_rows.add(row)
+                used_columns.add(column)
+    return {int(column): int(row) for row, column in zip(rows, columns)}
+
+def word_diarization_error(reference_words, reference_turns, hypothesis):
+    """Word-level diarization error rate.
+
+    Each reference word gets the reference speaker talking at its midpoint and the
+    hypothesis speaker of the combined segment covering it. Hypothesis labels are
+    mapped one-to-one onto reference labels to maximize agreement; WDER is the share
+    of words whose mapped speaker is wrong or missing. Returns (errors, words).
+    """
+    if not reference_words:
+        return 0, 0
+    midpoints = np.array([(word['start'] + word['end']) / 2 for word in reference_words])
+    reference_index = label_at(midpoints, reference_turns)
+    hypothesis_index = label_at(midpoints, hypothesis)
+    reference_labels = sorted({turn['speaker'] for turn in reference_turns})
+    hypothesis_labels = sorted({segment['speaker'] for segment in hypothesis})
+    reference_ids = np.array([reference_labels.index(turn['speaker']) for turn in reference_turns] + [-1])
+    hypothesis_ids = np.array([hypothesis_labels.index(segment['speaker']) for segment in hypothesis] + [-1])
+    reference_speaker = reference_ids[reference_index]
+    hypothesis_speaker = hypothesis_ids[hypothesis_index]
+
+    # Words in silence according to the reference can't be attributed to anyone
+    scored = reference_speaker >= 0
+    counts = np.zeros((len(reference_labels), max(1, len(hypothesis_labels))))
+    both = scored & (hypothesis_speaker >= 0)
+    np.add.at(counts, (reference_speaker[both], hypothesis_speaker[both]), 1)
+    mapping = _best_mapping(counts)
+    lookup = np.array([mapping.get(i, -2) for i in range(max(1, len(hypothesis_labels)))] + [-2])
+    mapped = lookup[hypothesis_speaker]
+    errors = int(np.count_nonzero(scored & (mapped != reference_speaker)))
+    return errors, int(np.count_nonzero(scored))
+
+def change_points(segments):
+    """Times where the speaker changes between consecutive segments (midpoint of the gap)."""
+    if len(segments) < 2:
+        return np.zeros(0)
+    starts, ends, order = _intervals(segments)
+    speakers = np.array([segments[i]['speaker'] for i in order], dtype=object)
+    changed = speakers[1:] != speakers[:-1]
+    return ((ends[:-1] + starts[1:]) / 2)[changed]
+
+def turn_boundary_matches(reference_turns, hypothesis, collar=1.0):
+    """Return (matched, reference change points, hypothesis change points).
+
+    A hypothesis change point matches the nearest reference change point within
+    `collar` seconds; each reference point is counted once.
+    """
+    reference = np.sort(change_points(reference_turns))
+    predicted = change_points(hypothesis)
+    if len(reference) == 0 or len(predicted) == 0:
+        return 0, len(reference), len(predicted)
+    index = np.clip(np.searchsorted(reference, predicted), 1, len(reference) - 1) if len(reference) > 1 \
+        else np.zeros(len(predicted), dtype=int)
+    left = reference[np.maximum(index - 1, 0)]
+    right = reference[index]
+    nearest = np.where(np.abs(predicted - left) <= np.abs(predicted - right), np.maximum(index - 1, 0), index)
+    within = np.abs(predicted - reference[nearest]) <= collar
+    return len(np.unique(nearest[within])), len(reference), len(predicted)
+
+def segment_purity(reference_turns, hypothesis):
+    """Return (pure seconds, total seconds): time of each combined segment spoken by its dominant reference speaker."""
+    if not hypothesis or not reference_turns:
+        return 0.0, 0.0
+    _, overlap = affinity_matrix(hypothesis, reference_turns)
+    total = sum(segment['end'] - segment['start'] for segment in hypothesis)
+    return float(overlap.max(axis=1).sum()), float(total)
+
+def evaluate(reference_words, reference_turns, hypothesis, collar=1.0):
+    """All metrics for one meeting, as raw counts that can be summed across a corpus."""
+    errors, words = word_diarization_error(reference_words, reference_turns, hypothesis)
+    matched, reference_changes, hypothesis_changes = turn_boundary_matches(reference_turns, hypothesis, collar)
+    pure, total = segment_purity(reference_turns, hypothesis)
+    return {
+        'word_errors': errors,
+        'words': words,
+        'matched_changes': matched,
+        'reference_changes': reference_changes,
+        'hypothesis_changes': hypothesis_changes,
+        'pure_seconds': pure,
+        'segment_seconds': total
+    }
+
+def summarize(counts):
+    """WDER, boundary precision/recall/F1 and purity from (summed) `evaluate` counts."""
+    precision = counts['matched_changes'] / counts['hypothesis_changes'] if counts['hypothesis_changes'] else 0.0
+    recall = counts['matched_changes'] / counts['reference_changes'] if counts['reference_changes'] else 0.0
+    return {
+        'wder': counts['word_errors'] / counts['words'] if counts['words'] else 0.0,
+        'boundary_precision': precision,
+        'boundary_recall': recall,
+        'boundary_f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'purity': counts['pure_seconds'] / counts['segment_seconds'] if counts['segment_seconds'] else 0.0
+    }
+
+def load_corpus(directory):
+    """Meetings of an evaluation corpus, as {name: {'words', 'turns', 'transcription', 'diarization'}}.
+
+    Each meeting `<name>` needs `<name>.rttm` (reference speakers), `<name>.ctm`
+    (reference words), `<name>.transcription.json` and `<name>.diarization.json` or
+    `<name>.diarization.rttm` (system output). A `<name>.combined.jsonl` export, if
+    present, is loaded as 'combined' so finished transcripts can be scored as they are.
+    """
+    meetings = {}
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.rttm') or filename.endswith('.diarization.rttm'):
+            continue
+        name = filename[:-len('.rttm')]
+        base = os.path.join(directory, name)
+        diarization_path = next((base + suffix for suffix in ('.diarization.json', '.diarization.rttm')
+                                 if os.path.exists(base + suffix)), None)
+        missing = [path for path in (base + '.ctm', base + '.transcription.json') if not os.path.exists(path)]
+        if missing or diarization_path is None:
+            logger.warning(f"[Evaluation] Skipping {name}: missing "
+                           f"{', '.join(os.path.basename(path) for path in missing) or 'diarization output'}")
+            continue
+        meetings[name] = {
+            'words': read_ctm(base + '.ctm'),
+            'turns': read_rttm(base + '.rttm'),
+            'transcription': read_segments(base + '.transcription.json'),
+            'diarization': read_segments(diarization_path)
+        }
+        if os.path.exists(base + '.combined.jsonl'):
+            meetings[name]['combined'] = read_segments(base + '.combined.jsonl')
+    return meetings
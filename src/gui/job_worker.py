@@ -0,0 +1,120 @@
+import time
+import queue
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+class JobWorker:
+    """Runs pipeline jobs on a background thread so the Tk event loop never blocks.
+
+    Jobs run one at a time in submission order and keep their models loaded between
+    jobs. Progress and completion are posted to a queue that `poll` drains on the Tk
+    thread through `root.after`; callbacks therefore always run on the GUI thread.
+    """
+
+    def __init__(self, root, on_progress=None, on_finished=None, on_queue_changed=None, interval_ms=100):
+        self.root = root
+        self.on_progress = on_progress or (lambda job_id, event: None)
+        self.on_finished = on_finished or (lambda job_id, job, status, payload: None)
+        self.on_queue_changed = on_queue_changed or (lambda pending, running: None)
+        self.interval_ms = interval_ms
+        self._jobs = queue.Queue()
+        self._events = queue.Queue()
+        self._ids = itertools.count(1)
+        self._pending = 0
+        self._current = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='pipeline-worker', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.root.after(self.interval_ms, self.poll)
+
+    def submit(self, job):
+        """Queue a job (the dict returned by MainWindow.get_process_result) and return its id."""
+        from pipeline.stages import CancellationToken
+        job_id = next(self._ids)
+        with self._lock:
+            self._pending += 1
+        self._jobs.put((job_id, job, CancellationToken()))
+        self._notify_queue()
+        return job_id
+
+    def cancel_current(self):
+        with self._lock:
+            current = self._current
+        if current is not None:
+            logger.info(f"[GUI] Cancelling job {current[0]}")
+            current[1].cancel()
+
+    def shutdown(self):
+        self.cancel_current()
+        self._jobs.put(None)
+
+    def _notify_queue(self):
+        with self._lock:
+            pending, running = self._pending, self._current is not None
+        self._events.put(('queue', None, (pending, running)))
+
+    def _run(self):
+        models = None
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            # Imported with the first job, so the worker never competes with the first paint;
+            # misc.warm_up_imports is what loads the pipeline ahead of time
+            from pipeline.runner import ModelCache, run_job
+            from pipeline.stages import JobCancelled
+            if models is None:
+                models = ModelCache()
+            job_id, job, token = item
+            with self._lock:
+                self._pending -= 1
+                self._current = (job_id, token)
+            self._notify_queue()
+            start_time = time.time()
+            options = {
+                'num_speakers': job['num_speakers'],
+                'diarization_model': job['diarization_model'],
+                'transcription_method': job['transcription_method'],
+                'output_directory': job['output_directory']
+            }
+            try:
+                result = run_job(job['file_path'], options, models, cancel_token=token,
+                                 on_event=lambda event: self._events.put(('progress', job_id, event)))
+                self._events.put(('finished', job_id, (job, 'done', (result, start_time))))
+            except JobCancelled:
+                self._events.put(('finished', job_id, (job, 'cancelled', None)))
+            except Exception as e:
+                logger.error(f"An error occurred: {str(e)}")
+                self._events.put(('finished', job_id, (job, 'failed', e)))
+            finally:
+                with self._lock:
+                    self._current = None
+                self._notify_queue()
+
+    def poll(self):
+        """Deliver queued events on the Tk thread and reschedule itself."""
+        latest_progress = {}
+        queue_state = None
+        try:
+            while True:
+                kind, job_id, payload = self._events.get_nowait()
+                if kind == 'progress':
+                    # Only the newest progress per job and queue state matter for repainting
+                    latest_progress[job_id] = payload
+                elif kind == 'queue':
+                    queue_state = payload
+                elif kind == 'finished':
+                    latest_progress.pop(job_id, None)
+                    self.on_finished(job_id, *payload)
+        except queue.Empty:
+            pass
+        if queue_state is not None:
+            self.on_queue_changed(*queue_state)
+        for job_id, event in latest_progress.items():
+            self.on_progress(job_id, event)
+        self.root.after(self.interval_ms, self.poll)
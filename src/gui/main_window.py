@@ -3,16 +3,21 @@ from tkinter import filedialog
 import os
 import time
 import sys
+import queue
 import subprocess
-from mutagen import File as MutagenFile
+from concurrent.futures import ThreadPoolExecutor
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import cv2
-from utils.config_manager import ConfigManager
+from utils.config_manager import get_config_manager
+from audio.media_metadata import MediaMetadataCache, get_file_browser_options, probe_duration
 
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
 class CustomFileBrowser(ttk.Treeview):
+    MEDIA_EXTENSIONS = ['.mp3', '.wav', '.m4a', '.mp4', '.avi', '.mov', '.mkv', '.flv']
+    # Rows inserted per event-loop tick, so large directories don't freeze the window
+    INSERT_BATCH = 200
+
     def __init__(self, parent, main_window, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.parent = parent
@@ -27,6 +32,14 @@ class CustomFileBrowser(ttk.Treeview):
         self.file_path = None
         self.bind("<Double-1>", self.on_double_click)
 
+        # Durations are probed on a worker pool and applied on the Tk thread by _drain_probes
+        options = get_file_browser_options(config_manager.config)
+        self.metadata_cache = MediaMetadataCache(options['metadata_cache'])
+        self._probe_pool = ThreadPoolExecutor(max_workers=max(1, options['metadata_workers']), thread_name_prefix='media-probe')
+        self._probe_results = queue.Queue()
+        self._generation = 0
+        self._pending_probes = 0
+
     def on_double_click(self, event):
         item = self.identify('item', event.x, event.y)
         if item:
@@ -34,42 +47,76 @@ class CustomFileBrowser(ttk.Treeview):
             self.main_window.select_file()
 
     def populate(self, path):
+        # Results still in flight for the previous directory are discarded
+        self._generation += 1
+        self._pending_probes = 0
         self.delete(*self.get_children())
         max_widths = {"#0": 20, "Date": 20, "Type": 10, "Size": 15, "Duration": 15}
-        
-        for item in os.listdir(path):
-            full_path = os.path.join(path, item)
-            if os.path.isfile(full_path):
-                file_type = os.path.splitext(item)[1]
-                if file_type.lower() in ['.mp3', '.wav', '.m4a', '.mp4', '.avi', '.mov', '.mkv', '.flv']:
-                    stats = os.stat(full_path)
-                    size = f"{stats.st_size / (1024 * 1024):.2f} MB"
-                    date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats.st_mtime))
-                    duration = self.get_duration(full_path)
-                    values = (date, file_type, size, duration)
-                    self.insert("", tk.END, text=item, values=values)
-                    
-                    max_widths["#0"] = min(max(max_widths["#0"], len(item)), 40)
-                    for i, col in enumerate(self["columns"]):
-                        max_widths[col] = min(max(max_widths[col], len(str(values[i]))), 30)
+
+        rows = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                file_type = os.path.splitext(entry.name)[1]
+                if file_type.lower() not in self.MEDIA_EXTENSIONS or not entry.is_file():
+                    continue
+                stats = entry.stat()
+                size = f"{stats.st_size / (1024 * 1024):.2f} MB"
+                date = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats.st_mtime))
+                hit, duration = self.metadata_cache.lookup(entry.path, stats)
+                values = (date, file_type, size, self.format_probe(duration) if hit else "...")
+                rows.append((entry.name, entry.path, stats, hit, values))
+
+                max_widths["#0"] = min(max(max_widths["#0"], len(entry.name)), 40)
+                for i, col in enumerate(self["columns"]):
+                    max_widths[col] = min(max(max_widths[col], len(str(values[i]))), 30)
 
         for col in ("#0",) + self["columns"]:
             self.column(col, width=max_widths[col]*7)
+        self._insert_rows(self._generation, rows, 0)
+
+    def _insert_rows(self, generation, rows, start):
+        if generation != self._generation:
+            return
+        for name, full_path, stats, hit, values in rows[start:start + self.INSERT_BATCH]:
+            item = self.insert("", tk.END, text=name, values=values)
+            if not hit:
+                self._pending_probes += 1
+                self._probe_pool.submit(self._probe, generation, item, full_path, stats)
+        if start + self.INSERT_BATCH < len(rows):
+            self.after(1, self._insert_rows, generation, rows, start + self.INSERT_BATCH)
+        else:
+            self.after(50, self._drain_probes, generation)
 
-    def get_duration(self, file_path):
+    def _probe(self, generation, item, file_path, stats):
+        if generation != self._generation:
+            return
         try:
-            audio = MutagenFile(file_path)
-            if hasattr(audio.info, 'length'):
-                return self.format_duration(audio.info.length)
-            
-            video = cv2.VideoCapture(file_path)
-            fps = video.get(cv2.CAP_PROP_FPS)
-            frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count / fps
-            video.release()
-            return self.format_duration(duration)
+            duration = probe_duration(file_path)
         except Exception:
-            return "N/A"
+            duration = None
+        self.metadata_cache.store(file_path, stats, duration)
+        self._probe_results.put((generation, item, duration))
+
+    def _drain_probes(self, generation):
+        if generation != self._generation:
+            return
+        while True:
+            try:
+                result_generation, item, duration = self._probe_results.get_nowait()
+            except queue.Empty:
+                break
+            if result_generation != generation:
+                continue
+            self._pending_probes -= 1
+            if self.exists(item):
+                self.set(item, "Duration", self.format_probe(duration))
+        if self._pending_probes > 0:
+            self.after(50, self._drain_probes, generation)
+        else:
+            self._probe_pool.submit(self.metadata_cache.save)
+
+    def format_probe(self, duration):
+        return "N/A" if duration is None else self.format_duration(duration)
 
     def format_duration(self, seconds):
         minutes, seconds = divmod(int(seconds), 60)
@@ -112,6 +159,9 @@ class MainWindow:
 
         self.process_started = False
         self.process_result = None
+        # Set by the application to hand jobs to a background worker
+        self.job_submitter = None
+        self.job_canceller = None
         self.create_widgets()
         self.hide_progress_bar()  # Hide progress bar initially
 
@@ -186,20 +236,25 @@ class MainWindow:
         self.progress_label = ttk.Label(self.progress_frame, text="0%")
         self.progress_label.pack(side=RIGHT)
 
-        # Start button
-        self.start_button = ttk.Button(main_frame, text='Start Processing', command=self.start_process, style='success.TButton')
-        self.start_button.pack(pady=10)
-
-        # Initial population of the file browser
-        self.populate_file_browser()
+        # Start/cancel buttons and job queue status
+        self.button_frame = ttk.Frame(main_frame)
+        self.button_frame.pack(pady=10)
+        self.start_button = ttk.Button(self.button_frame, text='Start Processing', command=self.start_process, style='success.TButton')
+        self.start_button.pack(side=LEFT, padx=(0, 10))
+        self.cancel_button = ttk.Button(self.button_frame, text='Cancel', command=self.cancel_process, style='danger.TButton', state='disabled')
+        self.cancel_button.pack(side=LEFT)
+        self.status_label = ttk.Label(main_frame, text="")
+        self.status_label.pack()
+
+        # Scan the last directory after the window has been drawn
+        self.root.after(50, self.populate_file_browser)
         
     
 
     def browse_directory(self):
         directory = filedialog.askdirectory(initialdir=self.config.get("last_directory"))
         if directory:
-            self.config["last_directory"] = directory
-            config_manager.save_config()
+            config_manager.set("last_directory", directory)
             self.file_browser.file_path = directory
             self.file_browser.populate(directory)
             self.root.update_idletasks()
@@ -209,8 +264,7 @@ class MainWindow:
         directory = filedialog.askdirectory(initialdir=self.output_directory.get())
         if directory:
             self.output_directory.set(directory)
-            self.config["output_directory"] = directory
-            config_manager.save_config()
+            config_manager.set("output_directory", directory)
 
     def select_file(self):
         selected_file = self.file_browser.get_selected_file()
@@ -229,7 +283,7 @@ class MainWindow:
         self.progress_frame.pack_forget()
 
     def show_progress_bar(self):
-        self.progress_frame.pack(fill=X, pady=10, before=self.start_button)
+        self.progress_frame.pack(fill=X, pady=10, before=self.button_frame)
         self.progress_bar['value'] = 0
         self.progress_label['text'] = "0%"
         self.root.update_idletasks()
@@ -240,7 +294,9 @@ class MainWindow:
             return
         
         self.process_started = True
-        self.show_progress_bar()  # Show progress bar when starting the process
+        if not self.progress_frame.winfo_ismapped():
+            # A running job already shows its bar; resetting it here would jump it back to 0%
+            self.show_progress_bar()
         self.process_result = {
             'file_path': self.file_path.get(),
             'num_speakers': self.num_speakers.get(),
@@ -248,21 +304,60 @@ class MainWindow:
             'transcription_method': self.transcription_method.get(),
             'output_directory': self.output_directory.get()
         }
-        self.start_button.config(state='disabled')
+        if self.job_submitter is not None:
+            # Further files can be queued while this one runs
+            self.job_submitter(self.process_result)
+        else:
+            self.start_button.config(state='disabled')
+
+    def cancel_process(self):
+        if self.job_canceller is not None:
+            self.job_canceller()
+            self.status_label.config(text="Cancelling...")
+
+    def set_queue_status(self, pending, running):
+        self.cancel_button.config(state='normal' if running else 'disabled')
+        if running:
+            if not self.progress_frame.winfo_ismapped():
+                self.show_progress_bar()
+            self.start_button.config(text='Add to Queue')
+            self.status_label.config(text=f"Running 1 job, {pending} queued" if pending else "Running 1 job")
+        else:
+            self.start_button.config(text='Start Processing')
+            self.hide_progress_bar()
+
+    def job_finished(self, file_path, status):
+        file_name = os.path.basename(file_path)
+        messages = {
+            'done': f"Finished {file_name}",
+            'cancelled': f"Cancelled {file_name}",
+            'failed': f"Failed to process {file_name}"
+        }
+        self.status_label.config(text=messages[status])
+        if status == 'failed':
+            ttk.dialogs.Messagebox.show_error(f"Processing {file_name} failed. See the log for details.", 'Error')
 
-    def update_progress(self, value):
+    def draft_ready(self):
+        # Two-pass jobs export a draft first; it can be read while the refine pass runs
+        self.status_label.config(text="Draft transcript ready, refining...")
+
+    def update_progress(self, value, eta=None):
         self.progress_bar['value'] = value
-        self.progress_label['text'] = f"{value}%"
+        if eta is None:
+            self.progress_label['text'] = f"{value}%"
+        else:
+            self.progress_label['text'] = f"{value}% (ETA {self.file_browser.format_duration(eta)})"
         self.root.update_idletasks()
 
     def change_theme(self):
         new_theme = self.theme_var.get()
         if new_theme != self.config.get('gui_theme'):
-            self.config['gui_theme'] = new_theme
-            config_manager.save_config()
+            config_manager.set('gui_theme', new_theme)
             self.restart_application()
 
     def restart_application(self):
+        # The new process reads the config file, so pending changes must be on disk first
+        config_manager.flush()
         self.root.destroy()
         current_script = sys.argv[0]
         if sys.prefix != sys.base_prefix:
@@ -282,8 +377,7 @@ class MainWindow:
         if self.config.get("last_directory") and os.path.exists(self.config["last_directory"]):
             self.file_browser.file_path = self.config["last_directory"]
         else:
-            self.config["last_directory"] = os.path.expanduser("~/Videos")
-            config_manager.save_config()
+            config_manager.set("last_directory", os.path.expanduser("~/Videos"))
             self.file_browser.file_path = self.config["last_directory"]
         
         self.file_browser.populate(self.file_browser.file_path)
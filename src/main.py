@@ -1,18 +1,11 @@
 import os
 import logging
+import threading
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
-import torch
 import time
-from audio.file_processor import process_file
-from transcription.transcriber import transcribe_audio_with_groq, create_local_model, transcribe_audio
-from diarization.diarizer import diarize_audio
-from utils.result_combiner import combine_transcription_diarization
-from utils.output_generator import create_pdf
-from utils.config_manager import ConfigManager
+from utils.config_manager import get_config_manager
 from gui.main_window import create_gui
-
-from pyannote.audio import Pipeline
+from gui.job_worker import JobWorker
 
 # Load environment variables
 load_dotenv()
@@ -20,112 +13,84 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-config_manager = ConfigManager()
+config_manager = get_config_manager()
+
+def warm_up_imports():
+    """Import the pipeline (torch, pyannote, faster-whisper, groq) in the background after the first paint."""
+    def run():
+        started = time.perf_counter()
+        try:
+            import pipeline.runner  # noqa: F401
+            logging.info(f"Pipeline modules imported in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            logging.warning(f"Background import of pipeline modules failed: {str(e)}")
+
+    threading.Thread(target=run, name="import-warmup", daemon=True).start()
+
+def report_first_paint(root):
+    # Used by benchmarks/startup.py: draw the window once, report and exit
+    root.update()
+    print("FIRST_PAINT", flush=True)
+    root.destroy()
 
-def update_progress(window, progress):
-    window.update_progress(progress)
+def update_progress(window, event):
+    window.update_progress(int(event.overall * 100), event.overall_eta)
+    if event.stage == 'refine' and event.status == 'started':
+        window.draft_ready()
 
 def main():
     try:
         # Create GUI
         window, root = create_gui()
-        
-        # Start GUI main loop and periodically check if process has started
-        root.after(100, lambda: check_process_start(window, root))
+
+        # Pipeline jobs run on a worker thread; its events are drained on the Tk thread via root.after
+        worker = JobWorker(
+            root,
+            on_progress=lambda job_id, event: update_progress(window, event),
+            on_finished=lambda job_id, job, status, payload: job_finished(window, job, status, payload),
+            on_queue_changed=window.set_queue_status
+        )
+        window.job_submitter = lambda job: submit_job(worker, job)
+        window.job_canceller = worker.cancel_current
+        worker.start()
+        # After the worker has started, so benchmarks/startup.py also measures what it costs
+        if os.getenv('MEETNOTE_STARTUP_PROBE'):
+            report_first_paint(root)
+            return
+        if config_manager.config['misc'].get('warm_up_imports', True):
+            root.after(200, warm_up_imports)
         root.mainloop()
+        worker.shutdown()
         
     except Exception as e:
         logging.error(f"An error occurred: {str(e)}")
         raise
 
-def check_process_start(window, root):
-    if window.process_started:
-        # Process has started, begin actual processing
-        process(window, root)
+def submit_job(worker, user_input):
+    # Update config with the new output directory
+    config_manager.set('output_directory', user_input['output_directory'])
+    job_id = worker.submit(user_input)
+    logging.info(f"Queued job {job_id}: {user_input['file_path']}")
+
+def job_finished(window, user_input, status, payload):
+    window.job_finished(user_input['file_path'], status)
+    if status == 'cancelled':
+        logging.info(f"Processing of {user_input['file_path']} was cancelled.")
+        return
+    if status == 'failed':
+        return
+
+    result, start_time = payload
+    config = config_manager.config
+    print(f"\nDiarization was performed on: {result['diarization_device'].upper()}")
+    if user_input['transcription_method'] == 'groq':
+        print("Transcription was performed using Groq API.")
     else:
-        # Check again after 100ms
-        root.after(100, lambda: check_process_start(window, root))
-
-def process(window, root):
-    try:
-        # Get user input through GUI
-        user_input = window.get_process_result()
-        if user_input is None:
-            logging.info("User cancelled the operation or closed the GUI without starting the process.")
-            return
-
-        start_time = time.time()
-        file_path = user_input['file_path']
-        num_speakers = user_input['num_speakers']
-        pipeline_model = f"pyannote/{user_input['diarization_model']}"
-        transcription_method = user_input['transcription_method']
-        output_directory = user_input['output_directory']
-
-        # Update config with the new output directory
-        config = config_manager.config
-        config['output_directory'] = output_directory
-        config_manager.save_config()
-
-        # Process the input file
-        update_progress(window, 10)
-        processed_file = process_file(file_path)
-
-        # Initialize pipeline
-        hugging_face_token = os.getenv('HUGGING_FACE_AUTH_TOKEN')
-        if not hugging_face_token:
-            raise ValueError("HUGGING_FACE_AUTH_TOKEN not found in environment variables")
-        pipeline = Pipeline.from_pretrained(pipeline_model, use_auth_token=hugging_face_token)
-
-        update_progress(window, 20)
-
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            if transcription_method == 'groq':
-                # Run diarization and Groq transcription concurrently
-                diarization_future = executor.submit(diarize_audio, pipeline, processed_file, num_speakers)
-                transcription_future = executor.submit(transcribe_audio_with_groq, processed_file)
+        print(f"Transcription was performed on: {result['transcription_device'].upper()}")
+        print(f"Using local model: {config['model_options']['local']['model']}")
 
-                # Wait for both tasks to complete
-                diarization, diarization_device = diarization_future.result()
-                transcription = transcription_future.result()
-
-                print(f"\nDiarization was performed on: {diarization_device.upper()}")
-                print("Transcription was performed using Groq API.")
-            else:
-                # For local transcription, keep the sequential process
-                diarization, diarization_device = diarize_audio(pipeline, processed_file, num_speakers)
-                update_progress(window, 40)
-                model_whisper, whisper_device = create_local_model(config)
-                transcription = transcribe_audio(model_whisper, processed_file)
-
-                print(f"\nDiarization was performed on: {diarization_device.upper()}")
-                print(f"Transcription was performed on: {whisper_device.upper()}")
-                print(f"Using local model: {config['model_options']['local']['model']}")
-
-        # Clear CUDA cache after diarization if GPU was used
-        if config['use_cuda'] and torch.cuda.is_available():
-            torch.cuda.empty_cache()
-
-        update_progress(window, 60)
-
-        # Combine transcription and diarization information
-        final_transcription = combine_transcription_diarization(transcription, diarization, pipeline_model)
-
-        update_progress(window, 80)
-
-        # Create PDF from the final transcription
-        output_pdf = create_pdf(final_transcription, file_path)
-
-        update_progress(window, 100)
-
-        # Print final confirmation, transcription text, and elapsed time
-        print_results(final_transcription, output_pdf, start_time)
-
-        # Close the GUI
-        root.quit()
-
-    except Exception as e:
-        logging.error(f"An error occurred: {str(e)}")
-        raise
+    # Print final confirmation, transcription text, and elapsed time
+    print_results(result['final_transcription'], result['output_pdf'], start_time)
 
 def print_results(final_transcription, output_pdf, start_time):
     logging.info(f"Transcription PDF saved as {output_pdf}")
@@ -139,4 +104,4 @@ def print_results(final_transcription, output_pdf, start_time):
     logging.info(f"Script executed in {time.time() - start_time:.2f} seconds.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,226 @@
+import os
+import sys
+import glob
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from dotenv import load_dotenv
+from audio.file_processor import is_supported_file
+from utils.output_generator import get_output_pdf_path
+from utils.exporters import parse_formats
+from utils.config_manager import get_config_manager
+from pipeline.runner import ModelCache, run_job, resolve_job_options, expected_job_seconds
+from pipeline.job_history import get_job_history_options, schedule_key, parse_deadline, SCHEDULES
+
+logger = logging.getLogger(__name__)
+
+def discover_inputs(patterns, recursive=False):
+    """Expand files, directories and glob patterns into a sorted list of supported media files."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                for root, _, files in os.walk(pattern):
+                    found.update(os.path.join(root, f) for f in files)
+            else:
+                found.update(os.path.join(pattern, f) for f in os.listdir(pattern))
+        elif os.path.isfile(pattern):
+            found.add(pattern)
+        else:
+            found.update(glob.glob(pattern, recursive=True))
+    return sorted(os.path.abspath(p) for p in found if os.path.isfile(p) and is_supported_file(p))
+
+class BatchJobQueue:
+    """A job queue served by long-lived worker threads.
+
+    Each worker owns a ModelCache, so models are loaded once per worker and reused
+    for every job it picks up. `on_result`, if given, is called on the worker thread
+    with each job's result entry as soon as it finishes.
+
+    `schedule` orders waiting jobs: 'fifo' in submission order, 'sjf' shortest
+    expected job first (predicted from the job history), which lowers the mean
+    turnaround of mixed-length batches, or 'deadline' earliest deadline first.
+    """
+
+    def __init__(self, num_workers=1, job_runner=run_job, on_result=None, schedule='fifo'):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {', '.join(SCHEDULES)}")
+        self.num_workers = max(1, num_workers)
+        self.job_runner = job_runner
+        self.on_result = on_result
+        self.schedule = schedule
+        self._queue = queue.PriorityQueue()
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+        self._results = []
+        self._results_lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"batch-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _put(self, key, job):
+        with self._counter_lock:
+            self._counter += 1
+            self._queue.put(key + (self._counter, job))
+
+    def submit(self, file_path, options, deadline=None):
+        expected = expected_job_seconds(file_path, options) if self.schedule != 'fifo' else None
+        self._put(schedule_key(self.schedule, expected, deadline), (file_path, options, expected))
+
+    def _worker_loop(self):
+        models = ModelCache()
+        while True:
+            job = self._queue.get()[-1]
+            if job is None:
+                self._queue.task_done()
+                break
+            file_path, options, expected = job
+            entry = self._run_one(file_path, options, models)
+            if expected is not None:
+                entry['expected_seconds'] = expected
+            self._record(entry)
+            self._queue.task_done()
+
+    def _run_one(self, file_path, options, models):
+        worker = threading.current_thread().name
+        logger.info(f"[Batch] {worker} processing {file_path}")
+        start = time.perf_counter()
+        try:
+            result = self.job_runner(file_path, options, models)
+            return {
+                'file': file_path,
+                'status': 'done',
+                'output': result['output_pdf'],
+                'exports': result.get('exports', {}),
+                'seconds': time.perf_counter() - start,
+                'timings': result['timings'],
+                'latency': result.get('latency'),
+                'memory': result.get('memory')
+            }
+        except Exception as e:
+            logger.error(f"[Batch] Failed to process {file_path}: {str(e)}")
+            return {'file': file_path, 'status': 'failed', 'seconds': time.perf_counter() - start, 'error': str(e)}
+
+    def _record(self, entry):
+        with self._results_lock:
+            self._results.append(entry)
+        if self.on_result is not None:
+            self.on_result(entry)
+
+    def join(self):
+        """Wait for queued jobs to finish, stop the workers and return the collected results."""
+        for _ in self._workers:
+            # Sorts after every job, whatever the schedule
+            self._put((float('inf'), float('inf')), None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+        with self._results_lock:
+            return list(self._results)
+
+def run_batch(files, options, num_workers=1, skip_existing=True, job_runner=run_job, schedule=None, deadlines=None):
+    """Process `files` and return one result entry per file.
+
+    `schedule` defaults to job_history.schedule; `deadlines` maps file paths to Unix
+    timestamps for the 'deadline' schedule.
+    """
+    options = resolve_job_options(options)
+    schedule = schedule or get_job_history_options(get_config_manager().config)['schedule']
+    deadlines = {os.path.abspath(path): deadline for path, deadline in (deadlines or {}).items()}
+    job_queue = BatchJobQueue(num_workers, job_runner, schedule=schedule)
+    skipped = []
+    for file_path in files:
+        output_pdf = get_output_pdf_path(file_path, options['output_directory'])
+        if skip_existing and os.path.exists(output_pdf):
+            logger.info(f"[Batch] Skipping {file_path}, output already exists")
+            skipped.append({'file': file_path, 'status': 'skipped', 'output': output_pdf, 'seconds': 0.0})
+            continue
+        job_queue.submit(file_path, options, deadlines.get(os.path.abspath(file_path)))
+    # Workers start once every file is queued, so the first jobs picked are already in schedule order
+    job_queue.start()
+    return skipped + job_queue.join()
+
+def load_deadlines(path):
+    """Read a JSON object mapping file paths to deadlines (Unix timestamps or ISO 8601 strings)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return {file_path: parse_deadline(deadline) for file_path, deadline in json.load(f).items()}
+
+def write_report(results, report_path, wall_time):
+    summary = {
+        'total': len(results),
+        'done': sum(1 for r in results if r['status'] == 'done'),
+        'skipped': sum(1 for r in results if r['status'] == 'skipped'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'wall_seconds': wall_time,
+        'files': results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe and diarize recordings without the GUI.")
+    parser.add_argument('inputs', nargs='+', help="Files, directories or glob patterns")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="Number of concurrent jobs")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Descend into subdirectories")
+    parser.add_argument('-o', '--output-directory', help="Defaults to output_directory from the config")
+    parser.add_argument('--method', dest='transcription_method', choices=['groq', 'local'], default='groq')
+    parser.add_argument('--num-speakers', type=int, default=2)
+    parser.add_argument('--diarization-model', default='speaker-diarization-3.0')
+    parser.add_argument('--combine-method', default='semantic')
+    parser.add_argument('--profile', choices=['sampling', 'cprofile'],
+                        help="Profile every stage and write the results next to each transcript")
+    parser.add_argument('--formats', type=parse_formats,
+                        help="Comma-separated transcript formats to write besides the PDF (srt, vtt, jsonl, md)")
+    parser.add_argument('--overwrite', action='store_true', help="Reprocess files whose output already exists")
+    parser.add_argument('--schedule', choices=SCHEDULES,
+                        help="Job order: fifo, sjf (shortest expected job first) or deadline "
+                             "(default: job_history.schedule from the config)")
+    parser.add_argument('--deadlines', help="JSON file mapping input paths to deadlines for --schedule deadline")
+    parser.add_argument('--report', help="Summary report path (default: <output_directory>/batch_report_<time>.json)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    files = discover_inputs(args.inputs, recursive=args.recursive)
+    if not files:
+        logger.error("[Batch] No supported media files found.")
+        return 1
+
+    options = resolve_job_options({
+        'num_speakers': args.num_speakers,
+        'diarization_model': args.diarization_model,
+        'transcription_method': args.transcription_method,
+        'combine_method': args.combine_method,
+        'output_directory': args.output_directory,
+        'profile': args.profile,
+        'formats': args.formats
+    })
+    deadlines = load_deadlines(args.deadlines) if args.deadlines else None
+    logger.info(f"[Batch] Processing {len(files)} file(s) with {args.workers} worker(s)")
+
+    start = time.perf_counter()
+    results = run_batch(files, options, num_workers=args.workers, skip_existing=not args.overwrite,
+                        schedule=args.schedule, deadlines=deadlines)
+    wall_time = time.perf_counter() - start
+
+    report_path = args.report or os.path.join(options['output_directory'],
+                                              f"batch_report_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    summary = write_report(results, report_path, wall_time)
+    logger.info(f"[Batch] Done: {summary['done']}, skipped: {summary['skipped']}, failed: {summary['failed']} "
+                f"in {wall_time:.2f} seconds. Report saved as {report_path}")
+    return 1 if summary['failed'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
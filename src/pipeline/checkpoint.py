@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from utils.atomic_io import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+def get_checkpoint_options(config):
+    options = {
+        'enabled': False,
+        'directory': 'checkpoints',
+        'chunk_seconds': 600,
+        'max_age_days': 7
+    }
+    options.update(config.get('checkpointing', {}))
+    return options
+
+def checkpoint_key(file_path, params):
+    """Identify a job by its input file (path, size, mtime) and every parameter that affects the output."""
+    stats = os.stat(file_path)
+    identity = {
+        'path': os.path.abspath(file_path),
+        'size': stats.st_size,
+        'mtime_ns': stats.st_mtime_ns,
+        'params': params
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+class JobCheckpoint:
+    """Directory of atomically written units of work for one job.
+
+    Units are JSON files (`save` / `load`); a rerun of the same input and parameters
+    maps to the same directory and picks up every unit that was completed. The
+    directory also holds intermediate files such as audio chunks (`path_for`).
+    """
+
+    def __init__(self, root, file_path, params, chunk_seconds=600):
+        self.key = checkpoint_key(file_path, params)
+        self.chunk_seconds = chunk_seconds
+        self.directory = os.path.join(root, self.key)
+        os.makedirs(self.directory, exist_ok=True)
+        # Touch so garbage collection sees the job as recent
+        os.utime(self.directory)
+
+    def path_for(self, name):
+        return os.path.join(self.directory, name)
+
+    def _unit_path(self, name):
+        return self.path_for(f"{name}.json")
+
+    def save(self, name, data):
+        atomic_write_json(self._unit_path(name), data)
+
+    def load(self, name):
+        path = self._unit_path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"[Checkpoint] Ignoring unreadable unit {path}")
+            return None
+
+    def completed_units(self, prefix=''):
+        return sorted(f[:-len('.json')] for f in os.listdir(self.directory)
+                      if f.startswith(prefix) and f.endswith('.json'))
+
+    def complete(self):
+        """Remove the checkpoint once the job's outputs are written."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logger.info(f"[Checkpoint] Removed checkpoint {self.key}")
+
+def collect_garbage(root, max_age_days):
+    """Delete checkpoints of jobs that haven't been touched for `max_age_days`."""
+    if not os.path.isdir(root) or not max_age_days:
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"[Checkpoint] Removed {removed} obsolete checkpoint(s) from {root}")
+    return removed
+
+def create_checkpoint(config, file_path, params):
+    """Return a JobCheckpoint if checkpointing is enabled in the config, otherwise None."""
+    options = get_checkpoint_options(config)
+    if not options['enabled']:
+        return None
+    collect_garbage(options['directory'], options['max_age_days'])
+    params = dict(params, chunk_seconds=options['chunk_seconds'])
+    checkpoint = JobCheckpoint(options['directory'], file_path, params, options['chunk_seconds'])
+    units = checkpoint.completed_units()
+    if units:
+        logger.info(f"[Checkpoint] Resuming {file_path} with {len(units)} completed unit(s)")
+    return checkpoint
@@ -0,0 +1,259 @@
+import os
+import time
+import sqlite3
+import logging
+import datetime
+import threading
+from pipeline.two_pass import get_two_pass_options, refine_method
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    finished_at REAL NOT NULL,
+    audio_seconds REAL NOT NULL,
+    transcription_method TEXT NOT NULL,
+    model TEXT NOT NULL,
+    device TEXT NOT NULL,
+    combine_method TEXT NOT NULL,
+    wall_seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_profile ON jobs(transcription_method, model, device, combine_method);
+CREATE TABLE IF NOT EXISTS stages (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    wall_seconds REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+# Profile columns matched when predicting, most specific first; the last level uses every past job
+PROFILE_LEVELS = (
+    ('transcription_method', 'model', 'device', 'combine_method'),
+    ('transcription_method', 'device'),
+    ()
+)
+SCHEDULES = ('fifo', 'sjf', 'deadline')
+
+def get_job_history_options(config):
+    options = {
+        'enabled': True,
+        'path': 'history/jobs.db',
+        # Most recent matching jobs a prediction is fitted to
+        'window': 50,
+        # Older jobs are dropped once the history holds this many
+        'max_jobs': 5000,
+        # Default order of batch and service queues: 'fifo', 'sjf' (shortest expected job first) or 'deadline'
+        'schedule': 'fifo'
+    }
+    options.update(config.get('job_history', {}))
+    return options
+
+def job_profile(options, config, device):
+    """What a job's stage durations depend on besides the audio duration; `options` are resolved job options."""
+    method = options['transcription_method']
+    model = config['model_options']['groq' if method == 'groq' else 'local']['model']
+    two_pass_options = get_two_pass_options(config)
+    if two_pass_options['enabled']:
+        refine = refine_method(two_pass_options, options)
+        model = f"{two_pass_options['draft_model']}+{config['model_options'][refine]['model']}"
+    return {
+        'transcription_method': method,
+        'model': model,
+        'device': device,
+        'combine_method': options['combine_method']
+    }
+
+def fit_duration(samples):
+    """Least-squares `seconds = fixed + rate * audio_seconds` over (audio_seconds, seconds) samples.
+
+    Both terms are kept non-negative: a negative rate falls back to the mean, a
+    negative fixed cost to a line through the origin. A single sample, or samples
+    of equal length, scale with the audio duration.
+    """
+    count = len(samples)
+    mean_x = sum(x for x, _ in samples) / count
+    mean_y = sum(y for _, y in samples) / count
+    variance = sum((x - mean_x) ** 2 for x, _ in samples)
+    if variance > 0:
+        rate = sum((x - mean_x) * (y - mean_y) for x, y in samples) / variance
+        if rate < 0:
+            return mean_y, 0.0
+        fixed = mean_y - rate * mean_x
+        if fixed >= 0:
+            return fixed, rate
+        return 0.0, sum(x * y for x, y in samples) / sum(x * x for x, _ in samples)
+    if mean_x > 0:
+        return 0.0, mean_y / mean_x
+    return mean_y, 0.0
+
+def parse_deadline(value):
+    """Deadline as a Unix timestamp, from a number or an ISO 8601 string; None stays None."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+def schedule_key(schedule, expected_seconds=None, deadline=None):
+    """Sort key of a queued job under `schedule`; callers append a submission counter to keep ties in order.
+
+    Jobs without an expected duration run after those with one under 'sjf', jobs
+    without a deadline after those with one under 'deadline' (shortest first among
+    equal deadlines).
+    """
+    unknown = float('inf')
+    expected = unknown if expected_seconds is None else expected_seconds
+    if schedule == 'sjf':
+        return (expected, 0.0)
+    if schedule == 'deadline':
+        return (unknown if deadline is None else deadline, expected)
+    return (0.0, 0.0)
+
+class JobHistory:
+    """SQLite store of finished jobs: audio duration, profile and per-stage wall time.
+
+    `predict` fits each stage's duration as a fixed cost plus a rate per second of
+    audio to the most recent jobs with the same profile, widening the match to the
+    transcription method and device, then to all jobs, when there are none. Like the
+    transcript store it runs in WAL mode with one connection per thread, so batch
+    workers and service jobs can record concurrently.
+    """
+
+    def __init__(self, path, max_jobs=5000):
+        self.path = path
+        self.max_jobs = max_jobs
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return connection
+
+    def record(self, profile, audio_seconds, timings, wall_seconds, source=None):
+        """Store a finished job; `timings` maps stage names to wall seconds."""
+        connection = self._connect()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            job_id = connection.execute(
+                "INSERT INTO jobs (source, finished_at, audio_seconds, transcription_method, model, device, "
+                "combine_method, wall_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, time.time(), audio_seconds, profile['transcription_method'], profile['model'],
+                 profile['device'], profile['combine_method'], wall_seconds)).lastrowid
+            connection.executemany("INSERT INTO stages (job_id, stage, wall_seconds) VALUES (?, ?, ?)",
+                                   [(job_id, stage, seconds) for stage, seconds in timings.items()])
+            connection.execute("DELETE FROM jobs WHERE id <= ?", (job_id - self.max_jobs,))
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.warning(f"[History] Could not record job for {source}: {str(e)}")
+
+    def predict(self, profile, audio_seconds, window=50):
+        """Predicted seconds per stage and in total for a job, or None without any history.
+
+        Returns a dict with `stages`, `total`, the number of past `jobs` it is based on
+        and the profile columns they `matched`.
+        """
+        connection = self._connect()
+        try:
+            for keys in PROFILE_LEVELS:
+                where = ' AND '.join(f"{key} = ?" for key in keys) or '1'
+                jobs = connection.execute(
+                    f"SELECT id, audio_seconds, wall_seconds FROM jobs WHERE {where} ORDER BY id DESC LIMIT ?",
+                    [profile[key] for key in keys] + [window]).fetchall()
+                if jobs:
+                    break
+            else:
+                return None
+            durations = {job_id: duration for job_id, duration, _ in jobs}
+            placeholders = ','.join('?' * len(jobs))
+            rows = connection.execute(f"SELECT job_id, stage, wall_seconds FROM stages WHERE job_id IN ({placeholders})",
+                                      list(durations)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"[History] Could not read job history: {str(e)}")
+            return None
+
+        samples = {}
+        for job_id, stage, seconds in rows:
+            samples.setdefault(stage, []).append((durations[job_id], seconds))
+        stages = {}
+        for stage, stage_samples in samples.items():
+            fixed, rate = fit_duration(stage_samples)
+            stages[stage] = fixed + rate * audio_seconds
+        fixed, rate = fit_duration([(duration, seconds) for _, duration, seconds in jobs])
+        return {'stages': stages, 'total': fixed + rate * audio_seconds, 'jobs': len(jobs), 'matched': keys}
+
+class EtaTracker:
+    """Remaining seconds of a running job from predicted stage durations and its progress events.
+
+    A stage still to run counts its predicted duration and a finished one nothing. A
+    running stage without progress counts what is left of its prediction; once it
+    reports progress, its expected duration moves from the prediction towards the
+    observed rate as the fraction grows. Stages run side by side, so the job's
+    remaining time is the longest chain of dependent stages.
+    """
+
+    def __init__(self, stages, predicted):
+        self.deps = {name: stage.deps for name, stage in stages.items()}
+        self.predicted = predicted
+        self.started = {}
+        self.fractions = {}
+        self.done = set()
+
+    def _remaining(self, name, now):
+        if name in self.done:
+            return 0.0
+        predicted = self.predicted.get(name, 0.0)
+        if name not in self.started:
+            return predicted
+        elapsed = now - self.started[name]
+        fraction = self.fractions.get(name, 0.0)
+        if fraction <= 0:
+            return max(predicted - elapsed, 0.0)
+        # (1 - fraction) * predicted + fraction * (elapsed / fraction): prediction and observed rate, by progress
+        expected = (1 - fraction) * predicted + elapsed
+        return (1 - fraction) * expected
+
+    def update(self, event):
+        now = time.perf_counter()
+        if event.status == 'started':
+            self.started[event.stage] = now
+        elif event.status == 'done':
+            self.done.add(event.stage)
+        else:
+            self.fractions[event.stage] = event.fraction
+
+        finish = {}
+
+        def finish_time(name):
+            if name not in finish:
+                finish[name] = max((finish_time(dep) for dep in self.deps[name]), default=0.0) + \
+                    self._remaining(name, now)
+            return finish[name]
+
+        return max((finish_time(name) for name in self.deps), default=0.0)
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+def get_job_history(options):
+    """One JobHistory per database path in this process."""
+    path = os.path.abspath(options['path'])
+    with _histories_lock:
+        if path not in _histories:
+            _histories[path] = JobHistory(path, options['max_jobs'])
+        return _histories[path]
@@ -0,0 +1,204 @@
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Rough per-component costs used to plan a job; all per second of audio unless noted
+FLOAT32 = 4
+PYANNOTE_RATE = 16000
+WHISPER_RATE = 16000
+# faster-whisper keeps the 16 kHz samples and the 80-bin log-mel features (100 frames/s)
+WHISPER_BYTES_PER_SECOND = WHISPER_RATE * FLOAT32 + 80 * 100 * FLOAT32
+SEGMENTS_PER_MINUTE = 15
+# Segment dicts of the transcription, diarization and combined results together
+RESULT_BYTES_PER_SEGMENT = 3 * 1024
+# fpdf page buffers, fonts and the rendered output, per transcript segment
+PDF_BYTES_PER_SEGMENT = 6 * 1024
+# Fallback bitrate to estimate the duration of files without readable metadata
+FALLBACK_BYTES_PER_SECOND = 16 * 1024
+# ffmpeg runs out of process; what stays in ours while streaming chunks
+STREAMING_OVERHEAD = 64 * MB
+
+def get_memory_budget_options(config):
+    options = {
+        'enabled': False,
+        # Memory all running jobs together may use; 0 uses 80% of physical memory
+        'budget_mb': 0,
+        # Memory held per running job for its loaded models (Whisper and pyannote)
+        'model_reserve_mb': 4096,
+        # Window length for windowed diarization and transcription of long files
+        'window_seconds': 1800.0,
+        # 'queue' waits for running jobs to free memory, 'refuse' fails the job at once
+        'on_exceed': 'queue',
+        'spill_directory': 'cache/spill'
+    }
+    options.update(config.get('memory_budget', {}))
+    return options
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+def physical_memory():
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def budget_bytes(options):
+    if options['budget_mb']:
+        return int(options['budget_mb'] * MB)
+    total = physical_memory()
+    return int(total * 0.8) if total else None
+
+class MemoryPlan:
+    """How one job runs within the budget, and the memory it is expected to need.
+
+    `low_memory` switches every stage to its windowed or streaming variant:
+    diarization and local transcription decode `window_seconds` at a time, Groq
+    chunks are cut by ffmpeg instead of pydub, and the PDF is rendered chunk by chunk
+    through `spill_directory`. `components` holds the estimate per part in bytes.
+    """
+
+    def __init__(self, duration, low_memory, window_seconds, components, spill_directory=None):
+        self.duration = duration
+        self.low_memory = low_memory
+        self.window_seconds = window_seconds if low_memory else None
+        self.components = components
+        self.spill_directory = spill_directory if low_memory else None
+
+    @property
+    def estimate(self):
+        return sum(self.components.values())
+
+    def to_dict(self):
+        return {
+            'duration': self.duration,
+            'low_memory': self.low_memory,
+            'window_seconds': self.window_seconds,
+            'estimate_mb': self.estimate / MB,
+            'components_mb': {name: value / MB for name, value in self.components.items()}
+        }
+
+def estimate_components(duration, transcription_method, model_reserve, sample_rate=None, channels=None,
+                        low_memory=False, window_seconds=None, chunk_blocks=2000):
+    """Estimated peak bytes per part of a job; diarization and transcription run concurrently, so they add up."""
+    sample_rate = sample_rate or 44100
+    channels = channels or 2
+    segments = duration / 60 * SEGMENTS_PER_MINUTE
+    span = min(duration, window_seconds) if low_memory else duration
+    components = {'models': model_reserve}
+    if low_memory:
+        # A decoded 16 kHz window plus pyannote's own resampled copy and batch buffers
+        components['diarization'] = span * PYANNOTE_RATE * FLOAT32 * 3
+    else:
+        # torchaudio decodes the whole file at its native rate as float32, then pyannote resamples
+        components['diarization'] = duration * (sample_rate * channels * FLOAT32 + PYANNOTE_RATE * FLOAT32 * 2)
+    if transcription_method == 'groq':
+        # pydub holds the whole file as 16-bit PCM at its native rate
+        components['transcription'] = STREAMING_OVERHEAD if low_memory else duration * sample_rate * channels * 2
+    else:
+        components['transcription'] = span * WHISPER_BYTES_PER_SECOND
+    components['results'] = segments * RESULT_BYTES_PER_SEGMENT
+    # Low-memory mode renders the PDF one chunk of `chunk_blocks` at a time
+    components['pdf'] = (min(segments, chunk_blocks) if low_memory else segments) * PDF_BYTES_PER_SEGMENT
+    return components
+
+def plan_job(file_path, options, transcription_method, chunk_blocks=2000):
+    """Pick the normal or the low-memory variant of a job so its estimate fits the budget.
+
+    Raises MemoryBudgetExceeded if even the low-memory variant cannot fit.
+    """
+    from audio.file_processor import probe_audio
+    duration, sample_rate, channels = probe_audio(file_path)
+    if not duration:
+        duration = os.path.getsize(file_path) / FALLBACK_BYTES_PER_SECOND
+        logger.info(f"[Memory] No duration in {file_path}, assuming {duration:.0f}s from its size")
+    budget = budget_bytes(options)
+    model_reserve = options['model_reserve_mb'] * MB
+    window_seconds = options['window_seconds']
+
+    components = estimate_components(duration, transcription_method, model_reserve, sample_rate, channels,
+                                     chunk_blocks=chunk_blocks)
+    if budget is None or sum(components.values()) <= budget:
+        return MemoryPlan(duration, False, window_seconds, components)
+    components = estimate_components(duration, transcription_method, model_reserve, sample_rate, channels,
+                                     True, window_seconds, chunk_blocks)
+    plan = MemoryPlan(duration, True, window_seconds, components, options['spill_directory'])
+    if plan.estimate > budget:
+        raise MemoryBudgetExceeded(f"{file_path} needs about {plan.estimate / MB:.0f} MB even in low-memory mode, "
+                                   f"the budget is {budget / MB:.0f} MB")
+    logger.info(f"[Memory] {os.path.basename(file_path)} ({duration / 3600:.1f}h) runs in low-memory mode "
+                f"with {window_seconds:.0f}s windows, estimated {plan.estimate / MB:.0f} MB")
+    return plan
+
+class MemoryBudget:
+    """Admits jobs while the sum of their estimates fits the budget.
+
+    `reserve` blocks until enough of the budget is free (or raises with
+    `on_exceed: refuse`); use the returned reservation as a context manager to give
+    the memory back when the job ends.
+    """
+
+    def __init__(self, budget, on_exceed='queue'):
+        self.budget = budget
+        self.on_exceed = on_exceed
+        self.reserved = 0
+        self._condition = threading.Condition()
+
+    def reserve(self, amount, cancel_token=None, label=''):
+        amount = min(amount, self.budget)
+        with self._condition:
+            waiting = False
+            while self.reserved and self.reserved + amount > self.budget:
+                if self.on_exceed == 'refuse':
+                    raise MemoryBudgetExceeded(f"{label} needs about {amount / MB:.0f} MB, only "
+                                               f"{(self.budget - self.reserved) / MB:.0f} MB of the budget is free")
+                if not waiting:
+                    logger.info(f"[Memory] {label} waiting for {amount / MB:.0f} MB "
+                                f"({self.reserved / MB:.0f} of {self.budget / MB:.0f} MB in use)")
+                    waiting = True
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                self._condition.wait(timeout=0.5)
+            self.reserved += amount
+        return _Reservation(self, amount)
+
+    def release(self, amount):
+        with self._condition:
+            self.reserved -= amount
+            self._condition.notify_all()
+
+class _Reservation:
+    def __init__(self, budget, amount):
+        self.budget = budget
+        self.amount = amount
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.budget.release(self.amount)
+        return False
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_memory_budget(options):
+    """The process-wide MemoryBudget shared by all workers, or None if no budget can be determined."""
+    global _budget
+    budget = budget_bytes(options)
+    if budget is None:
+        return None
+    with _budget_lock:
+        # Recreated if the budget settings change; jobs holding the old one release into it
+        if _budget is None or (_budget.budget, _budget.on_exceed) != (budget, options['on_exceed']):
+            _budget = MemoryBudget(budget, options['on_exceed'])
+        return _budget
@@ -0,0 +1,609 @@
+import os
+import time
+import logging
+import gc
+import weakref
+import tempfile
+import threading
+import contextlib
+import torch
+from audio.file_processor import process_file, get_audio_duration, get_stream_duration, decode_window, cut_audio_chunk
+from transcription.transcriber import transcribe_audio_with_groq, create_local_model, transcribe_audio
+from diarization.diarizer import diarize_audio, diarize_audio_windowed
+from utils.result_combiner import combine_transcription_diarization, stream_transcription_diarization, COMBINER_MODULES
+from utils.output_generator import create_pdf, get_output_pdf_path, get_pdf_options
+from utils.exporters import export_transcript, EXPORTERS
+from utils.config_manager import get_config_manager
+from utils.telemetry import create_recorder, measure, PeakRssSampler
+from utils.profiler import create_profiler
+from pipeline.stage_executor import get_stage_executor_options, LocalStageExecutor
+from pipeline.stages import Stage, StageGraph, JobCancelled
+from pipeline.checkpoint import create_checkpoint
+from pipeline.memory_budget import get_memory_budget_options, get_memory_budget, plan_job, MB
+from pipeline.two_pass import get_two_pass_options, draft_config, refine_method, region_bounds, replace_region
+from pipeline.job_history import get_job_history_options, get_job_history, job_profile, EtaTracker
+from search.transcript_store import get_search_index_options, get_transcript_store
+from diarization.speaker_index import get_speaker_index_options, get_speaker_index, apply_speaker_names
+
+logger = logging.getLogger(__name__)
+config_manager = get_config_manager()
+
+DEFAULT_JOB_OPTIONS = {
+    'num_speakers': 2,
+    'diarization_model': 'speaker-diarization-3.0',
+    'transcription_method': 'groq',
+    'combine_method': 'semantic',
+    'output_directory': None,
+    # 'sampling' or 'cprofile' to profile this job regardless of the config
+    'profile': None,
+    # Transcript formats written besides the PDF (see utils.exporters); None uses export.formats
+    'formats': None
+}
+TRANSCRIPTION_METHODS = ('groq', 'local')
+PROFILE_MODES = ('sampling', 'cprofile')
+
+def _whisper_key(local_model_options):
+    # Everything WhisperModel is constructed with; beam_size is read per transcription
+    return (local_model_options['model'], local_model_options['device'], local_model_options['compute_type'],
+            local_model_options['cpu_threads'], local_model_options['num_workers'])
+
+class ModelCache:
+    """Keeps loaded pyannote pipelines and Whisper models around so consecutive jobs reuse them.
+
+    A cache is meant to be owned by one worker at a time; models are not shared between
+    concurrently running jobs. Whisper models that no longer match `model_options`
+    are dropped as soon as the config changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pipelines = {}
+        self._whisper_models = {}
+        # Weak so the config manager's subscriber list doesn't keep caches alive
+        on_change = weakref.WeakMethod(self._on_config_changed)
+        config_manager.subscribe(lambda changed: on_change() and on_change()(changed))
+
+    def _on_config_changed(self, changed):
+        if 'model_options' not in changed:
+            return
+        current = _whisper_key(config_manager.config['model_options']['local'])
+        with self._lock:
+            for key in [key for key in self._whisper_models if key != current]:
+                logger.info(f"[Models] Unloading Whisper model {key[0]} after a config change")
+                del self._whisper_models[key]
+
+    def get_pipeline(self, pipeline_model):
+        with self._lock:
+            if pipeline_model not in self._pipelines:
+                from pyannote.audio import Pipeline
+                hugging_face_token = os.getenv('HUGGING_FACE_AUTH_TOKEN')
+                if not hugging_face_token:
+                    raise ValueError("HUGGING_FACE_AUTH_TOKEN not found in environment variables")
+                logger.info(f"[Models] Loading diarization pipeline {pipeline_model}")
+                self._pipelines[pipeline_model] = Pipeline.from_pretrained(pipeline_model, use_auth_token=hugging_face_token)
+            return self._pipelines[pipeline_model]
+
+    def get_whisper_model(self, config):
+        key = _whisper_key(config['model_options']['local'])
+        with self._lock:
+            if key not in self._whisper_models:
+                self._whisper_models[key] = create_local_model(config)
+            return self._whisper_models[key]
+
+    def clear(self):
+        with self._lock:
+            self._pipelines.clear()
+            self._whisper_models.clear()
+
+class ModelEngines:
+    """Model-backed diarization and transcription used by run_job.
+
+    Anything with the same `diarize` / `transcribe` methods can be passed to run_job
+    instead, e.g. stub engines for tests and benchmarks that must not load models or
+    reach the network. `reporter` is the StageReporter of the calling stage and
+    `checkpoint` an optional JobCheckpoint for resumable chunked transcription.
+    `embeddings`, when given, is a dict that `diarize` fills with one centroid per
+    speaker label; it is only passed while the speaker index is enabled. A low-memory
+    `memory_plan` switches to the windowed and streaming variants of both stages.
+    Engines shared between jobs, like the service's, get each job's plan through
+    `with_memory_plan`.
+    """
+
+    def __init__(self, memory_plan=None):
+        self.memory_plan = memory_plan
+
+    def with_memory_plan(self, memory_plan):
+        """Engines for one job planned against the memory budget; the models stay in the caller's ModelCache."""
+        return ModelEngines(memory_plan)
+
+    @property
+    def low_memory(self):
+        return self.memory_plan is not None and self.memory_plan.low_memory
+
+    def warm_up(self, options, models):
+        """Load the models a job with these options needs, so the first job doesn't pay for it."""
+        models.get_pipeline(f"pyannote/{options['diarization_model']}")
+        two_pass_options = get_two_pass_options(config_manager.config)
+        if two_pass_options['enabled']:
+            models.get_whisper_model(draft_config(config_manager.config, two_pass_options))
+            method = refine_method(two_pass_options, options)
+        else:
+            method = options['transcription_method']
+        if method != 'groq':
+            models.get_whisper_model(config_manager.config)
+
+    def diarize(self, audio_path, options, models, reporter=None, embeddings=None):
+        pipeline = models.get_pipeline(f"pyannote/{options['diarization_model']}")
+        progress, cancel_token, telemetry = _reporter_hooks(reporter)
+        if self.low_memory:
+            return diarize_audio_windowed(pipeline, audio_path, options['num_speakers'],
+                                          self.memory_plan.window_seconds, progress=progress,
+                                          cancel_token=cancel_token, telemetry=telemetry, embeddings=embeddings)
+        return diarize_audio(pipeline, audio_path, options['num_speakers'],
+                             progress=progress, cancel_token=cancel_token, telemetry=telemetry,
+                             embeddings=embeddings)
+
+    def transcribe(self, audio_path, options, models, reporter=None, checkpoint=None):
+        progress, cancel_token, telemetry = _reporter_hooks(reporter)
+        if options['transcription_method'] == 'groq':
+            return transcribe_audio_with_groq(audio_path, progress, cancel_token, telemetry, checkpoint,
+                                              streaming=self.low_memory), 'groq'
+        model_whisper, whisper_device = models.get_whisper_model(config_manager.config)
+        transcription = transcribe_audio(model_whisper, audio_path, progress, cancel_token, telemetry, checkpoint,
+                                         checkpoint.chunk_seconds if checkpoint else None,
+                                         window_seconds=self.memory_plan.window_seconds if self.low_memory else None)
+        return transcription, whisper_device
+
+    def transcribe_draft(self, audio_path, draft_config, models, reporter=None, checkpoint=None):
+        """First pass of a two-pass job: the whole file with the small draft model."""
+        progress, cancel_token, telemetry = _reporter_hooks(reporter)
+        model_whisper, whisper_device = models.get_whisper_model(draft_config)
+        transcription = transcribe_audio(model_whisper, audio_path, progress, cancel_token, telemetry, checkpoint,
+                                         checkpoint.chunk_seconds if checkpoint else None,
+                                         window_seconds=self.memory_plan.window_seconds if self.low_memory else None,
+                                         beam_size=draft_config['model_options']['local']['beam_size'])
+        return transcription, whisper_device
+
+    def transcribe_region(self, audio_path, start, end, method, models, cancel_token=None, overlap=0.0):
+        """Refine pass of a two-pass job: [start, end) of `audio_path`, with timestamps in the whole file.
+
+        Groq gets the region as an mp3 file. The local model gets float samples decoded
+        straight from the file, with `overlap` seconds of context on either side; the
+        caller keeps the segments that start inside the region.
+        """
+        if method == 'groq':
+            with tempfile.TemporaryDirectory(prefix='refine_') as region_dir:
+                region_path = cut_audio_chunk(audio_path, start, end - start, os.path.join(region_dir, 'region.mp3'))
+                segments = transcribe_audio_with_groq(region_path, cancel_token=cancel_token)
+            offset = start
+        else:
+            model_whisper, _ = models.get_whisper_model(config_manager.config)
+            offset = max(0.0, start - overlap)
+            samples = decode_window(audio_path, offset, end + overlap - offset,
+                                    model_whisper.feature_extractor.sampling_rate)
+            segments = transcribe_audio(model_whisper, samples, cancel_token=cancel_token)
+        return [dict(segment, start=segment['start'] + offset, end=segment['end'] + offset) for segment in segments]
+
+def _reporter_hooks(reporter):
+    if reporter is None:
+        return None, None, None
+    return reporter.update, reporter.token, reporter.telemetry
+
+def resolve_job_options(options):
+    resolved = dict(DEFAULT_JOB_OPTIONS)
+    resolved.update({k: v for k, v in options.items() if v is not None})
+    if not resolved['output_directory']:
+        resolved['output_directory'] = config_manager.config.get('output_directory', 'transcriptions')
+    if resolved['formats'] is None:
+        resolved['formats'] = config_manager.get('export.formats', [])
+    return resolved
+
+def validate_job_options(options):
+    """Raise ValueError for a key that isn't a job option or a value run_job can't use; None means the default."""
+    unknown = sorted(set(options) - set(DEFAULT_JOB_OPTIONS))
+    if unknown:
+        raise ValueError(f"unknown option(s): {', '.join(unknown)}")
+    checks = {
+        'num_speakers': (lambda v: isinstance(v, int) and not isinstance(v, bool) and v > 0, "a positive integer"),
+        'diarization_model': (lambda v: isinstance(v, str) and bool(v.strip()), "a pyannote pipeline name"),
+        'transcription_method': (lambda v: v in TRANSCRIPTION_METHODS, f"one of {', '.join(TRANSCRIPTION_METHODS)}"),
+        'combine_method': (lambda v: isinstance(v, str) and v in COMBINER_MODULES,
+                           f"one of {', '.join(COMBINER_MODULES)}"),
+        'output_directory': (lambda v: isinstance(v, str), "a directory path"),
+        'profile': (lambda v: v in PROFILE_MODES, f"one of {', '.join(PROFILE_MODES)}"),
+        'formats': (lambda v: isinstance(v, list) and all(isinstance(f, str) and f in EXPORTERS for f in v),
+                    f"a list of formats out of {', '.join(EXPORTERS)}")
+    }
+    for key, value in options.items():
+        valid, expected = checks[key]
+        if value is not None and not valid(value):
+            raise ValueError(f"{key} must be {expected}, got {value!r}")
+
+def free_models(models):
+    """Drop cached models and return their memory, e.g. after a cancelled job."""
+    models.clear()
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def history_profile(options):
+    config = config_manager.config
+    device = 'cuda' if config['use_cuda'] and torch.cuda.is_available() else 'cpu'
+    return job_profile(options, config, device)
+
+def expected_job_seconds(file_path, options):
+    """Predicted wall seconds of a job from the job history.
+
+    Falls back to the audio duration when there is no history, which orders jobs the
+    same way, and returns None when the duration can't be read.
+    """
+    audio_seconds = get_audio_duration(file_path)
+    if not audio_seconds:
+        return None
+    history_options = get_job_history_options(config_manager.config)
+    if history_options['enabled']:
+        estimate = get_job_history(history_options).predict(history_profile(resolve_job_options(options)),
+                                                            audio_seconds, history_options['window'])
+        if estimate is not None:
+            return estimate['total']
+    return audio_seconds
+
+# Settings of model_options.local that change a transcript; threads and workers only change its speed
+LOCAL_MODEL_PARAMS = ('model', 'compute_type', 'beam_size')
+
+def _model_params(config, method):
+    if method == 'groq':
+        return config['model_options']['groq']
+    local = config['model_options']['local']
+    return {key: local[key] for key in LOCAL_MODEL_PARAMS if key in local}
+
+def checkpoint_params(options, config):
+    """Everything besides the input file that changes the output of a job."""
+    method = options['transcription_method']
+    params = {
+        'num_speakers': options['num_speakers'],
+        'diarization_model': options['diarization_model'],
+        'transcription_method': method,
+        'combine_method': options['combine_method'],
+        'model': _model_params(config, method),
+        'transcription': config['transcription']
+    }
+    two_pass_options = get_two_pass_options(config)
+    if two_pass_options['enabled']:
+        # The draft and the refined regions are separate units; the refine model is covered by 'model'
+        params['two_pass'] = two_pass_options
+        params['model'] = _model_params(config, refine_method(two_pass_options, options))
+    return params
+
+def _cached(checkpoint, unit, compute):
+    """Return a checkpointed unit, computing and persisting it first if needed."""
+    if checkpoint is not None:
+        saved = checkpoint.load(unit)
+        if saved is not None:
+            logger.info(f"[Checkpoint] Reusing completed {unit}")
+            return saved
+    result = compute()
+    if checkpoint is not None:
+        checkpoint.save(unit, result)
+    return result
+
+def build_stages(file_path, options, models, engines, telemetry=None, checkpoint=None, memory_plan=None):
+    """Build the extract -> load -> diarize/transcribe -> combine -> export/formats stage graph for one job.
+
+    With `two_pass.enabled`, transcribe runs the small draft model and a final refine
+    stage replaces the draft region by region, re-exporting after each region.
+    """
+    config = config_manager.config
+    pipeline_model = f"pyannote/{options['diarization_model']}"
+    two_pass_options = get_two_pass_options(config)
+    # Engines without a draft/refine pair, such as benchmark stubs, run single-pass
+    two_pass = two_pass_options['enabled'] and hasattr(engines, 'transcribe_region')
+    # The two-pass draft is always transcribed locally
+    local = two_pass or options['transcription_method'] != 'groq'
+    low_memory = memory_plan is not None and memory_plan.low_memory
+    # The stage executor decodes the whole recording into shared memory, which low-memory mode avoids
+    use_stage_executor = (local and not low_memory and not two_pass and isinstance(engines, ModelEngines)
+                          and get_stage_executor_options(config)['enabled'])
+    on_gpu = config['use_cuda'] and torch.cuda.is_available()
+
+    def extract(results, reporter):
+        processed_file = process_file(file_path)
+        if telemetry is not None:
+            telemetry.audio_duration = get_audio_duration(processed_file)
+        return processed_file
+
+    def load(results, reporter):
+        if use_stage_executor:
+            # Decodes the audio into shared memory; the worker processes load their own models
+            with measure(telemetry, 'decode'):
+                return LocalStageExecutor(results['extract'], config)
+        if hasattr(engines, 'warm_up'):
+            engines.warm_up(options, models)
+        return None
+
+    def diarize(results, reporter):
+        # pyannote clusters speakers over the whole recording, so diarization is a single checkpoint unit
+        if not speaker_options['enabled']:
+            if use_stage_executor:
+                compute = lambda: results['load'].diarize(pipeline_model, options['num_speakers'], reporter.token)
+            else:
+                compute = lambda: engines.diarize(results['extract'], options, models, reporter)
+            diarization, device = _cached(checkpoint, 'diarization', compute)
+            return diarization, device, None
+
+        def compute():
+            embeddings = {}
+            if use_stage_executor:
+                diarization, device = results['load'].diarize(pipeline_model, options['num_speakers'],
+                                                              reporter.token, embeddings)
+            else:
+                diarization, device = engines.diarize(results['extract'], options, models, reporter,
+                                                      embeddings=embeddings)
+            return diarization, device, embeddings
+        # Separate unit so a checkpoint written without embeddings is never reused here
+        return tuple(_cached(checkpoint, 'diarization_embeddings', compute))
+
+    def transcribe(results, reporter):
+        if two_pass:
+            return engines.transcribe_draft(results['extract'], draft_config(config, two_pass_options), models,
+                                            reporter, checkpoint)
+        if use_stage_executor:
+            return results['load'].transcribe(reporter.token, checkpoint)
+        return engines.transcribe(results['extract'], options, models, reporter, checkpoint)
+
+    def combine(results, reporter):
+        # Clear CUDA cache after diarization if GPU was used
+        if on_gpu:
+            torch.cuda.empty_cache()
+        transcription, _ = results['transcribe']
+        diarization = results['diarize'][0]
+        combined = _cached(checkpoint, 'combined', lambda: combine_transcription_diarization(
+            transcription, diarization, pipeline_model, method=options['combine_method']))
+        if results.get('identify'):
+            # Names are applied after the checkpoint so renaming an identity never invalidates it
+            combined = apply_speaker_names(combined, results['identify'])
+        return combined
+
+    def identify(results, reporter):
+        embeddings = results['diarize'][2]
+        if not embeddings:
+            logger.warning("[Speakers] The diarization engine returned no speaker embeddings")
+            return {}
+        return get_speaker_index(speaker_options).identify(file_path, embeddings)
+
+    def export(results, reporter):
+        return create_pdf(results['combine'], file_path, output_directory=options['output_directory'],
+                          spill_directory=memory_plan.spill_directory if low_memory else None)
+
+    def export_formats(results, reporter):
+        # Runs next to the PDF export; all formats are written in one pass over the segments
+        if stream_formats:
+            segments = stream_transcription_diarization(results['transcribe'][0], results['diarize'][0],
+                                                        method=options['combine_method'])
+        else:
+            segments = results['combine']
+        return export_transcript(segments, file_path, options['formats'], options['output_directory'])
+
+    def index(results, reporter):
+        store = get_transcript_store(search_options['path'])
+        return store.index(file_path, results['combine'],
+                           output_pdf=get_output_pdf_path(file_path, options['output_directory']))
+
+    def refine(results, reporter):
+        # Starts once the draft is exported: each region is transcribed again, swapped in and re-exported
+        method = refine_method(two_pass_options, options)
+        # Groq gets mp3 regions without overlap; local Whisper decodes lossless samples with context on both sides
+        overlap = 0.0 if method == 'groq' else two_pass_options['region_overlap_seconds']
+        transcription = list(results['transcribe'][0])
+        diarization = results['diarize'][0]
+        combined = results['combine']
+        regions = region_bounds(get_stream_duration(results['extract']), two_pass_options['region_seconds'])
+        for number, (start, end) in enumerate(regions):
+            refined = _cached(checkpoint, f"refined_region_{number:04d}", lambda: engines.transcribe_region(
+                results['extract'], start, end, method, models, reporter.token, overlap))
+            transcription = replace_region(transcription, refined, start, end)
+            combined = combine_transcription_diarization(transcription, diarization, pipeline_model,
+                                                         method=options['combine_method'])
+            if results.get('identify'):
+                combined = apply_speaker_names(combined, results['identify'])
+            # Both writers replace the previous file in one rename, so readers never see a partial one
+            export(dict(results, combine=combined), reporter)
+            export_formats(dict(results, combine=combined), reporter)
+            logger.info(f"[TwoPass] Refined region {number + 1}/{len(regions)} of {os.path.basename(file_path)}")
+            reporter.update((number + 1) / len(regions))
+        if search_options['enabled']:
+            index(dict(results, combine=combined), reporter)
+        return combined, method
+
+    search_options = get_search_index_options(config)
+    speaker_options = get_speaker_index_options(config)
+    transcribe_deps = ['extract', 'load']
+    if local and on_gpu and not use_stage_executor:
+        # Whisper and pyannote on one GPU in the same process: keep them sequential to bound memory
+        transcribe_deps.append('diarize')
+
+    combine_deps = ['diarize', 'transcribe']
+    if speaker_options['enabled']:
+        combine_deps.append('identify')
+    # Low-memory jobs write the formats from the streaming combine, next to the combine stage, instead of
+    # from its list; speaker names and the refine pass need the combined list
+    stream_formats = low_memory and not two_pass and not speaker_options['enabled']
+
+    stages = [
+        Stage('extract', extract, weight=0.05),
+        Stage('load', load, deps=['extract'] if use_stage_executor else [], weight=0.1),
+        Stage('diarize', diarize, deps=['extract', 'load'], weight=0.4),
+        Stage('transcribe', transcribe, deps=transcribe_deps, weight=0.35),
+        Stage('combine', combine, deps=combine_deps, weight=0.05),
+        Stage('export', export, deps=['combine'], weight=0.05),
+        Stage('formats', export_formats, deps=['diarize', 'transcribe'] if stream_formats else ['combine'],
+              weight=0.02)
+    ]
+    if speaker_options['enabled']:
+        stages.append(Stage('identify', identify, deps=['diarize'], weight=0.01))
+    if search_options['enabled']:
+        stages.append(Stage('index', index, deps=['combine'], weight=0.02))
+    if two_pass:
+        # After every draft output, so the refined files are always the last ones written
+        refine_deps = ['export', 'formats'] + (['index'] if search_options['enabled'] else [])
+        stages.append(Stage('refine', refine, deps=refine_deps, weight=0.5))
+    return StageGraph(stages)
+
+def _reserve_memory(memory_options, memory_plan, file_path, cancel_token):
+    if memory_plan is None:
+        return contextlib.nullcontext()
+    budget = get_memory_budget(memory_options)
+    if budget is None:
+        return contextlib.nullcontext()
+    return budget.reserve(memory_plan.estimate, cancel_token, os.path.basename(file_path))
+
+def _memory_report(memory_options, memory_plan, peak, file_path):
+    """Peak RSS of the process during the job, against the budget when one is set.
+
+    RSS is process-wide, so with several concurrent workers it covers all of them.
+    """
+    report = {'peak_rss_mb': peak / MB if peak else None}
+    if memory_plan is None:
+        return report
+    budget = get_memory_budget(memory_options)
+    report.update(memory_plan.to_dict())
+    report['budget_mb'] = budget.budget / MB if budget else None
+    if peak and budget:
+        message = (f"[Memory] {os.path.basename(file_path)}: peak RSS {peak / MB:.0f} MB of "
+                   f"{budget.budget / MB:.0f} MB budget (estimated {memory_plan.estimate / MB:.0f} MB)")
+        if peak > budget.budget:
+            logger.warning(message + " - over budget")
+        else:
+            logger.info(message)
+    return report
+
+def run_job(file_path, options, models, progress=None, engines=None, cancel_token=None, on_event=None):
+    """Run extraction, diarization, transcription, combining and PDF export for one file.
+
+    `options` uses the keys of DEFAULT_JOB_OPTIONS and `models` is a ModelCache. `progress`
+    is an optional callable receiving the overall percentage, `on_event` receives every
+    ProgressEvent, both on the calling thread. Cancelling `cancel_token` raises JobCancelled
+    and frees the cached models. Returns a dict with the combined transcription, the
+    output PDF path and per-stage timings in seconds.
+
+    With `memory_budget.enabled` the job is planned against the budget first: it runs
+    in low-memory mode if its normal estimate doesn't fit, waits until running jobs
+    leave room (or raises MemoryBudgetExceeded), and its peak RSS is reported against
+    the budget.
+
+    `latency` in the result holds the seconds until the first transcript was exported
+    and until the final one was; they differ for two-pass jobs, whose draft is
+    exported before the refine pass starts.
+
+    With `job_history.enabled` the stage durations are predicted from past jobs like
+    this one: the prediction weights the overall progress, each event's `overall_eta`
+    is the predicted remaining time, and the finished job is added to the history.
+    """
+    job_started = time.perf_counter()
+    options = resolve_job_options(options)
+    memory_options = get_memory_budget_options(config_manager.config)
+    memory_plan = None
+    if memory_options['enabled']:
+        memory_plan = plan_job(file_path, memory_options, options['transcription_method'],
+                               get_pdf_options(config_manager.config)['chunk_blocks'])
+    if engines is None:
+        engines = ModelEngines(memory_plan)
+    elif hasattr(engines, 'with_memory_plan'):
+        engines = engines.with_memory_plan(memory_plan)
+    telemetry = create_recorder(config_manager.config, file_path, {
+        'transcription_method': options['transcription_method'],
+        'diarization_model': options['diarization_model'],
+        'combine_method': options['combine_method']
+    })
+    profile_dir = os.path.join(options['output_directory'],
+                               os.path.splitext(os.path.basename(file_path))[0] + '_profile')
+    profiler = create_profiler(config_manager.config, profile_dir, options['profile'])
+    checkpoint = create_checkpoint(config_manager.config, file_path,
+                                   checkpoint_params(options, config_manager.config))
+    graph = build_stages(file_path, options, models, engines, telemetry, checkpoint, memory_plan)
+    history_options = get_job_history_options(config_manager.config)
+    history = get_job_history(history_options) if history_options['enabled'] else None
+    profile = history_profile(options)
+    audio_seconds = None
+    eta = None
+    if history is not None:
+        audio_seconds = memory_plan.duration if memory_plan is not None else get_audio_duration(file_path)
+        estimate = history.predict(profile, audio_seconds, history_options['window']) if audio_seconds else None
+        if estimate is not None:
+            eta = EtaTracker(graph.stages, estimate['stages'])
+            if all(name in estimate['stages'] for name in graph.stages):
+                for name, stage in graph.stages.items():
+                    stage.weight = max(estimate['stages'][name], 0.01)
+            logger.info(f"[History] {os.path.basename(file_path)} is expected to take {estimate['total']:.0f}s "
+                        f"({estimate['jobs']} similar past job(s))")
+    # Timings of a resumed job only cover what was left, so they are not recorded
+    resumed = checkpoint is not None and bool(checkpoint.completed_units())
+    started = {}
+    timings = {}
+    latency = {}
+    last_percent = [None]
+
+    def handle_event(event):
+        if event.status == 'started':
+            started[event.stage] = time.perf_counter()
+        elif event.status == 'done':
+            timings[event.stage] = time.perf_counter() - started.get(event.stage, time.perf_counter())
+            if event.stage == 'export':
+                latency['first_transcript'] = time.perf_counter() - job_started
+        if eta is not None:
+            event.overall_eta = eta.update(event)
+        if on_event is not None:
+            on_event(event)
+        percent = int(event.overall * 100)
+        if progress is not None and percent != last_percent[0]:
+            last_percent[0] = percent
+            progress(percent)
+
+    results = {}
+    sampler = PeakRssSampler()
+    try:
+        with _reserve_memory(memory_options, memory_plan, file_path, cancel_token), sampler:
+            run_started = time.perf_counter()
+            graph.run(token=cancel_token, on_event=handle_event, results=results,
+                      telemetry=telemetry, profiler=profiler)
+            run_seconds = time.perf_counter() - run_started
+    except JobCancelled:
+        logger.info(f"[Pipeline] Job for {file_path} cancelled")
+        free_models(models)
+        raise
+    finally:
+        if telemetry is not None:
+            telemetry.flush()
+        if profiler is not None:
+            profiler.close()
+        if isinstance(results.get('load'), LocalStageExecutor):
+            results['load'].close()
+        processed_file = results.get('extract')
+        if history is not None and not audio_seconds and processed_file and os.path.exists(processed_file):
+            audio_seconds = get_audio_duration(processed_file)
+        if processed_file and processed_file != file_path and os.path.exists(processed_file):
+            # Audio extracted from a video is only needed for the models
+            os.remove(processed_file)
+
+    if checkpoint is not None:
+        checkpoint.complete()
+    if history is not None and audio_seconds and not resumed:
+        history.record(profile, audio_seconds, timings, run_seconds, file_path)
+    latency['final_transcript'] = time.perf_counter() - job_started
+    if 'refine' in results:
+        logger.info(f"[TwoPass] {os.path.basename(file_path)}: draft transcript after "
+                    f"{latency['first_transcript']:.1f}s, refined ({results['refine'][1]}) after "
+                    f"{latency['final_transcript']:.1f}s")
+
+    return {
+        'memory': _memory_report(memory_options, memory_plan, sampler.peak, file_path),
+        'final_transcription': results['refine'][0] if 'refine' in results else results['combine'],
+        'latency': latency,
+        'output_pdf': results['export'],
+        'exports': results['formats'],
+        'diarization_device': results['diarize'][1],
+        'speakers': results.get('identify', {}),
+        'transcription_device': results['transcribe'][1],
+        'timings': timings,
+        'telemetry': telemetry.records if telemetry is not None else []
+    }
@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import uuid
+import heapq
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
+from utils.config_manager import get_config_manager
+from pipeline.runner import ModelCache, ModelEngines, run_job, resolve_job_options, validate_job_options, expected_job_seconds
+from pipeline.job_history import get_job_history_options, schedule_key, parse_deadline, SCHEDULES
+from pipeline.stages import CancellationToken, JobCancelled
+from utils.exporters import parse_formats
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+
+EXPORT_CONTENT_TYPES = {
+    'srt': 'application/x-subrip; charset=utf-8',
+    'vtt': 'text/vtt; charset=utf-8',
+    'jsonl': 'application/jsonl; charset=utf-8',
+    'md': 'text/markdown; charset=utf-8'
+}
+
+class Job:
+    def __init__(self, file_path, options, priority=0, deadline=None):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.options = options
+        self.priority = priority
+        self.deadline = deadline
+        self.expected_seconds = None
+        self.status = QUEUED
+        self.progress = 0
+        self.eta = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_token = CancellationToken()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'file_path': self.file_path,
+            'priority': self.priority,
+            'deadline': self.deadline,
+            'expected_seconds': self.expected_seconds,
+            'status': self.status,
+            'progress': self.progress,
+            'eta': self.eta,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'output_pdf': self.result['output_pdf'] if self.result else None,
+            'exports': self.result.get('exports', {}) if self.result else None,
+            'timings': self.result['timings'] if self.result else None,
+            'latency': self.result.get('latency') if self.result else None,
+            'memory': self.result.get('memory') if self.result else None
+        }
+
+class JobService:
+    """Prioritized job queue with a fixed number of workers that keep their models loaded.
+
+    Higher `priority` runs first. Equal priorities are ordered by `schedule` (default
+    job_history.schedule): 'fifo' in submission order, 'sjf' shortest expected job
+    first, or 'deadline' earliest deadline first. `job_runner` and `engines` are
+    forwarded to run_job and can be replaced by stubs. `default_options` are merged
+    under the options of every submitted job; with `warm_up` each worker loads the
+    models for them before taking its first job.
+    """
+
+    def __init__(self, max_concurrent=1, job_runner=run_job, engines=None, default_options=None, warm_up=False,
+                 schedule=None):
+        schedule = schedule or get_job_history_options(get_config_manager().config)['schedule']
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule '{schedule}', expected one of {', '.join(SCHEDULES)}")
+        self.max_concurrent = max(1, max_concurrent)
+        self.job_runner = job_runner
+        self.engines = engines
+        self.default_options = default_options or {}
+        self.warm_up = warm_up
+        self.schedule = schedule
+        self.jobs = {}
+        self._heap = []
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._workers = []
+        self._stopping = False
+
+    def start(self):
+        for i in range(self.max_concurrent):
+            worker = threading.Thread(target=self._worker_loop, name=f"service-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            for job in self.jobs.values():
+                job.cancel_token.cancel()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def submit(self, file_path, options=None, priority=0, deadline=None):
+        """Queue a job; raises ValueError for unknown options or invalid option values."""
+        validate_job_options(options or {})
+        job = Job(file_path, resolve_job_options({**self.default_options, **(options or {})}), priority, deadline)
+        # Shown to clients under every schedule; only 'sjf' and 'deadline' order by it
+        job.expected_seconds = expected_job_seconds(file_path, job.options)
+        key = schedule_key(self.schedule, job.expected_seconds, deadline)
+        with self._condition:
+            self.jobs[job.id] = job
+            heapq.heappush(self._heap, (-priority,) + key + (self._counter, job.id))
+            self._counter += 1
+            self._condition.notify()
+        logger.info(f"[Service] Queued job {job.id} (priority {priority}) for {file_path}")
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._condition:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job immediately or stop a running one at its next unit of work."""
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in (DONE, FAILED, CANCELLED):
+                return job
+            job.cancel_token.cancel()
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        logger.info(f"[Service] Cancellation requested for job {job_id}")
+        return job
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                while self._heap:
+                    job_id = heapq.heappop(self._heap)[-1]
+                    job = self.jobs[job_id]
+                    if job.status == QUEUED:
+                        job.status = RUNNING
+                        job.started_at = time.time()
+                        return job
+                if self._stopping:
+                    return None
+                self._condition.wait()
+
+    def _worker_loop(self):
+        models = ModelCache()
+        if self.warm_up and hasattr(self.engines, 'warm_up'):
+            try:
+                self.engines.warm_up(resolve_job_options(self.default_options), models)
+            except Exception as e:
+                logger.error(f"[Service] Model warm-up failed: {str(e)}")
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            self._run(job, models)
+
+    def _run(self, job, models):
+        def progress(value):
+            job.progress = value
+
+        def on_event(event):
+            job.eta = event.overall_eta
+
+        try:
+            job.result = self.job_runner(job.file_path, job.options, models, progress=progress,
+                                         engines=self.engines, cancel_token=job.cancel_token, on_event=on_event)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+            logger.info(f"[Service] Job {job.id} cancelled")
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            logger.error(f"[Service] Job {job.id} failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API:
+
+    POST   /jobs                 {"file_path": ..., "priority": 0, "deadline": <Unix time or ISO 8601>, "options": {...}}
+    GET    /jobs                 list jobs
+    GET    /jobs/<id>            job status
+    GET    /jobs/<id>/result     combined transcription as JSON
+    GET    /jobs/<id>/pdf        rendered PDF
+    GET    /jobs/<id>/export/<format>  transcript in an exported format (srt, vtt, jsonl, md)
+    DELETE /jobs/<id>            cancel
+    """
+    service = None
+
+    def log_message(self, format, *args):
+        logger.debug(f"[Service] {self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path, content_type):
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        if not parts or parts[0] != 'jobs':
+            return None, None
+        job = self.service.get(parts[1]) if len(parts) > 1 else None
+        return parts, job
+
+    def do_POST(self):
+        parts, _ = self._route()
+        if parts != ['jobs']:
+            return self._send_json(404, {'error': 'not found'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            file_path = payload['file_path']
+        except (ValueError, KeyError, TypeError):
+            return self._send_json(400, {'error': 'expected a JSON body with file_path'})
+        if not isinstance(file_path, str) or not os.path.isfile(file_path):
+            return self._send_json(400, {'error': f'file not found: {file_path}'})
+        try:
+            priority = int(payload.get('priority', 0))
+        except (TypeError, ValueError):
+            return self._send_json(400, {'error': 'priority must be an integer'})
+        try:
+            deadline = parse_deadline(payload.get('deadline'))
+        except (TypeError, ValueError):
+            return self._send_json(400, {'error': 'deadline must be a Unix timestamp or an ISO 8601 date'})
+        options = payload.get('options')
+        if options is not None and not isinstance(options, dict):
+            return self._send_json(400, {'error': 'options must be a JSON object'})
+        try:
+            job = self.service.submit(file_path, options, priority, deadline)
+        except ValueError as e:
+            return self._send_json(400, {'error': f'invalid options: {str(e)}'})
+        self._send_json(202, job.to_dict())
+
+    def do_GET(self):
+        parts, job = self._route()
+        if parts == ['jobs']:
+            return self._send_json(200, [j.to_dict() for j in self.service.list_jobs()])
+        if parts is None or job is None:
+            return self._send_json(404, {'error': 'not found'})
+        if len(parts) == 2:
+            return self._send_json(200, job.to_dict())
+        if job.status != DONE:
+            return self._send_json(409, {'error': f'job is {job.status}'})
+        if parts[2] == 'result':
+            return self._send_json(200, job.result['final_transcription'])
+        if parts[2] == 'pdf':
+            return self._send_file(job.result['output_pdf'], 'application/pdf')
+        if parts[2] == 'export' and len(parts) == 4:
+            path = job.result.get('exports', {}).get(parts[3])
+            if path is None:
+                return self._send_json(404, {'error': f'format {parts[3]} was not exported for this job'})
+            return self._send_file(path, EXPORT_CONTENT_TYPES.get(parts[3], 'text/plain; charset=utf-8'))
+        self._send_json(404, {'error': 'not found'})
+
+    def do_DELETE(self):
+        parts, job = self._route()
+        if parts is None or len(parts) != 2 or job is None:
+            return self._send_json(404, {'error': 'not found'})
+        self._send_json(200, self.service.cancel(job.id).to_dict())
+
+def create_server(service, host='127.0.0.1', port=8765):
+    handler = type('BoundServiceRequestHandler', (ServiceRequestHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the MeetNote pipeline over a local HTTP API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('-c', '--concurrency', type=int, default=1, help="Jobs running at the same time")
+    parser.add_argument('--warm-up', action='store_true', help="Load models for the default options at startup")
+    parser.add_argument('--method', dest='transcription_method', choices=['groq', 'local'], default='groq',
+                        help="Transcription method used for warm-up and as the job default")
+    parser.add_argument('--diarization-model', default='speaker-diarization-3.0')
+    parser.add_argument('--profile', choices=['sampling', 'cprofile'],
+                        help="Profile every job's stages and write the results next to each transcript")
+    parser.add_argument('--formats', type=parse_formats,
+                        help="Comma-separated transcript formats to write besides the PDF by default (srt, vtt, jsonl, md)")
+    parser.add_argument('--schedule', choices=SCHEDULES,
+                        help="Order of queued jobs with equal priority: fifo, sjf (shortest expected job first) or "
+                             "deadline (default: job_history.schedule from the config)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    defaults = {'transcription_method': args.transcription_method, 'diarization_model': args.diarization_model,
+                'profile': args.profile, 'formats': args.formats}
+    service = JobService(args.concurrency, engines=ModelEngines(), default_options=defaults, warm_up=args.warm_up,
+                         schedule=args.schedule)
+    service.start()
+    server = create_server(service, args.host, args.port)
+    logger.info(f"[Service] Listening on http://{args.host}:{args.port} with {service.max_concurrent} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from multiprocessing import shared_memory
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+class SharedAudio:
+    """Mono float32 waveform stored in a named shared memory block.
+
+    Only the block name and shape are pickled, so worker processes attach to the
+    decoded samples without copying them through a pipe.
+    """
+
+    def __init__(self, name, length, sample_rate=SAMPLE_RATE):
+        self.name = name
+        self.length = length
+        self.sample_rate = sample_rate
+        self._shm = None
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate=SAMPLE_RATE):
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=max(samples.nbytes, 1))
+        np.ndarray(samples.shape, dtype=np.float32, buffer=shm.buf)[:] = samples
+        shared = cls(shm.name, len(samples), sample_rate)
+        shared._shm = shm
+        return shared
+
+    def __getstate__(self):
+        return {'name': self.name, 'length': self.length, 'sample_rate': self.sample_rate}
+
+    def __setstate__(self, state):
+        self.__init__(state['name'], state['length'], state['sample_rate'])
+
+    def attach(self):
+        """Return (shm, samples). Callers must drop `samples` before calling shm.close()."""
+        shm = shared_memory.SharedMemory(name=self.name)
+        samples = np.ndarray((self.length,), dtype=np.float32, buffer=shm.buf)
+        return shm, samples
+
+    @property
+    def duration(self):
+        return self.length / self.sample_rate
+
+    def release(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+def get_stage_executor_options(config):
+    options = {
+        'enabled': False,
+        'whisper_cpu_threads': 0,
+        'whisper_num_workers': 1,
+        'diarization_threads': 0
+    }
+    options.update(config.get('stage_executor', {}))
+    return options
+
+def partition_cores(options, cores=None):
+    """Split the host's cores between Whisper and pyannote. Explicit values in the config win."""
+    if cores is None:
+        from utils.cpu import available_cpu_cores
+        cores = available_cpu_cores()
+    whisper_threads = options['whisper_cpu_threads'] or max(1, cores // 2)
+    diarization_threads = options['diarization_threads'] or max(1, cores - whisper_threads)
+    return whisper_threads, diarization_threads
+
+def decode_to_shared_memory(file_path):
+    from faster_whisper.audio import decode_audio
+    logger.info(f"[Executor] Decoding audio into shared memory: {file_path}")
+    samples = decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+    return SharedAudio.from_samples(samples)
+
+def _close_shared_memory(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # A view is still referenced (e.g. from an exception traceback); the mapping goes away with the process
+        logger.debug(f"[Executor] Shared memory {shm.name} still in use, leaving it to process exit")
+
+def _diarization_worker(shared_audio, pipeline_model, num_speakers, torch_threads, with_embeddings=False):
+    import torch
+    from pyannote.audio import Pipeline
+    from diarization.diarizer import diarize_audio
+
+    torch.set_num_threads(torch_threads)
+    hugging_face_token = os.getenv('HUGGING_FACE_AUTH_TOKEN')
+    if not hugging_face_token:
+        raise ValueError("HUGGING_FACE_AUTH_TOKEN not found in environment variables")
+    pipeline = Pipeline.from_pretrained(pipeline_model, use_auth_token=hugging_face_token)
+
+    shm, samples = shared_audio.attach()
+    try:
+        waveform = torch.from_numpy(samples).unsqueeze(0)
+        embeddings = {} if with_embeddings else None
+        diarization, device = diarize_audio(pipeline, {'waveform': waveform, 'sample_rate': shared_audio.sample_rate},
+                                            num_speakers, embeddings=embeddings, torch_threads=torch_threads)
+        return diarization, device, embeddings
+    finally:
+        waveform = samples = None
+        _close_shared_memory(shm)
+
+def _transcription_worker(shared_audio, config, cpu_threads, num_workers, checkpoint=None):
+    from transcription.transcriber import create_local_model, transcribe_audio
+
+    model_whisper, whisper_device = create_local_model(config, cpu_threads=cpu_threads, num_workers=num_workers)
+    shm, samples = shared_audio.attach()
+    try:
+        transcription = transcribe_audio(model_whisper, samples, checkpoint=checkpoint,
+                                         chunk_seconds=checkpoint.chunk_seconds if checkpoint else None)
+        return transcription, whisper_device
+    finally:
+        samples = None
+        _close_shared_memory(shm)
+
+class LocalStageExecutor:
+    """Process pool running pyannote and faster-whisper side by side on one shared waveform.
+
+    `diarize` and `transcribe` block until their worker finishes, so they are meant to be
+    called from two threads (e.g. two stages of a StageGraph).
+    """
+
+    def __init__(self, file_path, config):
+        self.config = config
+        self.options = get_stage_executor_options(config)
+        self.whisper_threads, self.diarization_threads = partition_cores(self.options)
+        logger.info(f"[Executor] Core partition - Whisper: {self.whisper_threads} threads, "
+                    f"pyannote: {self.diarization_threads} threads")
+        self.shared_audio = decode_to_shared_memory(file_path)
+        # Spawn keeps CUDA and the torch thread pools out of the forked state of the parent
+        self._executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+
+    def diarize(self, pipeline_model, num_speakers, cancel_token=None, embeddings=None):
+        future = self._executor.submit(_diarization_worker, self.shared_audio, pipeline_model,
+                                       num_speakers, self.diarization_threads, embeddings is not None)
+        diarization, device, speaker_embeddings = self._wait(future, cancel_token)
+        if embeddings is not None:
+            embeddings.update(speaker_embeddings)
+        return diarization, device
+
+    def transcribe(self, cancel_token=None, checkpoint=None):
+        future = self._executor.submit(_transcription_worker, self.shared_audio, self.config,
+                                       self.whisper_threads, self.options['whisper_num_workers'], checkpoint)
+        return self._wait(future, cancel_token)
+
+    def _wait(self, future, cancel_token):
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except TimeoutError:
+                if cancel_token is not None and cancel_token.cancelled:
+                    self.terminate()
+                    cancel_token.raise_if_cancelled()
+
+    def terminate(self):
+        """Kill the worker processes, releasing the models they hold."""
+        # ProcessPoolExecutor has no public way to stop running work
+        for process in list(getattr(self._executor, '_processes', {}).values()):
+            process.terminate()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.shared_audio.release()
+
+def run_local_stages(file_path, pipeline_model, num_speakers, config):
+    """Run diarization and local Whisper transcription concurrently in two worker processes.
+
+    The audio is decoded once into shared memory. Returns
+    (diarization, diarization_device, transcription, whisper_device).
+    """
+    executor = LocalStageExecutor(file_path, config)
+    try:
+        with ThreadPoolExecutor(max_workers=2) as waiters:
+            diarization_future = waiters.submit(executor.diarize, pipeline_model, num_speakers)
+            transcription_future = waiters.submit(executor.transcribe)
+            diarization, diarization_device = diarization_future.result()
+            transcription, whisper_device = transcription_future.result()
+    finally:
+        executor.close()
+
+    return diarization, diarization_device, transcription, whisper_device
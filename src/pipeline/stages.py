@@ -0,0 +1,174 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.telemetry import measure
+from utils.profiler import profile
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation has been requested."""
+
+class CancellationToken:
+    """Cooperative cancellation flag shared by every stage of a job.
+
+    Long-running loops (pyannote hook calls, Whisper segments, Groq chunks) call
+    `raise_if_cancelled()` so a cancelled job stops at the next unit of work.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+class ProgressEvent:
+    """Structured progress of one stage plus the weighted progress of the whole graph."""
+
+    def __init__(self, stage, status, fraction, audio_seconds=None, eta=None, overall=0.0, overall_eta=None):
+        self.stage = stage
+        self.status = status
+        self.fraction = fraction
+        self.audio_seconds = audio_seconds
+        self.eta = eta
+        self.overall = overall
+        self.overall_eta = overall_eta
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return (f"ProgressEvent({self.stage} {self.status} {self.fraction:.0%}, "
+                f"overall {self.overall:.0%}, eta {self.overall_eta})")
+
+class StageReporter:
+    """Handed to a running stage to publish progress and check for cancellation."""
+
+    def __init__(self, stage, token, publish, telemetry=None):
+        self.stage = stage
+        self.token = token
+        self.telemetry = telemetry
+        self._publish = publish
+        self._started = time.perf_counter()
+
+    def update(self, fraction, audio_seconds=None):
+        self.token.raise_if_cancelled()
+        fraction = min(max(fraction, 0.0), 1.0)
+        elapsed = time.perf_counter() - self._started
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+        self._publish(self.stage, 'running', fraction, audio_seconds, eta)
+
+class Stage:
+    def __init__(self, name, func, deps=(), weight=1.0):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.weight = weight
+
+class StageGraph:
+    """Runs a small DAG of stages, starting each one as soon as its dependencies finish.
+
+    A stage function is called as `func(results, reporter)` where `results` maps the
+    names of finished stages to their return values. All events are delivered to
+    `on_event` on the thread that called `run`, so GUI callbacks stay on their own thread.
+    Pass `results` to keep the outputs of finished stages when the run fails or is cancelled,
+    a TelemetryRecorder as `telemetry` to record every stage and a StageProfiler as
+    `profiler` to profile them.
+    """
+
+    def __init__(self, stages):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        resolved = set()
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [n for n, s in remaining.items() if all(d in resolved for d in s.deps)]
+            if not ready:
+                raise ValueError(f"Stage graph has a cycle between: {sorted(remaining)}")
+            for name in ready:
+                resolved.add(name)
+                del remaining[name]
+
+    def run(self, token=None, on_event=None, max_workers=2, results=None, telemetry=None, profiler=None):
+        token = token or CancellationToken()
+        on_event = on_event or (lambda event: None)
+        inbox = queue.Queue()
+        fractions = {name: 0.0 for name in self.stages}
+        total_weight = sum(stage.weight for stage in self.stages.values()) or 1.0
+        graph_start = time.perf_counter()
+        results = {} if results is None else results
+        running = {}
+        pending = dict(self.stages)
+        failure = None
+
+        def publish(stage, status, fraction, audio_seconds=None, eta=None):
+            inbox.put(('progress', (stage, status, fraction, audio_seconds, eta)))
+
+        def deliver(stage, status, fraction, audio_seconds, eta):
+            fractions[stage] = fraction
+            overall = sum(self.stages[n].weight * f for n, f in fractions.items()) / total_weight
+            elapsed = time.perf_counter() - graph_start
+            overall_eta = elapsed * (1 - overall) / overall if overall > 0 else None
+            on_event(ProgressEvent(stage, status, fraction, audio_seconds, eta, overall, overall_eta))
+
+        def execute(stage):
+            publish(stage.name, 'started', 0.0)
+            with measure(telemetry, stage.name), profile(profiler, stage.name):
+                return stage.func(results, StageReporter(stage.name, token, publish, telemetry))
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as executor:
+            while pending or running:
+                if failure is None and not token.cancelled:
+                    for name in [n for n, s in pending.items() if all(d in results for d in s.deps)]:
+                        stage = pending.pop(name)
+                        future = executor.submit(execute, stage)
+                        running[name] = future
+                        future.add_done_callback(lambda f, n=name: inbox.put(('finished', n)))
+                elif not running:
+                    break
+
+                kind, payload = inbox.get()
+                if kind == 'progress':
+                    deliver(*payload)
+                    continue
+
+                future = running.pop(payload)
+                try:
+                    results[payload] = future.result()
+                    deliver(payload, 'done', 1.0, None, 0.0)
+                except JobCancelled as e:
+                    failure = failure or e
+                except Exception as e:
+                    logger.error(f"[Stages] Stage '{payload}' failed: {str(e)}")
+                    deliver(payload, 'failed', fractions[payload], None, None)
+                    failure = failure or e
+                    # Stop sibling stages at their next checkpoint
+                    token.cancel()
+
+            # Flush progress that arrived after the last stage finished
+            while not inbox.empty():
+                kind, payload = inbox.get_nowait()
+                if kind == 'progress':
+                    deliver(*payload)
+
+        if failure is None and token.cancelled:
+            failure = JobCancelled()
+        if failure is not None:
+            raise failure
+        return results
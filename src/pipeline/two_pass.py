@@ -0,0 +1,60 @@
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+def get_two_pass_options(config):
+    options = {
+        'enabled': False,
+        # Small local Whisper model that produces the draft transcript
+        'draft_model': 'base',
+        'draft_compute_type': 'int8',
+        'draft_beam_size': 1,
+        # The refine pass transcribes, swaps in and re-exports this much audio at a time
+        'region_seconds': 600.0,
+        # Audio decoded on each side of a region by a local refine pass, so words across a boundary aren't clipped
+        'region_overlap_seconds': 2.0,
+        # 'local' (model_options.local) or 'groq' for the refine pass; '' uses the job's transcription method
+        'refine_method': ''
+    }
+    options.update(config.get('two_pass', {}))
+    return options
+
+def draft_config(config, options):
+    """Copy of `config` whose local Whisper model is the draft model."""
+    config = copy.deepcopy(config)
+    config['model_options']['local'].update({
+        'model': options['draft_model'],
+        'compute_type': options['draft_compute_type'],
+        'beam_size': options['draft_beam_size']
+    })
+    return config
+
+def refine_method(options, job_options):
+    return options['refine_method'] or job_options['transcription_method']
+
+def region_bounds(duration, region_seconds):
+    """[(start, end)] regions of `region_seconds` covering `duration`; the last one ends at `duration`."""
+    regions = []
+    start = 0.0
+    while start < duration:
+        regions.append((start, min(start + region_seconds, duration)))
+        start += region_seconds
+    return regions or [(0.0, duration)]
+
+def replace_region(transcription, refined, start, end):
+    """`transcription` with the segments starting in [start, end) replaced by `refined`.
+
+    Segments are assigned to the region they start in, so a draft segment that runs
+    across a region boundary is replaced once, together with its region. `refined`
+    may come from audio that overlaps the neighbouring regions: only its segments
+    that start in [start, end) are kept, minus those whose midpoint lies within the
+    last segment already refined before `start`, which the previous region
+    transcribed with its own overlap.
+    """
+    before = [segment for segment in transcription if segment['start'] < start]
+    after = [segment for segment in transcription if segment['start'] >= end]
+    covered = max((segment['end'] for segment in before), default=start)
+    kept = [segment for segment in refined
+            if start <= segment['start'] < end and (segment['start'] + segment['end']) / 2 >= covered]
+    return before + kept + after
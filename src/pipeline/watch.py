@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from dotenv import load_dotenv
+from audio.file_processor import is_supported_file
+from utils.config_manager import get_config_manager
+from utils.atomic_io import atomic_write_json
+from utils.output_generator import get_output_pdf_path
+from utils.exporters import parse_formats
+from pipeline.batch import BatchJobQueue
+from pipeline.runner import run_job, resolve_job_options
+
+logger = logging.getLogger(__name__)
+
+config_manager = get_config_manager()
+
+def get_watch_options(config):
+    options = {
+        'directories': [],
+        'recursive': False,
+        'workers': 1,
+        'poll_interval': 2.0,
+        'stable_seconds': 5.0,
+        'state_path': 'watch/state.json',
+        'use_native_events': True,
+        # A failed file is queued again up to this many times, after retry_backoff_seconds doubling per attempt
+        'max_retries': 3,
+        'retry_backoff_seconds': 60.0
+    }
+    options.update(config.get('watch', {}))
+    return options
+
+class WatchState:
+    """Which files have been queued or processed, persisted across restarts.
+
+    Entries are keyed by absolute path and remember the size and mtime they were
+    queued with, so a file that is replaced later is picked up again. Files still
+    marked 'queued' when the watcher stops are queued again on the next start.
+    Failures are counted per version of a file: a failed file becomes due again
+    `retry_backoff_seconds` after its failure, doubling with every attempt, until it
+    has failed `max_retries` more times.
+    """
+
+    def __init__(self, path, max_retries=3, retry_backoff_seconds=60.0):
+        self.path = path
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[Watch] Ignoring unreadable state file {path}: {str(e)}")
+
+    def is_known(self, file_path, size, mtime_ns, now=None):
+        """True if this exact version of the file was already queued or processed and is not due for a retry."""
+        with self._lock:
+            entry = self._entries.get(file_path)
+        if entry is None or entry['size'] != size or entry['mtime_ns'] != mtime_ns:
+            return False
+        if entry['status'] != 'failed':
+            return True
+        return not self._retry_due(entry, time.time() if now is None else now)
+
+    def _retry_due(self, entry, now):
+        attempts = entry.get('attempts', 1)
+        if attempts > self.max_retries:
+            return False
+        return now >= entry['updated_at'] + self.retry_backoff_seconds * 2 ** (attempts - 1)
+
+    def retries_left(self, file_path):
+        with self._lock:
+            entry = self._entries.get(file_path, {})
+        return max(0, self.max_retries + 1 - entry.get('attempts', 0))
+
+    def clear_failed(self):
+        """Forget every failed file so the next scan queues it again; returns how many were cleared."""
+        with self._lock:
+            failed = [path for path, entry in self._entries.items() if entry['status'] == 'failed']
+            for path in failed:
+                del self._entries[path]
+            snapshot = json.loads(json.dumps(self._entries))
+        if failed:
+            atomic_write_json(self.path, snapshot, indent=2)
+        return len(failed)
+
+    def interrupted(self):
+        with self._lock:
+            return [path for path, entry in self._entries.items() if entry['status'] == 'queued']
+
+    def mark(self, file_path, status, size=None, mtime_ns=None, **extra):
+        with self._lock:
+            entry = self._entries.setdefault(file_path, {'size': size, 'mtime_ns': mtime_ns})
+            if size is not None:
+                if (entry['size'], entry['mtime_ns']) != (size, mtime_ns):
+                    # A new version of the file starts with a clean failure count
+                    entry.pop('attempts', None)
+                entry.update(size=size, mtime_ns=mtime_ns)
+            if status == 'failed':
+                entry['attempts'] = entry.get('attempts', 0) + 1
+            entry.update(status=status, updated_at=time.time(), **extra)
+            snapshot = json.loads(json.dumps(self._entries))
+        atomic_write_json(self.path, snapshot, indent=2)
+
+class FolderWatcher:
+    """Finds media files in watched directories once they have stopped changing.
+
+    Every scan stats the supported files; a file is reported to `on_ready` once its
+    size and mtime have been unchanged for `stable_seconds`, which covers recorders
+    that write a file over several minutes. Scans run every `poll_interval` seconds.
+    If the optional `watchdog` package is installed, filesystem events trigger a scan
+    right away; without it (or with `use_native_events` off) plain polling is used.
+    """
+
+    def __init__(self, directories, on_ready, state, recursive=False, stable_seconds=5.0,
+                 poll_interval=2.0, use_native_events=True):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.on_ready = on_ready
+        self.state = state
+        self.recursive = recursive
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.use_native_events = use_native_events
+        # path -> (size, mtime_ns, time the file was first seen with that size and mtime)
+        self._candidates = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+
+    def _list_files(self):
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            if self.recursive:
+                for root, _, files in os.walk(directory):
+                    for name in files:
+                        yield os.path.join(root, name)
+            else:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            yield entry.path
+
+    def scan_once(self, now=None):
+        """Check every watched file once and return the paths reported as ready."""
+        now = time.monotonic() if now is None else now
+        ready = []
+        seen = set()
+        for path in self._list_files():
+            if not is_supported_file(path):
+                continue
+            try:
+                stats = os.stat(path)
+            except OSError:
+                # Deleted or renamed between listing and stat
+                continue
+            seen.add(path)
+            version = (stats.st_size, stats.st_mtime_ns)
+            if self.state.is_known(path, *version):
+                continue
+            candidate = self._candidates.get(path)
+            if candidate is None or candidate[:2] != version:
+                self._candidates[path] = version + (now,)
+                continue
+            if stats.st_size > 0 and now - candidate[2] >= self.stable_seconds:
+                del self._candidates[path]
+                ready.append((path, stats))
+        for path in set(self._candidates) - seen:
+            del self._candidates[path]
+
+        for path, stats in ready:
+            self.state.mark(path, 'queued', stats.st_size, stats.st_mtime_ns)
+            self.on_ready(path)
+        return [path for path, _ in ready]
+
+    def _start_native_events(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info("[Watch] watchdog is not installed, using polling only")
+            return
+
+        wake = self._wake
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        self._observer = Observer()
+        for directory in self.directories:
+            if os.path.isdir(directory):
+                self._observer.schedule(Handler(), directory, recursive=self.recursive)
+        self._observer.start()
+
+    def run(self):
+        """Scan until `stop` is called."""
+        if self.use_native_events:
+            self._start_native_events()
+        try:
+            while not self._stop.is_set():
+                self.scan_once()
+                # Pending candidates need another look once they could have become stable
+                timeout = self.poll_interval
+                if self._candidates:
+                    timeout = min(timeout, self.stable_seconds)
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+def run_watch(watch_options, job_options, job_runner=run_job, skip_existing=True, stop_event=None, retry_failed=False):
+    """Process files dropped into the watched directories until interrupted or `stop_event` is set.
+
+    With `retry_failed` the failures recorded in the state file are forgotten first,
+    so those files are queued again regardless of their retry count.
+    """
+    job_options = resolve_job_options(job_options)
+    state = WatchState(watch_options['state_path'], watch_options['max_retries'],
+                       watch_options['retry_backoff_seconds'])
+    if retry_failed:
+        logger.info(f"[Watch] Cleared {state.clear_failed()} failed file(s) for a retry")
+
+    def on_result(entry):
+        state.mark(entry['file'], entry['status'], output=entry.get('output'), error=entry.get('error'))
+        logger.info(f"[Watch] {entry['status']}: {entry['file']}")
+        if entry['status'] == 'failed':
+            retries = state.retries_left(entry['file'])
+            if retries:
+                logger.info(f"[Watch] Will retry {entry['file']} later ({retries} attempt(s) left)")
+            else:
+                logger.warning(f"[Watch] Giving up on {entry['file']}; modify the file or restart with "
+                               f"--retry-failed to process it again")
+
+    job_queue = BatchJobQueue(watch_options['workers'], job_runner, on_result=on_result)
+
+    def enqueue(file_path):
+        output_pdf = get_output_pdf_path(file_path, job_options['output_directory'])
+        if skip_existing and os.path.exists(output_pdf):
+            logger.info(f"[Watch] Skipping {file_path}, output already exists")
+            state.mark(file_path, 'skipped', output=output_pdf)
+            return
+        logger.info(f"[Watch] Queued {file_path}")
+        job_queue.submit(file_path, job_options)
+
+    watcher = FolderWatcher(
+        watch_options['directories'], enqueue, state,
+        recursive=watch_options['recursive'],
+        stable_seconds=watch_options['stable_seconds'],
+        poll_interval=watch_options['poll_interval'],
+        use_native_events=watch_options['use_native_events']
+    )
+    job_queue.start()
+    for file_path in state.interrupted():
+        if os.path.exists(file_path):
+            logger.info(f"[Watch] Resuming interrupted job for {file_path}")
+            enqueue(file_path)
+
+    if stop_event is not None:
+        threading.Thread(target=lambda: (stop_event.wait(), watcher.stop()), daemon=True).start()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logger.info("[Watch] Stopping, waiting for queued jobs to finish")
+    return job_queue.join()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Watch directories and transcribe new recordings as they arrive.")
+    parser.add_argument('directories', nargs='*', help="Defaults to watch.directories from the config")
+    parser.add_argument('-w', '--workers', type=int, help="Number of concurrent jobs")
+    parser.add_argument('-r', '--recursive', action='store_true', default=None, help="Watch subdirectories too")
+    parser.add_argument('--stable-seconds', type=float, help="How long a file must stay unchanged before it is queued")
+    parser.add_argument('--poll-interval', type=float, help="Seconds between directory scans")
+    parser.add_argument('--polling', action='store_true', help="Don't use filesystem events even if watchdog is installed")
+    parser.add_argument('--state', dest='state_path', help="State file recording queued and processed files")
+    parser.add_argument('-o', '--output-directory', help="Defaults to output_directory from the config")
+    parser.add_argument('--method', dest='transcription_method', choices=['groq', 'local'], default='groq')
+    parser.add_argument('--num-speakers', type=int, default=2)
+    parser.add_argument('--diarization-model', default='speaker-diarization-3.0')
+    parser.add_argument('--combine-method', default='semantic')
+    parser.add_argument('--formats', type=parse_formats,
+                        help="Comma-separated transcript formats to write besides the PDF (srt, vtt, jsonl, md)")
+    parser.add_argument('--overwrite', action='store_true', help="Reprocess files whose output already exists")
+    parser.add_argument('--max-retries', type=int, help="How often a failed file is queued again")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Queue every file that failed before again, even if it ran out of retries")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+
+    watch_options = get_watch_options(config_manager.config)
+    overrides = {
+        'directories': args.directories or None,
+        'workers': args.workers,
+        'recursive': args.recursive,
+        'stable_seconds': args.stable_seconds,
+        'poll_interval': args.poll_interval,
+        'state_path': args.state_path,
+        'use_native_events': False if args.polling else None,
+        'max_retries': args.max_retries
+    }
+    watch_options.update({k: v for k, v in overrides.items() if v is not None})
+    if not watch_options['directories']:
+        logger.error("[Watch] No directories to watch. Pass them as arguments or set watch.directories.")
+        return 1
+
+    job_options = {
+        'num_speakers': args.num_speakers,
+        'diarization_model': args.diarization_model,
+        'transcription_method': args.transcription_method,
+        'combine_method': args.combine_method,
+        'output_directory': args.output_directory,
+        'formats': args.formats
+    }
+    logger.info(f"[Watch] Watching {', '.join(watch_options['directories'])} with {watch_options['workers']} worker(s)")
+    results = run_watch(watch_options, job_options, skip_existing=not args.overwrite, retry_failed=args.retry_failed)
+    return 1 if any(r['status'] == 'failed' for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from utils.exporters import read_jsonl_export
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER,
+    output_pdf TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL REFERENCES meetings(id) ON DELETE CASCADE,
+    speaker TEXT NOT NULL,
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_meeting ON segments(meeting_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, speaker, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text, speaker) VALUES (new.id, new.text, new.speaker);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text, speaker) VALUES ('delete', old.id, old.text, old.speaker);
+END;
+"""
+
+def get_search_index_options(config):
+    options = {
+        'enabled': False,
+        'path': 'search/transcripts.db'
+    }
+    options.update(config.get('search_index', {}))
+    return options
+
+def _file_version(path):
+    """(size, mtime_ns) of `path`, or None if it doesn't exist."""
+    try:
+        stats = os.stat(path)
+    except OSError:
+        return None
+    return stats.st_size, stats.st_mtime_ns
+
+def _to_ms(seconds):
+    return None if seconds is None else int(round(seconds * 1000))
+
+def to_match_query(text):
+    """Turn free text into an FTS5 query matching all words, so punctuation can't break the syntax."""
+    words = re.findall(r"\w+", text, flags=re.UNICODE)
+    return ' '.join(f'"{word}"' for word in words)
+
+class TranscriptStore:
+    """SQLite FTS5 index of combined transcripts, one row per segment.
+
+    A meeting is identified by its source path and re-indexed only when the file's
+    size or mtime changes. The database runs in WAL mode and every write is a single
+    IMMEDIATE transaction, so several batch workers or processes can index while
+    others search. Each thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self._local.connection = connection
+        return _Transaction(connection)
+
+    def is_indexed(self, source, size=None, mtime_ns=None):
+        with self._connect() as connection:
+            row = connection.execute("SELECT size, mtime_ns FROM meetings WHERE source = ?", (source,)).fetchone()
+        return row is not None and row['size'] == size and row['mtime_ns'] == mtime_ns
+
+    def index(self, source, segments, output_pdf=None, version=None):
+        """Replace the indexed segments of `source`; returns the number of segments written.
+
+        `version` is the (size, mtime_ns) stored for change detection, by default that of `source`.
+        """
+        source = os.path.abspath(source)
+        size, mtime_ns = version or _file_version(source) or (None, None)
+        rows = [(segment['speaker'], _to_ms(segment.get('start')), _to_ms(segment.get('end')), segment['text'].strip())
+                for segment in segments]
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            # Deleting the meeting cascades to its segments, and the trigger keeps the FTS table in step
+            connection.execute("DELETE FROM meetings WHERE source = ?", (source,))
+            meeting_id = connection.execute(
+                "INSERT INTO meetings (source, size, mtime_ns, output_pdf, indexed_at) VALUES (?, ?, ?, ?, ?)",
+                (source, size, mtime_ns, output_pdf, time.time())).lastrowid
+            connection.executemany(
+                "INSERT INTO segments (meeting_id, speaker, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?)",
+                [(meeting_id,) + row for row in rows])
+            connection.execute("COMMIT")
+        logger.info(f"[Search] Indexed {len(rows)} segments from {source}")
+        return len(rows)
+
+    def index_exports(self, directory):
+        """Index every `*_transcription.jsonl` export below `directory` that is new or changed.
+
+        Exports name their recording in a header line, and the meeting is keyed on it
+        like the pipeline's own entries, so a meeting that is already indexed is not
+        added twice. While the recording exists its size and mtime decide whether the
+        meeting changed; otherwise the export's do. Exports without a header are keyed
+        on their own path.
+        """
+        indexed = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.endswith('_transcription.jsonl'):
+                    continue
+                path = os.path.abspath(os.path.join(root, name))
+                with open(path, 'r', encoding='utf-8') as f:
+                    header = f.readline()
+                try:
+                    source = json.loads(header).get('source') if header.strip() else None
+                except (ValueError, AttributeError):
+                    source = None
+                source = source or path
+                version = _file_version(source) or _file_version(path)
+                if self.is_indexed(source, *version):
+                    continue
+                _, segments = read_jsonl_export(path)
+                pdf = path[:-len('.jsonl')] + '.pdf'
+                self.index(source, segments, pdf if os.path.exists(pdf) else None, version)
+                indexed += 1
+        return indexed
+
+    def remove(self, source):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM meetings WHERE source = ?", (os.path.abspath(source),))
+
+    def search(self, query, limit=20, offset=0, speaker=None, raw=False):
+        """Return ranked hits: file, output PDF, speaker, start/end in milliseconds and a highlighted snippet.
+
+        `query` is free text matching segments that contain all of its words; with
+        `raw` it is passed to FTS5 unchanged (phrases, OR, NEAR, prefix*).
+        """
+        match = query if raw else to_match_query(query)
+        if not match:
+            return []
+        sql = ("SELECT m.source, m.output_pdf, s.speaker, s.start_ms, s.end_ms, "
+               "snippet(segments_fts, 0, '[', ']', '...', 16) AS snippet, bm25(segments_fts) AS rank "
+               "FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid "
+               "JOIN meetings m ON m.id = s.meeting_id "
+               "WHERE segments_fts MATCH ?")
+        params = [match]
+        if speaker is not None:
+            sql += " AND s.speaker = ?"
+            params.append(str(speaker))
+        sql += " ORDER BY rank LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._connect() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return [{
+            'file': row['source'],
+            'output_pdf': row['output_pdf'],
+            'speaker': row['speaker'],
+            'start_ms': row['start_ms'],
+            'end_ms': row['end_ms'],
+            'snippet': row['snippet'],
+            'rank': row['rank']
+        } for row in rows]
+
+    def stats(self):
+        with self._connect() as connection:
+            meetings = connection.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+            segments = connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {'meetings': meetings, 'segments': segments}
+
+    def optimize(self):
+        """Merge FTS index segments; worth running after large backfills."""
+        with self._connect() as connection:
+            connection.execute("INSERT INTO segments_fts(segments_fts) VALUES ('optimize')")
+
+class _Transaction:
+    """Context manager handing out a thread's connection and rolling back a failed write."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.connection.in_transaction:
+            self.connection.execute("ROLLBACK")
+        return False
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_transcript_store(path):
+    """One TranscriptStore per database path in this process."""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = TranscriptStore(path)
+        return _stores[path]
+
+def format_ms(milliseconds):
+    if milliseconds is None:
+        return '--:--:--'
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Search indexed meeting transcripts.")
+    parser.add_argument('query', nargs='?', help="Words to search for")
+    parser.add_argument('--db', help="Index database (default: search_index.path from the config)")
+    parser.add_argument('-n', '--limit', type=int, default=20)
+    parser.add_argument('--offset', type=int, default=0)
+    parser.add_argument('--speaker', help="Only hits from this speaker label")
+    parser.add_argument('--raw', action='store_true', help="Pass the query to FTS5 unchanged (phrases, OR, NEAR, prefix*)")
+    parser.add_argument('--json', action='store_true', help="Print hits as JSON lines")
+    parser.add_argument('--index', metavar='DIR', help="First index new or changed *_transcription.jsonl exports below DIR")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from utils.config_manager import get_config_manager
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    store = get_transcript_store(args.db or get_search_index_options(get_config_manager().config)['path'])
+
+    if args.index:
+        indexed = store.index_exports(args.index)
+        store.optimize()
+        logger.info(f"[Search] Indexed {indexed} new or changed transcript(s)")
+    if not args.query:
+        counts = store.stats()
+        print(f"{counts['meetings']} meetings, {counts['segments']} segments indexed")
+        return 0
+
+    try:
+        hits = store.search(args.query, args.limit, args.offset, args.speaker, args.raw)
+    except sqlite3.OperationalError as e:
+        logger.error(f"[Search] Invalid query: {str(e)}")
+        return 2
+    for hit in hits:
+        if args.json:
+            print(json.dumps(hit))
+        else:
+            print(f"{hit['file']}  {format_ms(hit['start_ms'])}  Speaker {hit['speaker']}: {hit['snippet']}")
+    return 0 if hits else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
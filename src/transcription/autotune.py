@@ -0,0 +1,256 @@
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+SAMPLE_RATE = 16000
+# Candidate compute types per device, most accurate first; the first supported one produces the reference text
+COMPUTE_TYPES = {
+    'cuda': ['float32', 'float16', 'int8_float16', 'int8_float32', 'int8'],
+    'cpu': ['float32', 'int8_float32', 'int8']
+}
+BEAM_SIZES = [1, 5]
+
+def probe_capabilities():
+    """Devices CTranslate2 can run Whisper on, with their supported compute types, and the host's cores."""
+    import ctranslate2
+    from utils.cpu import available_cpu_cores
+    devices = {'cpu': sorted(ctranslate2.get_supported_compute_types('cpu'))}
+    if ctranslate2.get_cuda_device_count() > 0:
+        devices['cuda'] = sorted(ctranslate2.get_supported_compute_types('cuda'))
+    return {'cores': available_cpu_cores(), 'devices': devices}
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance between two texts, relative to the reference length."""
+    reference, hypothesis = normalize_words(reference), normalize_words(hypothesis)
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    previous = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, 1):
+        current = [i]
+        for j, other in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (word != other)))
+        previous = current
+    return previous[-1] / len(reference)
+
+def _measure(candidate, model_name, samples, language, task):
+    """Load the model as `candidate` describes and transcribe `samples` once per worker, concurrently.
+
+    Runs in a fresh process so peak RSS and thread settings of one candidate don't
+    leak into the next.
+    """
+    from faster_whisper import WhisperModel
+    from utils.telemetry import PeakRssSampler
+
+    with PeakRssSampler() as sampler:
+        started = time.perf_counter()
+        model = WhisperModel(model_name, device=candidate['device'], compute_type=candidate['compute_type'],
+                             cpu_threads=candidate['cpu_threads'], num_workers=candidate['num_workers'])
+        load_seconds = time.perf_counter() - started
+        texts = [None] * candidate['num_workers']
+
+        def transcribe(index):
+            segments, _ = model.transcribe(samples, language=language, task=task, beam_size=candidate['beam_size'])
+            texts[index] = ' '.join(segment.text.strip() for segment in segments)
+
+        # One short pass first so one-off initialization is not counted as transcription time
+        list(model.transcribe(samples[:SAMPLE_RATE * 5], language=language, task=task, beam_size=1)[0])
+        started = time.perf_counter()
+        threads = [threading.Thread(target=transcribe, args=(index,)) for index in range(candidate['num_workers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+    audio_seconds = len(samples) / SAMPLE_RATE * candidate['num_workers']
+    return {
+        'load_seconds': load_seconds,
+        'seconds': seconds,
+        'rtf': seconds / audio_seconds,
+        'peak_rss_mb': sampler.peak / MB if sampler.peak else None,
+        'text': texts[0]
+    }
+
+class AutoTuner:
+    """Finds the fastest Whisper settings for this machine that stay within a quality tolerance.
+
+    Candidates are measured one at a time, each in its own process, on a reference
+    clip. Quality is the word error rate against a reference text: a given transcript,
+    or else the output of the most accurate setting (float32, beam 5). The search is
+    staged to keep the number of model loads small: compute type and beam size at
+    the default thread count first, then `cpu_threads` for the best passing CPU
+    setting, then `num_workers`. The real-time factor (RTF) is processing time over
+    audio time, so lower is faster.
+    """
+
+    def __init__(self, model_name, samples, language='en', task='transcribe', tolerance=0.05,
+                 max_memory_mb=None, reference_text=None):
+        self.model_name = model_name
+        self.samples = samples
+        self.language = language
+        self.task = task
+        self.tolerance = tolerance
+        self.max_memory_mb = max_memory_mb
+        self.reference_text = reference_text
+        self.results = []
+
+    def measure(self, candidate):
+        # Spawned, not forked: the parent has initialized ctranslate2 (and CUDA) while probing, and a forked
+        # child's peak RSS would include the parent's pages
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            try:
+                result = executor.submit(_measure, candidate, self.model_name, self.samples,
+                                         self.language, self.task).result()
+            except Exception as e:
+                logger.warning(f"[Autotune] {describe(candidate)} failed: {e}")
+                result = {'error': str(e)}
+        result = dict(candidate, **result)
+        if 'error' not in result:
+            if self.reference_text is None:
+                self.reference_text = result['text']
+            result['wer'] = word_error_rate(self.reference_text, result['text'])
+            result['passed'] = result['wer'] <= self.tolerance and (
+                not self.max_memory_mb or result['peak_rss_mb'] is None or result['peak_rss_mb'] <= self.max_memory_mb)
+            logger.info(f"[Autotune] {describe(candidate)}: RTF {result['rtf']:.3f}, WER {result['wer']:.1%}, "
+                        f"peak {result['peak_rss_mb'] or 0:.0f} MB")
+        else:
+            result['passed'] = False
+        self.results.append(result)
+        return result
+
+    def best(self):
+        passed = [result for result in self.results if result['passed']]
+        return min(passed, key=lambda result: result['rtf']) if passed else None
+
+    def run(self, devices, cpu_threads=None, workers=(1,)):
+        capabilities = probe_capabilities()
+        cores = capabilities['cores']
+        for device in devices:
+            supported = capabilities['devices'].get(device)
+            if supported is None:
+                logger.warning(f"[Autotune] No {device} device available, skipping it")
+                continue
+            compute_types = [compute_type for compute_type in COMPUTE_TYPES[device] if compute_type in supported]
+            # Most accurate setting first, so its text is the reference when none is given
+            for compute_type in compute_types:
+                for beam_size in sorted(BEAM_SIZES, reverse=True):
+                    self.measure({'device': device, 'compute_type': compute_type, 'cpu_threads': 0,
+                                  'num_workers': 1, 'beam_size': beam_size})
+
+        best = self.best()
+        if best is None:
+            return None
+        if best['device'] == 'cpu':
+            thread_counts = cpu_threads or sorted({max(1, cores // 4), max(1, cores // 2), cores})
+            for threads in thread_counts:
+                self.measure(dict(self._settings(best), cpu_threads=threads))
+            best = self.best()
+        for count in workers:
+            if count != best['num_workers']:
+                self.measure(dict(self._settings(best), num_workers=count))
+        return self.best()
+
+    @staticmethod
+    def _settings(result):
+        return {key: result[key] for key in ('device', 'compute_type', 'cpu_threads', 'num_workers', 'beam_size')}
+
+def describe(candidate):
+    return (f"{candidate['device']}/{candidate['compute_type']} threads={candidate['cpu_threads'] or 'auto'} "
+            f"workers={candidate['num_workers']} beam={candidate['beam_size']}")
+
+def print_results(results):
+    print(f"{'device':<6} {'compute_type':<14} {'threads':>7} {'workers':>7} {'beam':>4} {'RTF':>7} "
+          f"{'WER':>6} {'peak MB':>8} {'load s':>7}  ok")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['device']:<6} {result['compute_type']:<14} failed: {result['error']}")
+            continue
+        print(f"{result['device']:<6} {result['compute_type']:<14} {result['cpu_threads'] or 'auto':>7} "
+              f"{result['num_workers']:>7} {result['beam_size']:>4} {result['rtf']:>7.3f} {result['wer']:>6.1%} "
+              f"{result['peak_rss_mb'] or 0:>8.0f} {result['load_seconds']:>7.1f}  {'yes' if result['passed'] else 'no'}")
+
+def write_config(config_manager, model_name, best):
+    config_manager.set('model_options.local.model', model_name)
+    for key in ('device', 'compute_type', 'cpu_threads', 'num_workers', 'beam_size'):
+        config_manager.set(f"model_options.local.{key}", best[key])
+    config_manager.flush()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Find the fastest local Whisper settings for this machine")
+    parser.add_argument('clip', nargs='?', help="Reference audio clip; its first --seconds are used")
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--model', help="Whisper model (default: model_options.local.model from the config)")
+    parser.add_argument('--reference-text', help="File with a correct transcript of the clip excerpt; "
+                                                 "by default the most accurate setting's output is the reference")
+    parser.add_argument('--tolerance', type=float, default=0.05, help="Largest word error rate against the reference")
+    parser.add_argument('--devices', help="Comma-separated devices to try (default: cuda if available, else cpu)")
+    parser.add_argument('--threads', help="Comma-separated cpu_threads values to try (default: a quarter, half "
+                                          "and all of the cores)")
+    parser.add_argument('--workers', default='1', help="Comma-separated num_workers values to try; more than one "
+                                                       "only helps when several threads share one model")
+    parser.add_argument('--max-memory-mb', type=float, help="Reject settings whose peak memory exceeds this")
+    parser.add_argument('--report', help="Also write all measurements to this JSON file")
+    parser.add_argument('--dry-run', action='store_true', help="Report the best settings without saving them")
+    parser.add_argument('--probe', action='store_true', help="Only list devices and supported compute types")
+    args = parser.parse_args(argv)
+    if not args.probe and not args.clip:
+        parser.error("a reference clip is required unless --probe is given")
+    return args
+
+def main(argv=None):
+    from utils.config_manager import get_config_manager
+    from audio.file_processor import decode_window
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    capabilities = probe_capabilities()
+    print(f"{capabilities['cores']} CPU cores")
+    for device, compute_types in capabilities['devices'].items():
+        print(f"{device}: {', '.join(compute_types)}")
+    if args.probe:
+        return 0
+
+    config_manager = get_config_manager()
+    config = config_manager.config
+    samples = decode_window(args.clip, 0, args.seconds, SAMPLE_RATE)
+    if not len(samples):
+        logger.error(f"[Autotune] No audio decoded from {args.clip}")
+        return 1
+    reference_text = None
+    if args.reference_text:
+        with open(args.reference_text, 'r', encoding='utf-8') as f:
+            reference_text = f.read()
+    devices = args.devices.split(',') if args.devices else (['cuda'] if 'cuda' in capabilities['devices'] else ['cpu'])
+    tuner = AutoTuner(args.model or config['model_options']['local']['model'], samples,
+                      config['transcription']['language'], config['transcription']['task'],
+                      args.tolerance, args.max_memory_mb, reference_text)
+    best = tuner.run(devices, [int(n) for n in args.threads.split(',')] if args.threads else None,
+                     [int(n) for n in args.workers.split(',')])
+
+    print_results(tuner.results)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'capabilities': capabilities, 'model': tuner.model_name, 'clip': args.clip,
+                       'seconds': len(samples) / SAMPLE_RATE, 'results': tuner.results, 'best': best}, f, indent=2)
+    if best is None:
+        logger.error(f"[Autotune] No setting stayed within a word error rate of {args.tolerance:.0%}")
+        return 1
+    print(f"Fastest within tolerance: {describe(best)} (RTF {best['rtf']:.3f})")
+    if args.dry_run:
+        return 0
+    write_config(config_manager, tuner.model_name, best)
+    print(f"Saved to model_options.local in {config_manager.config_file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
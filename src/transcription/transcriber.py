@@ -1,59 +1,108 @@
 import os
+import math
+import time
+import shutil
 import logging
-import torch
-from groq import Groq
-from faster_whisper import WhisperModel
-from pydub import AudioSegment
 import tempfile
 from tqdm import tqdm
-from utils.config_manager import ConfigManager
+from utils.config_manager import get_config_manager
 
 logger = logging.getLogger(__name__)
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
 def create_groq_client():
+    from groq import Groq
     api_key = os.getenv('GROQ_API_KEY')
     if not api_key:
         raise ValueError("GROQ_API_KEY not found in environment variables")
     return Groq(api_key=api_key)
 
-def split_audio(file_path, max_size_mb=24):
+def split_audio(file_path, max_size_mb=24, output_dir=None):
+    """Split audio into mp3 chunks small enough for the Groq API.
+
+    Returns a list of [chunk_path, offset_seconds]. With `output_dir` the chunks are written
+    there under stable names, and chunks left by an earlier run are reused.
+    """
+    from pydub import AudioSegment
     audio = AudioSegment.from_file(file_path)
     max_size_bytes = max_size_mb * 1024 * 1024
+    chunk_ms = max_size_bytes // 32
     chunks = []
     
-    for i in tqdm(range(0, len(audio), max_size_bytes // 32), desc="[Transcription] Splitting audio"):
-        chunk = audio[i:i + max_size_bytes // 32]
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
-            chunk.export(temp_file.name, format="mp3")
-            chunks.append(temp_file.name)
+    for index, i in enumerate(tqdm(range(0, len(audio), chunk_ms), desc="[Transcription] Splitting audio")):
+        if output_dir:
+            chunk_path = os.path.join(output_dir, f"groq_chunk_{index:04d}.mp3")
+            if not os.path.exists(chunk_path):
+                # Export under a temporary name so an interrupted export is never mistaken for a chunk
+                audio[i:i + chunk_ms].export(chunk_path + '.tmp', format="mp3")
+                os.replace(chunk_path + '.tmp', chunk_path)
+        else:
+            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_file:
+                audio[i:i + chunk_ms].export(temp_file.name, format="mp3")
+                chunk_path = temp_file.name
+        chunks.append([chunk_path, i / 1000])
     
     return chunks
 
-def transcribe_audio_with_groq(file_path):
+def transcribe_audio_with_groq(file_path, progress=None, cancel_token=None, telemetry=None, checkpoint=None,
+                               streaming=False):
+    """Transcribe with the Groq API, splitting files over 25 MB into chunks.
+
+    With `streaming` the chunks are cut by ffmpeg one at a time instead of decoding the
+    whole recording with pydub, which keeps memory flat for long recordings.
+    """
     logger.info(f"[Transcription] Transcribing audio file with Groq: {file_path}")
     client = create_groq_client()
     config = config_manager.config
+    chunk_dir = None
     
     try:
         file_size = os.path.getsize(file_path)
         if file_size > 25 * 1024 * 1024:  # If file is larger than 25 MB
-            chunks = split_audio(file_path)
+            chunks = checkpoint.load('groq_chunks') if checkpoint else None
+            if chunks is None:
+                if streaming:
+                    from audio.file_processor import split_audio_stream
+                    chunk_dir = checkpoint.directory if checkpoint else tempfile.mkdtemp(prefix='groq_chunks_')
+                    # Same chunk length split_audio uses for its 24 MB limit
+                    chunks = split_audio_stream(file_path, (24 * 1024 * 1024 // 32) / 1000, chunk_dir)
+                else:
+                    chunks = split_audio(file_path, output_dir=checkpoint.directory if checkpoint else None)
+                if checkpoint:
+                    checkpoint.save('groq_chunks', chunks)
             transcription_result = []
-            for chunk in tqdm(chunks, desc="[Transcription] Processing chunks"):
-                with open(chunk, "rb") as audio_file:
-                    transcription = client.audio.transcriptions.create(
-                        file=audio_file,
-                        model=config['model_options']['groq']['model'],
-                        response_format="verbose_json",
-                        language=config['transcription']['language'],
-                        temperature=0.0
-                    )
-                transcription_result.extend([
-                    {'start': segment['start'], 'end': segment['end'], 'text': segment['text'].strip()}
-                    for segment in transcription.segments
-                ])
-                os.remove(chunk)  # Clean up temporary file
+            for index, (chunk, offset) in enumerate(tqdm(chunks, desc="[Transcription] Processing chunks")):
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                unit = f"transcription_chunk_{index:04d}"
+                chunk_segments = checkpoint.load(unit) if checkpoint else None
+                if chunk_segments is None:
+                    chunk_start = time.perf_counter()
+                    with open(chunk, "rb") as audio_file:
+                        transcription = client.audio.transcriptions.create(
+                            file=audio_file,
+                            model=config['model_options']['groq']['model'],
+                            response_format="verbose_json",
+                            language=config['transcription']['language'],
+                            temperature=0.0
+                        )
+                    # Groq timestamps are relative to the chunk
+                    chunk_segments = [
+                        {'start': segment['start'] + offset, 'end': segment['end'] + offset,
+                         'text': segment['text'].strip()}
+                        for segment in transcription.segments
+                    ]
+                    if telemetry is not None:
+                        telemetry.add_record('transcribe_chunk', time.perf_counter() - chunk_start,
+                                             chunk_segments[-1]['end'] - offset if chunk_segments else None,
+                                             chunk=index)
+                    if checkpoint:
+                        checkpoint.save(unit, chunk_segments)
+                transcription_result.extend(chunk_segments)
+                if os.path.exists(chunk):
+                    os.remove(chunk)  # Clean up temporary file
+                if progress is not None:
+                    progress((index + 1) / len(chunks), transcription_result[-1]['end'] if transcription_result else None)
         else:
             with open(file_path, "rb") as audio_file:
                 transcription = client.audio.transcriptions.create(
@@ -73,32 +122,128 @@ def transcribe_audio_with_groq(file_path):
     except Exception as e:
         logger.error(f"[Transcription] Error during Groq transcription: {str(e)}")
         raise
+    finally:
+        if chunk_dir and not checkpoint:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+# Compute types that only run natively on a GPU, and what to use instead when the model ends up on the CPU
+GPU_ONLY_COMPUTE_TYPES = {'float16': 'int8', 'int8_float16': 'int8', 'bfloat16': 'int8', 'int8_bfloat16': 'int8'}
 
-def create_local_model(config):
+def create_local_model(config, cpu_threads=None, num_workers=None):
+    """Whisper model from `model_options.local`; explicit `cpu_threads` / `num_workers` override the config."""
+    import torch
+    from faster_whisper import WhisperModel
     logger.info("[Transcription] Creating local Whisper model...")
     local_model_options = config['model_options']['local']
     if config['use_cuda'] and torch.cuda.is_available() and local_model_options['device'] != 'cpu':
         device = "cuda"
     else:
         device = "cpu"
+    compute_type = local_model_options['compute_type']
+    if device == "cpu" and compute_type in GPU_ONLY_COMPUTE_TYPES:
+        # CTranslate2 would silently run these in float32 on the CPU
+        compute_type = GPU_ONLY_COMPUTE_TYPES[compute_type]
+        logger.info(f"[Transcription] {local_model_options['compute_type']} is not supported on CPU, using {compute_type}. "
+                    f"Run run_autotune.py to pick the fastest settings for this machine.")
     
     try:
         model = WhisperModel(local_model_options['model'],
                              device=device,
-                             compute_type=local_model_options['compute_type'])
+                             compute_type=compute_type,
+                             cpu_threads=local_model_options['cpu_threads'] if cpu_threads is None else cpu_threads,
+                             num_workers=local_model_options['num_workers'] if num_workers is None else num_workers)
         logger.info(f"[Transcription] Local Whisper model ({local_model_options['model']}) created with {device.upper()}.")
         return model, device
     except Exception as e:
         logger.error(f'[Transcription] Error initializing WhisperModel with {device.upper()}: {e}')
         raise
 
-def transcribe_audio(model, file_path):
-    logger.info(f"[Transcription] Transcribing audio file: {file_path}...")
+# Whisper decodes audio in 30 second windows; local transcription telemetry is recorded per window
+WHISPER_WINDOW_SECONDS = 30
+
+def _transcribe_segments(model, audio, offset=0.0, total_duration=None, progress=None, cancel_token=None, telemetry=None,
+                         beam_size=None):
     config = config_manager.config
-    segments, info = model.transcribe(file_path, 
+    segments, info = model.transcribe(audio, 
                                       language=config['transcription']['language'],
-                                      task=config['transcription']['task'])
-    transcription = [{'start': segment.start, 'end': segment.end, 'text': segment.text} for segment in segments]
+                                      task=config['transcription']['task'],
+                                      beam_size=beam_size or config['model_options']['local']['beam_size'])
+    total_duration = total_duration or info.duration
+    # Segments are decoded lazily, so progress and cancellation can be checked per segment
+    transcription = []
+    window_start, window_audio_start = time.perf_counter(), offset
+    for segment in segments:
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        start, end = segment.start + offset, segment.end + offset
+        transcription.append({'start': start, 'end': end, 'text': segment.text})
+        if progress is not None and total_duration:
+            progress(end / total_duration, end)
+        if telemetry is not None and end - window_audio_start >= WHISPER_WINDOW_SECONDS:
+            now = time.perf_counter()
+            telemetry.add_record('transcribe_chunk', now - window_start, end - window_audio_start,
+                                 chunk_start=window_audio_start)
+            window_start, window_audio_start = now, end
+    return transcription
+
+def _transcribe_checkpointed(model, file_path, checkpoint, chunk_seconds, progress, cancel_token, telemetry,
+                             streaming=False, beam_size=None):
+    """Transcribe fixed windows of `chunk_seconds`, persisting each finished window as a checkpoint unit.
+
+    `checkpoint` may be None. With `streaming` each window is decoded from the file
+    on its own, so only one window of samples is held at a time.
+    """
+    sampling_rate = model.feature_extractor.sampling_rate
+    if streaming:
+        from audio.file_processor import get_stream_duration, decode_window
+        total_duration = get_stream_duration(file_path)
+        window_count = math.ceil(total_duration / chunk_seconds)
+        window_samples = lambda index: decode_window(file_path, index * chunk_seconds, chunk_seconds, sampling_rate)
+    else:
+        from faster_whisper.audio import decode_audio
+        samples = decode_audio(file_path, sampling_rate=sampling_rate) if isinstance(file_path, str) else file_path
+        total_duration = len(samples) / sampling_rate
+        window = int(chunk_seconds * sampling_rate)
+        window_count = math.ceil(len(samples) / window)
+        window_samples = lambda index: samples[index * window:(index + 1) * window]
+
+    transcription = []
+    resumed = 0
+    for index in range(max(1, window_count)):
+        unit = f"transcription_chunk_{index:04d}"
+        chunk = checkpoint.load(unit) if checkpoint else None
+        if chunk is None:
+            chunk = _transcribe_segments(model, window_samples(index), index * chunk_seconds,
+                                         total_duration, progress, cancel_token, telemetry, beam_size)
+            if checkpoint:
+                checkpoint.save(unit, chunk)
+        else:
+            resumed += 1
+        transcription.extend(chunk)
+    if resumed:
+        logger.info(f"[Transcription] Reused {resumed} checkpointed chunk(s).")
+    return transcription
+
+def transcribe_audio(model, file_path, progress=None, cancel_token=None, telemetry=None, checkpoint=None, chunk_seconds=600,
+                     window_seconds=None, beam_size=None):
+    """Transcribe with a local Whisper model.
+
+    With `window_seconds` the file is decoded and transcribed one window at a time
+    (checkpointed runs keep their `chunk_seconds` windows) instead of decoding it whole.
+    `beam_size` overrides `model_options.local.beam_size`.
+    """
+    source = file_path if isinstance(file_path, str) else "in-memory audio"
+    logger.info(f"[Transcription] Transcribing audio file: {source}...")
+    if window_seconds and isinstance(file_path, str):
+        transcription = _transcribe_checkpointed(model, file_path, checkpoint,
+                                                 chunk_seconds if checkpoint else window_seconds,
+                                                 progress, cancel_token, telemetry, streaming=True, beam_size=beam_size)
+    elif checkpoint is None:
+        transcription = _transcribe_segments(model, file_path, progress=progress, cancel_token=cancel_token,
+                                             telemetry=telemetry, beam_size=beam_size)
+    else:
+        transcription = _transcribe_checkpointed(model, file_path, checkpoint, chunk_seconds,
+                                                 progress, cancel_token, telemetry, beam_size=beam_size)
     logger.info("[Transcription] Local transcription completed.")
     return transcription
 
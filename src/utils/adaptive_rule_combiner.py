@@ -1,5 +1,6 @@
 import logging
 import numpy as np
+from .running_stats import RunningStats
 
 logger = logging.getLogger(__name__)
 
@@ -22,19 +23,22 @@ class AdaptiveRuleCombiner:
         return (overlap_ratio + coverage_ratio) / 2
 
     def adapt_thresholds(self, transcription, diarization):
-        overlap_ratios = []
-        gaps = []
-        
+        # Mean and standard deviation over all (transcript, diarization) pairs, accumulated one
+        # transcript segment at a time so memory stays O(len(diarization)) instead of O(T x D)
+        dia_start = np.array([dia['start'] for dia in diarization], dtype=np.float64)
+        dia_end = np.array([dia['end'] for dia in diarization], dtype=np.float64)
+        dia_duration = dia_end - dia_start
+        overlap_stats = RunningStats()
+        gap_stats = RunningStats()
+
         for trans in transcription:
-            for dia in diarization:
-                score = self.segment_score(trans, dia)
-                overlap_ratios.append(score)
-                
-                gap = abs(trans['start'] - dia['start'])
-                gaps.append(gap)
-        
-        self.overlap_threshold = np.mean(overlap_ratios) - 0.5 * np.std(overlap_ratios)
-        self.gap_threshold = np.mean(gaps) + np.std(gaps)
+            overlap = np.maximum(0, np.minimum(trans['end'], dia_end) - np.maximum(trans['start'], dia_start))
+            scores = (overlap / (trans['end'] - trans['start']) + overlap / dia_duration) / 2
+            overlap_stats.add(scores)
+            gap_stats.add(np.abs(trans['start'] - dia_start))
+
+        self.overlap_threshold = overlap_stats.mean - 0.5 * overlap_stats.std
+        self.gap_threshold = gap_stats.mean + gap_stats.std
         
         logger.info(f"Adapted thresholds - Overlap: {self.overlap_threshold:.2f}, Gap: {self.gap_threshold:.2f}")
 
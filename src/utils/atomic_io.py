@@ -0,0 +1,39 @@
+import os
+import json
+import stat
+import tempfile
+
+# os.umask can only be read by setting it, so read it once at import rather than racing other threads later
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def _file_mode(path):
+    """Permissions for the new version of `path`: those of the existing file, else what open() would use."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+def atomic_write_text(path, text):
+    """Write `text` to `path` so readers only ever see the old or the complete new file.
+
+    mkstemp creates the temporary file 0600; its mode is set to the existing file's
+    (or the umask default) before it replaces `path`.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, _file_mode(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def atomic_write_json(path, data, indent=None):
+    atomic_write_text(path, json.dumps(data, indent=indent))
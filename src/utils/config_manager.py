@@ -1,19 +1,93 @@
 import json
 import os
+import copy
+import atexit
 import shutil
+import logging
+import threading
+from .atomic_io import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+class ConfigError(ValueError):
+    pass
+
+def _type_name(value):
+    return type(value).__name__
+
+def _matches(default, value):
+    """Whether `value` has the type the default config uses for this key."""
+    if default is None or value is None:
+        return True
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, float):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if isinstance(default, int):
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, type(default))
+
+def validate_config(config, schema, prefix=''):
+    """Return a list of problems where `config` disagrees with the types in `schema`.
+
+    The default config doubles as the schema: every key it defines must have the
+    same type in `config`. Keys the defaults don't know about are left alone.
+    """
+    problems = []
+    for key, default in schema.items():
+        if key not in config:
+            continue
+        value = config[key]
+        path = f"{prefix}{key}"
+        if not _matches(default, value):
+            problems.append(f"{path}: expected {_type_name(default)}, got {_type_name(value)}")
+        elif isinstance(default, dict) and default:
+            problems.extend(validate_config(value, default, f"{path}."))
+    return problems
+
+def _merge_defaults(config, defaults):
+    """Fill in missing keys from `defaults` and replace values of the wrong type."""
+    for key, default in defaults.items():
+        if key not in config:
+            config[key] = copy.deepcopy(default)
+        elif not _matches(default, config[key]):
+            logger.warning(f"Config value {key}={config[key]!r} has the wrong type, using default {default!r}")
+            config[key] = copy.deepcopy(default)
+        elif isinstance(default, dict) and default:
+            _merge_defaults(config[key], default)
 
 class ConfigManager:
-    def __init__(self, config_file='config.json'):
+    """Config/config.json, with defaults filled in and values type-checked on load.
+
+    `get` and `set` take dotted paths (`'pdf_output.font_size'`). Saving is debounced:
+    `save_config` schedules an atomic write `save_delay` seconds later, so a burst of
+    changes is written once; `flush` writes immediately and runs at interpreter exit.
+    Callbacks registered with `subscribe` are called with the set of top-level keys
+    that changed whenever a change is saved or the file is reloaded; they may run on
+    the saving thread, so GUI code should hand off to its event loop. Use
+    `get_config_manager()` to share one instance across the process.
+    """
+
+    def __init__(self, config_file='config.json', save_delay=0.5):
         self.config_dir = 'Config'
         self.config_file = os.path.join(self.config_dir, config_file)
         self.template_file = 'config.template.json'
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._timer = None
+        self._subscribers = []
         self.config = self._load_config()
+        self._saved = copy.deepcopy(self.config)
+        atexit.register(self.flush)
 
     def _load_config(self):
         if os.path.exists(self.config_file):
             with open(self.config_file, 'r') as f:
-                return json.load(f)
-        return self._create_config_from_template()
+                config = json.load(f)
+        else:
+            config = self._create_config_from_template()
+        _merge_defaults(config, self._get_default_config())
+        return config
 
     def _create_config_from_template(self):
         if os.path.exists(self.template_file):
@@ -29,48 +103,236 @@ class ConfigManager:
     def _get_default_config(self):
         return {
             'misc': {
-                'print_to_terminal': True
+                'print_to_terminal': True,
+                'warm_up_imports': True
             },
             'model_options': {
                 'local': {
                     'model': 'medium.en',
                     'device': 'cuda',
-                    'compute_type': 'float16'
+                    'compute_type': 'float16',
+                    'cpu_threads': 0,
+                    'num_workers': 1,
+                    'beam_size': 5
                 },
                 'groq': {
                     'model': 'whisper-large-v3'
                 }
             },
             'use_cuda': True,
+            'stage_executor': {
+                'enabled': False,
+                'whisper_cpu_threads': 0,
+                'whisper_num_workers': 1,
+                'diarization_threads': 0
+            },
             'output_directory': 'transcriptions',
             'diarization': {
                 'min_speakers': 1,
                 'max_speakers': 10,
-                'default_num_speakers': 2
+                'default_num_speakers': 2,
+                'cpu_performance': {
+                    'enabled': False,
+                    'intra_op_threads': 0,
+                    'inter_op_threads': 0,
+                    'quantize_embedding': False,
+                    'embedding_batch_size': 32
+                }
             },
             'transcription': {
                 'language': 'en',
                 'task': 'transcribe'
             },
+            'telemetry': {
+                'enabled': False,
+                'jsonl_path': 'telemetry/stages.jsonl',
+                'prometheus_path': ''
+            },
+            'profiling': {
+                'enabled': False,
+                'mode': 'sampling',
+                'interval_ms': 5,
+                'top_n': 30
+            },
+            'checkpointing': {
+                'enabled': False,
+                'directory': 'checkpoints',
+                'chunk_seconds': 600,
+                'max_age_days': 7
+            },
+            'file_browser': {
+                'metadata_workers': 4,
+                'metadata_cache': 'cache/media_metadata.json'
+            },
+            'watch': {
+                'directories': [],
+                'recursive': False,
+                'workers': 1,
+                'poll_interval': 2.0,
+                'stable_seconds': 5.0,
+                'state_path': 'watch/state.json',
+                'use_native_events': True,
+                'max_retries': 3,
+                'retry_backoff_seconds': 60.0
+            },
+            'search_index': {
+                'enabled': False,
+                'path': 'search/transcripts.db'
+            },
+            'memory_budget': {
+                'enabled': False,
+                'budget_mb': 0,
+                'model_reserve_mb': 4096,
+                'window_seconds': 1800.0,
+                'on_exceed': 'queue',
+                'spill_directory': 'cache/spill'
+            },
+            'speaker_index': {
+                'enabled': False,
+                'directory': 'speakers',
+                'threshold': 0.6,
+                'new_identity_prefix': 'Person',
+                'ann_threshold': 100000
+            },
+            'two_pass': {
+                'enabled': False,
+                'draft_model': 'base',
+                'draft_compute_type': 'int8',
+                'draft_beam_size': 1,
+                'region_seconds': 600.0,
+                'region_overlap_seconds': 2.0,
+                'refine_method': ''
+            },
+            'job_history': {
+                'enabled': True,
+                'path': 'history/jobs.db',
+                'window': 50,
+                'max_jobs': 5000,
+                'schedule': 'fifo'
+            },
+            'sentence_embeddings': {
+                'backend': 'torch',
+                'onnx_directory': 'models/onnx',
+                'full_precision': False,
+                'threads': 0,
+                'batch_size': 32
+            },
+            'export': {
+                'formats': []
+            },
             'pdf_output': {
                 'font_size': 12,
-                'line_spacing': 1.2
+                'line_spacing': 1.2,
+                'parallel_workers': 0,
+                'chunk_blocks': 2000
             }
         }
 
-    def save_config(self):
-        # Ensure the Config directory exists
-        os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=4)
+    def validate_file(self):
+        """Problems in the config file as written, before defaults replace invalid values."""
+        if not os.path.exists(self.config_file):
+            return []
+        with open(self.config_file, 'r') as f:
+            return validate_config(json.load(f), self._get_default_config())
+
+    def _resolve(self, key):
+        """Return the dict holding the last part of a dotted key, and that part."""
+        parts = key.split('.')
+        node = self.config
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        return node, parts[-1]
 
     def get(self, key, default=None):
-        return self.config.get(key, default)
+        with self._lock:
+            node = self.config
+            for part in key.split('.'):
+                if not isinstance(node, dict) or part not in node:
+                    return default
+                node = node[part]
+            return node
 
     def set(self, key, value):
-        self.config[key] = value
+        schema = self._get_default_config()
+        for part in key.split('.'):
+            schema = schema.get(part) if isinstance(schema, dict) else None
+        if not _matches(schema, value):
+            raise ConfigError(f"{key}: expected {_type_name(schema)}, got {_type_name(value)}")
+        with self._lock:
+            node, name = self._resolve(key)
+            node[name] = value
         self.save_config()
 
     def update(self, new_config):
-        self.config.update(new_config)
-        self.save_config()
\ No newline at end of file
+        problems = validate_config(new_config, self._get_default_config())
+        if problems:
+            raise ConfigError("; ".join(problems))
+        with self._lock:
+            self.config.update(new_config)
+        self.save_config()
+
+    def subscribe(self, callback):
+        """Call `callback(changed_keys)` after each saved change; returns a function that unsubscribes."""
+        with self._lock:
+            self._subscribers.append(callback)
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def save_config(self):
+        """Schedule a write of the current config; changes made before it runs are written together."""
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.save_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now and notify subscribers."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            changed = {key for key in set(self.config) | set(self._saved)
+                       if self.config.get(key) != self._saved.get(key)}
+            if not changed:
+                return
+            text = json.dumps(self.config, indent=4)
+            self._saved = copy.deepcopy(self.config)
+            atomic_write_text(self.config_file, text)
+        self._notify(changed)
+
+    def reload(self):
+        """Re-read the file, e.g. after it was edited by hand, and notify subscribers of what changed."""
+        with self._lock:
+            config = self._load_config()
+            changed = {key for key in set(config) | set(self.config) if config.get(key) != self.config.get(key)}
+            # Update in place so modules holding a reference to .config see the new values
+            self.config.clear()
+            self.config.update(config)
+            self._saved = copy.deepcopy(config)
+        if changed:
+            self._notify(changed)
+        return changed
+
+    def _notify(self, changed):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Config change callback failed: {str(e)}")
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_config_manager():
+    """The process-wide ConfigManager, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ConfigManager()
+        return _shared
@@ -0,0 +1,7 @@
+import os
+
+def available_cpu_cores():
+    """Cores this process may run on: its CPU affinity where supported, else the machine's core count."""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
@@ -0,0 +1,185 @@
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def format_timestamp(seconds, separator='.'):
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}"
+
+def has_times(segment):
+    return segment.get('start') is not None and segment.get('end') is not None
+
+class Exporter:
+    """Writes one transcript format segment by segment.
+
+    Output goes to `<path>.part` and is renamed to `path` by `close`, so a file with
+    the final name is always complete. Subclasses implement `write_segment` and may
+    override `header` / `footer`. `source` is the recording the transcript belongs to.
+    """
+    extension = None
+
+    def __init__(self, path, title=None, source=None):
+        self.path = path
+        self.title = title
+        self.source = source
+        self.count = 0
+        self._part_path = path + '.part'
+        self._file = open(self._part_path, 'w', encoding='utf-8')
+        self._file.write(self.header())
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def write(self, segment):
+        text = self.write_segment(segment)
+        if text:
+            self.count += 1
+            self._file.write(text)
+
+    def write_segment(self, segment):
+        raise NotImplementedError
+
+    def close(self):
+        self._file.write(self.footer())
+        self._file.close()
+        os.replace(self._part_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
+
+class SrtExporter(Exporter):
+    extension = 'srt'
+
+    def write_segment(self, segment):
+        if not has_times(segment):
+            return ''
+        # Cues are numbered from 1
+        return (f"{self.count + 1}\n"
+                f"{format_timestamp(segment['start'], ',')} --> {format_timestamp(segment['end'], ',')}\n"
+                f"Speaker {segment['speaker']}: {segment['text'].strip()}\n\n")
+
+class WebVttExporter(Exporter):
+    extension = 'vtt'
+
+    def header(self):
+        return "WEBVTT\n\n"
+
+    def write_segment(self, segment):
+        if not has_times(segment):
+            return ''
+        return (f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n"
+                f"<v Speaker {segment['speaker']}>{segment['text'].strip()}\n\n")
+
+class JsonlExporter(Exporter):
+    """One JSON object per segment, after a header line naming the source recording (see read_jsonl_export)."""
+    extension = 'jsonl'
+
+    def header(self):
+        if self.source is None:
+            return ''
+        return json.dumps({'source': os.path.abspath(self.source)}, ensure_ascii=False) + "\n"
+
+    def write_segment(self, segment):
+        return json.dumps(segment, ensure_ascii=False) + "\n"
+
+def read_jsonl_export(path):
+    """Return (source recording or None, segments) of a JSON-lines export.
+
+    Exports written before the header line was added have no source.
+    """
+    source = None
+    segments = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not segments and source is None and 'text' not in item and 'source' in item:
+                source = item['source']
+            else:
+                segments.append(item)
+    return source, segments
+
+class MarkdownExporter(Exporter):
+    extension = 'md'
+
+    def __init__(self, path, title=None, source=None):
+        self._speaker = None
+        super().__init__(path, title, source)
+
+    def header(self):
+        return f"# {self.title}\n\n" if self.title else ''
+
+    def write_segment(self, segment):
+        text = segment['text'].strip()
+        if segment['speaker'] == self._speaker:
+            # Same speaker keeps talking: continue under the existing heading
+            return f"{text}\n\n"
+        self._speaker = segment['speaker']
+        heading = f"### Speaker {segment['speaker']}"
+        if has_times(segment):
+            heading += f" ({format_timestamp(segment['start'])[:8]})"
+        return f"{heading}\n\n{text}\n\n"
+
+EXPORTERS = {
+    'srt': SrtExporter,
+    'vtt': WebVttExporter,
+    'jsonl': JsonlExporter,
+    'md': MarkdownExporter
+}
+
+def parse_formats(text):
+    """Parse a comma-separated list such as 'srt,vtt' into export format names."""
+    formats = [f.strip().lower() for f in text.split(',') if f.strip()]
+    unknown = [f for f in formats if f not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}")
+    return formats
+
+def get_export_path(original_file_path, output_dir, export_format):
+    base_name = os.path.splitext(os.path.basename(original_file_path))[0]
+    return os.path.join(output_dir, f"{base_name}_transcription.{EXPORTERS[export_format].extension}")
+
+def export_transcript(segments, original_file_path, formats, output_directory):
+    """Write `segments` in every requested format in a single pass and return {format: path}.
+
+    `segments` may be any iterable, including the generator returned by
+    `stream_transcription_diarization`; it is consumed once and never held in memory
+    here. If writing fails, partially written files are removed.
+    """
+    unknown = [f for f in formats if f not in EXPORTERS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)}")
+    if not formats:
+        return {}
+
+    os.makedirs(output_directory, exist_ok=True)
+    title = os.path.splitext(os.path.basename(original_file_path))[0]
+    exporters = {}
+    try:
+        for export_format in formats:
+            path = get_export_path(original_file_path, output_directory, export_format)
+            exporters[export_format] = EXPORTERS[export_format](path, title, original_file_path)
+        for segment in segments:
+            for exporter in exporters.values():
+                exporter.write(segment)
+    except BaseException:
+        for exporter in exporters.values():
+            exporter.abort()
+        raise
+
+    for exporter in exporters.values():
+        exporter.close()
+    paths = {export_format: exporter.path for export_format, exporter in exporters.items()}
+    logger.info(f"[Output] Exported {', '.join(paths.values())}")
+    return paths
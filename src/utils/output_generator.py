@@ -1,57 +1,292 @@
+import io
 import os
+import copy
+import atexit
+import tempfile
 import logging
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from fpdf import FPDF
-from .config_manager import ConfigManager
+from fpdf.enums import XPos, YPos
+from .config_manager import get_config_manager
+from .exporters import format_timestamp
+from .cpu import available_cpu_cores
 
 logger = logging.getLogger(__name__)
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
-def create_pdf(final_transcription, original_file_path):
-    config = config_manager.config
-    logger.info("[Output] Creating PDF document...")
+# Long-lived so workers keep fpdf and fontTools imported between jobs
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Custom fonts parsed in this process (main process or PDF worker), keyed by path and modification time
+_parsed_fonts = {}
+_parsed_fonts_lock = threading.Lock()
+
+def get_pdf_options(config):
+    options = {
+        'font_size': 12,
+        'line_spacing': 1.2,
+        'parallel_workers': 0,
+        'chunk_blocks': 2000
+    }
+    options.update(config.get('pdf_output', {}))
+    return options
+
+def get_output_pdf_path(original_file_path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(original_file_path))[0] + '_transcription.pdf')
+
+def build_blocks(final_transcription):
+    """Group consecutive segments of the same speaker into (header, text) blocks."""
+    blocks = []
+    speaker = None
+    texts = []
+    header = None
+    for item in final_transcription:
+        if item['speaker'] != speaker:
+            if texts:
+                blocks.append((header, ' '.join(texts)))
+            speaker = item['speaker']
+            texts = []
+            header = f"Speaker {speaker}"
+            if item.get('start') is not None:
+                header += f" ({format_timestamp(item['start'])[:8]})"
+        texts.append(item['text'].strip())
+    if texts:
+        blocks.append((header, ' '.join(texts)))
+    return blocks
+
+def _wrap_lines(text, max_width, word_width, space_width):
+    """Greedy word wrap using cached word widths; returns None if a single word doesn't fit."""
+    lines = []
+    line = []
+    width = 0
+    for word in text.split():
+        w = word_width(word)
+        if w > max_width:
+            return None
+        if line and width + space_width + w > max_width:
+            lines.append(' '.join(line))
+            line = [word]
+            width = w
+        else:
+            width += (space_width if line else 0) + w
+            line.append(word)
+    if line:
+        lines.append(' '.join(line))
+    return lines
+
+def _add_font(pdf, font_name, font_path):
+    """Register a TTF font with `pdf`, parsing the file only once per process.
+
+    fpdf's own `add_font` reads the whole font for every document (and every parallel
+    chunk). The first call here lets it do so on a template document; later documents
+    get a copy of that font object that shares the metrics, widths and glyph ids.
+    fpdf subsets a font's fontTools object in place when writing, so each copy loads
+    its own from the cached file bytes, lazily, and starts with an empty subset.
+    """
+    key = (font_path, os.stat(font_path).st_mtime_ns)
+    with _parsed_fonts_lock:
+        cached = _parsed_fonts.get(key)
+        if cached is None:
+            template = FPDF()
+            template.add_font(font_name, "", font_path)
+            with open(font_path, 'rb') as f:
+                data = f.read()
+            cached = _parsed_fonts[key] = (template.fonts[font_name.lower()], data)
+    template_font, data = cached
+    try:
+        from fontTools import ttLib
+        from fpdf.fonts import SubsetMap
+        font = copy.copy(template_font)
+        font.i = len(pdf.fonts) + 1
+        font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.missing_glyphs = []
+        font.subset = SubsetMap(font, list(template_font.subset._reserved))
+    except (ImportError, AttributeError) as e:
+        # fpdf internals changed (fpdf2 is pinned in requirements.txt); parse the font per document instead
+        logger.debug(f"[Output] Font cache unavailable, adding {font_name} directly: {str(e)}")
+        pdf.add_font(font_name, "", font_path)
+        return
+    pdf.fonts[font.fontkey] = font
+
+def _render_blocks(blocks, font_path, font_name, font_size, line_spacing):
+    """Lay out blocks into a new document and return (PDF bytes, page count).
+
+    Text is wrapped here with a per-document cache of word widths and written one
+    `cell` per line, which is much cheaper than fpdf's per-character line breaking
+    in `multi_cell` for long transcripts.
+    """
     pdf = FPDF()
-    pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
+    if font_path and font_name:
+        _add_font(pdf, font_name, font_path)
+        pdf.set_font(font_name, size=font_size)
+    else:
+        pdf.set_font("Arial", size=font_size)
+    pdf.add_page()
+    height = line_spacing * font_size
+    max_width = pdf.epw - 2 * pdf.c_margin
+    widths = {}
+
+    def word_width(word):
+        width = widths.get(word)
+        if width is None:
+            width = widths[word] = pdf.get_string_width(word)
+        return width
+
+    space_width = pdf.get_string_width(' ')
+    for header, text in blocks:
+        pdf.cell(0, height, header, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        lines = _wrap_lines(text, max_width, word_width, space_width)
+        if lines is None:
+            # Very long words (URLs, etc.) need fpdf's character-level breaking
+            pdf.multi_cell(0, height, text, align='L', border=0, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        else:
+            for line in lines:
+                pdf.cell(0, height, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        pdf.ln()
+    return bytes(pdf.output()), pdf.page_no()
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pdf_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+            _pool_workers = 0
+
+atexit.register(shutdown_pdf_pool)
+
+def _parallel_workers(options, block_count):
+    if block_count <= options['chunk_blocks']:
+        return 1
+    workers = options['parallel_workers'] or min(4, available_cpu_cores())
+    return max(1, min(workers, -(-block_count // options['chunk_blocks'])))
 
-    # Check for custom font
+def write_pdf(final_transcription, pdf_file_name, options, spill_directory=None):
+    """Render the transcript to `pdf_file_name` and return the number of pages.
+
+    Long transcripts are split into chunks of `chunk_blocks` speaker blocks that are
+    laid out in parallel worker processes and concatenated with pypdf. Each chunk
+    starts on a new page. Without pypdf, or for short transcripts, the document is
+    rendered in this process. With `spill_directory` (low-memory mode) chunks are
+    rendered one at a time in this process and written there before being merged, so
+    only one chunk's layout is in memory at once.
+    """
+    blocks = build_blocks(final_transcription)
     font_path, font_name = check_custom_font()
     if font_path and font_name:
-        pdf.add_font(font_name, "", font_path, uni=True)
-        pdf.set_font(font_name, size=config['pdf_output']['font_size'])
         logger.info(f"[Output] Using custom font: {font_name} ({font_path})")
     else:
-        pdf.set_font("Arial", size=config['pdf_output']['font_size'])
         logger.info("[Output] Using system font: Arial")
 
-    # Add transcription with speaker info to the PDF
-    for item in final_transcription:
-        pdf.multi_cell(0, config['pdf_output']['line_spacing'] * config['pdf_output']['font_size'], 
-                       f"Speaker {item['speaker']}: {item['text']}", align='L', border=0)
-        pdf.ln()
+    spill = spill_directory is not None and len(blocks) > options['chunk_blocks']
+    workers = 1 if spill else _parallel_workers(options, len(blocks))
+    if workers > 1 or spill:
+        try:
+            from pypdf import PdfReader, PdfWriter
+        except ImportError:
+            logger.warning("[Output] pypdf is not installed (see requirements.txt), rendering the PDF as one document")
+            workers = 1
+            spill = False
+
+    if workers == 1 and not spill:
+        data, pages = _render_blocks(blocks, font_path, font_name, options['font_size'], options['line_spacing'])
+        with open(pdf_file_name, 'wb') as f:
+            f.write(data)
+        return pages
+
+    size = options['chunk_blocks']
+    chunks = [blocks[i:i + size] for i in range(0, len(blocks), size)]
+    render = functools.partial(_render_blocks, font_path=font_path, font_name=font_name,
+                               font_size=options['font_size'], line_spacing=options['line_spacing'])
+    if spill:
+        return _write_spilled(chunks, render, pdf_file_name, spill_directory)
+
+    logger.info(f"[Output] Rendering {len(chunks)} PDF chunks on {workers} worker processes")
+    writer = PdfWriter()
+    pages = 0
+    # map keeps chunk order; each chunk's bytes are appended and released as it arrives
+    for data, chunk_pages in _get_pool(workers).map(render, chunks):
+        writer.append(PdfReader(io.BytesIO(data)))
+        pages += chunk_pages
+    writer.write(pdf_file_name)
+    return pages
+
+def _write_spilled(chunks, render, pdf_file_name, spill_directory):
+    from pypdf import PdfReader, PdfWriter
+    logger.info(f"[Output] Rendering {len(chunks)} PDF chunks one at a time via {spill_directory}")
+    os.makedirs(spill_directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=spill_directory) as directory:
+        paths = []
+        pages = 0
+        for index, chunk in enumerate(chunks):
+            data, chunk_pages = render(chunk)
+            paths.append(os.path.join(directory, f"chunk_{index:05d}.pdf"))
+            with open(paths[-1], 'wb') as f:
+                f.write(data)
+            pages += chunk_pages
+            del data
+        writer = PdfWriter()
+        for path in paths:
+            writer.append(PdfReader(path))
+        writer.write(pdf_file_name)
+    return pages
+
+def create_pdf(final_transcription, original_file_path, output_directory=None, spill_directory=None):
+    config = config_manager.config
+    logger.info("[Output] Creating PDF document...")
 
     # Construct the PDF file name based on the original file name
-    output_dir = config['output_directory']
-    pdf_file_name = os.path.join(output_dir, os.path.splitext(os.path.basename(original_file_path))[0] + '_transcription.pdf')
-    
+    output_dir = output_directory or config['output_directory']
+    pdf_file_name = get_output_pdf_path(original_file_path, output_dir)
+
     # Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
-    # Save the PDF to a file
-    pdf.output(pdf_file_name)
+    # Written next to the target and renamed, so a PDF being replaced (e.g. by a refined transcript) is never partial
+    part_path = pdf_file_name + '.part'
+    try:
+        write_pdf(final_transcription, part_path, get_pdf_options(config), spill_directory)
+        os.replace(part_path, pdf_file_name)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
     logger.info(f"[Output] Transcription PDF saved as {pdf_file_name}")
     return pdf_file_name
 
+@functools.lru_cache(maxsize=4)
+def _find_custom_font(font_dir, dir_mtime_ns):
+    ttf_fonts = [f for f in os.listdir(font_dir) if f.lower().endswith('.ttf')]
+    if ttf_fonts:
+        # Sort the fonts alphabetically and choose the first one
+        chosen_font = sorted(ttf_fonts)[0]
+        font_path = os.path.join(font_dir, chosen_font)
+        font_name = os.path.splitext(chosen_font)[0]
+        return font_path, font_name
+    return None, None
+
 def check_custom_font():
     root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     font_dir = os.path.join(root_dir, 'Fonts')
-    
-    if os.path.exists(font_dir):
-        ttf_fonts = [f for f in os.listdir(font_dir) if f.lower().endswith('.ttf')]
-        if ttf_fonts:
-            # Sort the fonts alphabetically and choose the first one
-            chosen_font = sorted(ttf_fonts)[0]
-            font_path = os.path.join(font_dir, chosen_font)
-            font_name = os.path.splitext(chosen_font)[0]
-            return font_path, font_name
-    
-    return None, None
\ No newline at end of file
+
+    # The directory listing is cached until a font is added or removed
+    try:
+        return _find_custom_font(font_dir, os.stat(font_dir).st_mtime_ns)
+    except FileNotFoundError:
+        return None, None
@@ -0,0 +1,159 @@
+import os
+import sys
+import pstats
+import logging
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+def get_profiling_options(config):
+    options = {
+        'enabled': False,
+        'mode': 'sampling',
+        'interval_ms': 5,
+        'top_n': 30
+    }
+    options.update(config.get('profiling', {}))
+    return options
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StageProfiler:
+    """Profiles pipeline stages and writes the results into `output_dir`.
+
+    In `sampling` mode a background thread snapshots the stacks of threads currently
+    inside a stage every `interval_ms` and writes `<stage>.collapsed` files (one
+    `frame;frame;frame count` line per unique stack, ready for flamegraph.pl or
+    speedscope). In `cprofile` mode each stage runs under cProfile and a `<stage>.prof`
+    file is written; a stage that starts while another one is being profiled on
+    Python 3.12+, where only one cProfile can be active per process, is sampled
+    instead. Both modes write a `<stage>_top.txt` table of the top functions.
+    """
+
+    def __init__(self, output_dir, mode='sampling', interval_ms=5, top_n=30):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self.top_n = top_n
+        self._active = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def profile(self, stage):
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active cProfile per process, and stages run concurrently
+                logger.info(f"[Profiler] Another profiler is active, sampling stage '{stage}' instead")
+                profile = None
+            if profile is not None:
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                    self._write_cprofile(stage, profile)
+                return
+
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = stage
+            self._samples.setdefault(stage, Counter())
+            self._ensure_sampler()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active.pop(thread_id, None)
+                samples = self._samples.pop(stage) if stage not in self._active.values() else None
+            if samples is not None:
+                self._write_samples(stage, samples)
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name='stage-profiler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stage in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    self._samples[stage][';'.join(reversed(stack))] += 1
+
+    def close(self):
+        """Stop the sampling thread. Call once the job is finished."""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _path(self, name):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, name)
+
+    def _write_samples(self, stage, samples):
+        with open(self._path(f"{stage}.collapsed"), 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        total = sum(samples.values()) or 1
+        self_counts, inclusive_counts = Counter(), Counter()
+        for stack, count in samples.items():
+            frames = stack.split(';')
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                inclusive_counts[label] += count
+
+        lines = [f"Stage: {stage}", f"Samples: {total} (every {self.interval * 1000:.0f} ms)", "",
+                 f"{'self %':>8} {'total %':>8}  function"]
+        for label, count in self_counts.most_common(self.top_n):
+            lines.append(f"{100 * count / total:>7.1f}% {100 * inclusive_counts[label] / total:>7.1f}%  {label}")
+        with open(self._path(f"{stage}_top.txt"), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        logger.info(f"[Profiler] Wrote {total} samples for stage '{stage}' to {self.output_dir}")
+
+    def _write_cprofile(self, stage, profile):
+        profile.dump_stats(self._path(f"{stage}.prof"))
+        with open(self._path(f"{stage}_top.txt"), 'w') as f:
+            f.write(f"Stage: {stage}\n\n")
+            stats = pstats.Stats(profile, stream=f)
+            stats.sort_stats('cumulative').print_stats(self.top_n)
+            stats.sort_stats('tottime').print_stats(self.top_n)
+        logger.info(f"[Profiler] Wrote cProfile results for stage '{stage}' to {self.output_dir}")
+
+def create_profiler(config, output_dir, mode=None):
+    """Return a StageProfiler when profiling is requested (by `mode` or the config), otherwise None."""
+    options = get_profiling_options(config)
+    if mode is None and not options['enabled']:
+        return None
+    return StageProfiler(output_dir, mode or options['mode'], options['interval_ms'], options['top_n'])
+
+@contextmanager
+def profile(profiler, stage):
+    """`profiler.profile(stage)` that is a no-op when profiling is disabled (profiler is None)."""
+    if profiler is None:
+        yield
+    else:
+        with profiler.profile(stage):
+            yield
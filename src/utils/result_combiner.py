@@ -1,33 +1,42 @@
 import logging
-from . import simple_combiner
-from . import weighted_combiner
-from . import adaptive_combiner
-from . import adaptive_rule_combiner
-from . import semantic_combiner
-from . import semantic_combiner_adaptive
-from . import semantic_combiner_enhanced
+import importlib
 
 logger = logging.getLogger(__name__)
 
+# Combiner modules are imported on first use: the semantic ones pull in sentence-transformers and sklearn
+COMBINER_MODULES = {
+    'simple': 'simple_combiner',
+    'weighted': 'weighted_combiner',
+    'adaptive': 'adaptive_combiner',
+    'adaptive_rule': 'adaptive_rule_combiner',
+    'semantic': 'semantic_combiner',
+    'semantic_adaptive': 'semantic_combiner_adaptive',
+    'semantic_enhanced': 'semantic_combiner_enhanced',
+    'viterbi': 'viterbi_combiner'
+}
+
+def get_combiner(method):
+    if method not in COMBINER_MODULES:
+        raise ValueError(f"Unknown combination method: {method}")
+    return importlib.import_module(f".{COMBINER_MODULES[method]}", __package__)
+
 def combine_transcription_diarization(transcription, diarization, pipeline_model, method='semantic'):
     logger.info(f"Combining transcription and diarization results using {method} method...")
     try:
-        if method == 'simple':
-            return simple_combiner.combine(transcription, diarization)
-        elif method == 'weighted':
-            return weighted_combiner.combine(transcription, diarization)
-        elif method == 'adaptive':
-            return adaptive_combiner.combine(transcription, diarization)
-        elif method == 'adaptive_rule':
-            return adaptive_rule_combiner.combine(transcription, diarization)
-        elif method == 'semantic':
-            return semantic_combiner.combine(transcription, diarization)
-        elif method == 'semantic_adaptive':
-            return semantic_combiner_adaptive.combine(transcription, diarization)
-        elif method == 'semantic_enhanced':
-            return semantic_combiner_enhanced.combine(transcription, diarization)
-        else:
-            raise ValueError(f"Unknown combination method: {method}")
+        return get_combiner(method).combine(transcription, diarization)
     except Exception as e:
         logger.error(f"Error during combination of transcription and diarization: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def stream_transcription_diarization(transcription, diarization, method='simple'):
+    """Yield combined segments as they are produced.
+
+    Combiners that define `combine_stream` emit each segment as soon as it is assigned;
+    the others combine everything first and then yield the result. Either way the output
+    can be fed straight into `exporters.export_transcript`.
+    """
+    combiner = get_combiner(method)
+    if hasattr(combiner, 'combine_stream'):
+        yield from combiner.combine_stream(transcription, diarization)
+    else:
+        yield from combiner.combine(transcription, diarization)
@@ -0,0 +1,27 @@
+import numpy as np
+
+class RunningStats:
+    """Population mean and standard deviation of values added in batches (Chan et al. merge)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = float('nan')
+        self._m2 = 0.0
+
+    def add(self, values):
+        if len(values) == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        if self.count == 0:
+            self.count, self.mean, self._m2 = len(values), batch_mean, batch_m2
+            return
+        count = self.count + len(values)
+        delta = batch_mean - self.mean
+        self.mean += delta * len(values) / count
+        self._m2 += batch_m2 + delta ** 2 * self.count * len(values) / count
+        self.count = count
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / self.count) if self.count else float('nan')
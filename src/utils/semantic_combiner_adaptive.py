@@ -1,5 +1,5 @@
 import logging
-from sentence_transformers import SentenceTransformer
+from .sentence_embeddings import get_sentence_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
@@ -7,7 +7,7 @@ logger = logging.getLogger(__name__)
 
 class AdaptiveSemanticCombiner:
     def __init__(self, model_name='paraphrase-MiniLM-L3-v2', initial_similarity_threshold=0.7, initial_gap_threshold=1.0):
-        self.model = SentenceTransformer(model_name)
+        self.model = get_sentence_encoder(model_name)
         self.similarity_threshold = initial_similarity_threshold
         self.gap_threshold = initial_gap_threshold
         logger.info(f"Initialized AdaptiveSemanticCombiner with model: {model_name}")
@@ -1,13 +1,13 @@
 import logging
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from .sentence_embeddings import get_sentence_encoder
 from sklearn.metrics.pairwise import cosine_similarity
 
 logger = logging.getLogger(__name__)
 
 class ImprovedEnhancedSemanticCombiner:
     def __init__(self, model_name='all-MiniLM-L6-v2', similarity_threshold=0.2, gap_threshold=0.1, short_utterance_threshold=1):
-        self.model = SentenceTransformer(model_name)
+        self.model = get_sentence_encoder(model_name)
         self.similarity_threshold = similarity_threshold
         self.gap_threshold = gap_threshold
         self.short_utterance_threshold = short_utterance_threshold
@@ -0,0 +1,181 @@
+import os
+import json
+import inspect
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def get_sentence_embedding_options(config):
+    options = {
+        # 'torch' runs SentenceTransformer; 'onnx' runs an int8-quantized export with onnxruntime
+        'backend': 'torch',
+        # Exports are written here on first use, one directory per model
+        'onnx_directory': 'models/onnx',
+        # Keep the export in float32 instead of quantizing the weights to int8
+        'full_precision': False,
+        # onnxruntime intra-op threads; 0 lets onnxruntime decide
+        'threads': 0,
+        'batch_size': 32
+    }
+    options.update(config.get('sentence_embeddings', {}))
+    return options
+
+class TorchEncoder:
+    backend = 'torch'
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        return self.model.encode(list(texts), convert_to_numpy=True)
+
+def export_directory(model_name, options):
+    return os.path.join(options['onnx_directory'], model_name.replace('/', '_'))
+
+def export_onnx(model_name, directory, full_precision=False):
+    """Export a SentenceTransformer model to `directory` as ONNX, int8-quantized unless `full_precision`.
+
+    Writes `model.onnx` (the transformer, returning token embeddings), the fast
+    tokenizer's `tokenizer.json`, and `export.json` with what `OnnxEncoder` needs to
+    reproduce the pooling and normalization of the original model. Needs torch,
+    sentence-transformers and onnx once; running the export needs neither.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device='cpu')
+    transformer = model[0]
+    pooling_modes = [module.get_pooling_mode_str() for module in model if hasattr(module, 'get_pooling_mode_str')]
+    pooling = pooling_modes[0] if pooling_modes else 'mean'
+    if pooling not in ('mean', 'cls'):
+        raise ValueError(f"Unsupported pooling '{pooling}' for ONNX export of {model_name}")
+
+    os.makedirs(directory, exist_ok=True)
+    sample = model.tokenizer(["An example sentence"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+    fp32_path = os.path.join(directory, 'model_fp32.onnx')
+    model_path = os.path.join(directory, 'model.onnx')
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)))[0]
+
+    # Newer torch defaults to the dynamo exporter, which needs onnxscript; the TorchScript one handles BERT fine
+    legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(transformer.auto_model.eval()), tuple(sample[name] for name in input_names),
+                          fp32_path, input_names=input_names, output_names=['token_embeddings'],
+                          dynamic_axes=dynamic_axes, opset_version=14, **legacy)
+    if full_precision:
+        os.replace(fp32_path, model_path)
+    else:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        os.remove(fp32_path)
+
+    model.tokenizer.save_pretrained(directory)
+    with open(os.path.join(directory, 'export.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'model_name': model_name,
+            'inputs': input_names,
+            'max_seq_length': model.max_seq_length,
+            'pad_token': model.tokenizer.pad_token,
+            'pad_token_id': model.tokenizer.pad_token_id,
+            'pooling': pooling,
+            'normalize': any(type(module).__name__ == 'Normalize' for module in model),
+            'quantized': not full_precision
+        }, f, indent=2)
+    logger.info(f"[Embeddings] Exported {model_name} to {model_path} ({'float32' if full_precision else 'int8'})")
+
+class OnnxEncoder:
+    """SentenceTransformer-compatible `encode` on an ONNX export, without torch.
+
+    Tokenizes with the `tokenizers` library from the exported `tokenizer.json`, runs
+    the transformer with onnxruntime in length-sorted batches to keep padding low,
+    and applies the original model's pooling and normalization in NumPy.
+    """
+    backend = 'onnx'
+
+    def __init__(self, directory, threads=0, batch_size=32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(directory, 'export.json'), 'r', encoding='utf-8') as f:
+            self.export = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(self.export['max_seq_length'])
+        self.tokenizer.enable_padding(pad_id=self.export['pad_token_id'], pad_token=self.export['pad_token'])
+        session_options = onnxruntime.SessionOptions()
+        if threads:
+            session_options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(os.path.join(directory, 'model.onnx'), session_options,
+                                                    providers=['CPUExecutionProvider'])
+        self.batch_size = batch_size
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        token_embeddings = self.session.run(None, {name: feeds[name] for name in self.export['inputs']})[0]
+        if self.export['pooling'] == 'cls':
+            pooled = token_embeddings[:, 0]
+        else:
+            mask = feeds['attention_mask'][:, :, None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.export['normalize']:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        embeddings = None
+        for offset in range(0, len(texts), self.batch_size):
+            batch = order[offset:offset + self.batch_size]
+            pooled = self._encode_batch([texts[i] for i in batch])
+            if embeddings is None:
+                embeddings = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+            embeddings[batch] = pooled
+        return embeddings
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+def _load_encoder(model_name, options):
+    if options['backend'] != 'onnx':
+        return TorchEncoder(model_name)
+    directory = export_directory(model_name, options)
+    try:
+        if not os.path.exists(os.path.join(directory, 'export.json')):
+            logger.info(f"[Embeddings] No ONNX export of {model_name} in {directory}, exporting it now")
+            export_onnx(model_name, directory, options['full_precision'])
+        return OnnxEncoder(directory, options['threads'], options['batch_size'])
+    except ImportError as e:
+        logger.warning(f"[Embeddings] ONNX backend unavailable ({e.name} not installed), using PyTorch")
+        return TorchEncoder(model_name)
+
+def get_sentence_encoder(model_name, options=None):
+    """Shared encoder for `model_name` on the configured backend; loaded once per process."""
+    if options is None:
+        from .config_manager import get_config_manager
+        options = get_sentence_embedding_options(get_config_manager().config)
+    key = (options['backend'], model_name)
+    with _encoders_lock:
+        if key not in _encoders:
+            _encoders[key] = _load_encoder(model_name, options)
+            logger.info(f"[Embeddings] Loaded {model_name} on the {_encoders[key].backend} backend")
+        return _encoders[key]
@@ -7,9 +7,8 @@ def segment_score(transcript_segment, diarization_segment):
     overlap_ratio = overlap / (transcript_segment['end'] - transcript_segment['start'])
     return overlap_ratio
 
-def combine(transcription, diarization):
-    combined_results = []
-
+def combine_stream(transcription, diarization):
+    """Yield combined segments one by one, in transcription order."""
     for trans in transcription:
         max_score = 0
         best_dia = None
@@ -20,11 +19,12 @@ def combine(transcription, diarization):
                 best_dia = dia
 
         if best_dia:
-            combined_results.append({
+            yield {
                 'speaker': best_dia['speaker'],
                 'text': trans['text'],
                 'start': trans['start'],
                 'end': trans['end']
-            })
+            }
 
-    return combined_results
\ No newline at end of file
+def combine(transcription, diarization):
+    return list(combine_stream(transcription, diarization))
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from .atomic_io import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+# Process-lifetime aggregates exported as Prometheus counters
+_totals = {}
+
+def get_telemetry_options(config):
+    options = {
+        'enabled': False,
+        'jsonl_path': 'telemetry/stages.jsonl',
+        'prometheus_path': ''
+    }
+    options.update(config.get('telemetry', {}))
+    return options
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _gpu_available():
+    torch = sys.modules.get('torch')
+    return torch is not None and torch.cuda.is_available()
+
+def _gpu_allocated():
+    import torch
+    return torch.cuda.memory_allocated()
+
+class PeakRssSampler:
+    """Polls RSS in a background thread while a stage runs and keeps the maximum.
+
+    With `gpu` it also polls the CUDA memory allocated by this process into
+    `gpu_peak`. Polling leaves torch's process-wide peak counter alone, so nested and
+    concurrent stages don't reset each other's peaks.
+    """
+
+    def __init__(self, interval=0.05, gpu=False):
+        self.interval = interval
+        self.gpu = gpu
+        self.peak = current_rss()
+        self.gpu_peak = _gpu_allocated() if gpu else None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.peak is not None or self.gpu:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and self.peak is not None and rss > self.peak:
+            self.peak = rss
+        if self.gpu:
+            self.gpu_peak = max(self.gpu_peak, _gpu_allocated())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._sample()
+
+class TelemetryRecorder:
+    """Collects per-stage timing and memory records for one job.
+
+    Each record holds wall and process CPU time, the real-time factor against the audio
+    duration, peak RSS and peak GPU memory. Records are appended to a JSON-lines file as
+    they complete; `flush` rewrites the Prometheus text-format file.
+    """
+
+    def __init__(self, file_path, labels=None, jsonl_path=None, prometheus_path=None):
+        self.job_id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.labels = labels or {}
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.audio_duration = None
+        self.records = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage, audio_seconds=None, **extra):
+        """Time the enclosed block as `stage`. `audio_seconds` defaults to the job's audio duration."""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        gpu = _gpu_available()
+        if gpu:
+            import torch
+            gpu_max_start = torch.cuda.max_memory_allocated()
+        status = 'ok'
+        sampler = PeakRssSampler(gpu=gpu)
+        try:
+            with sampler:
+                yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            audio = audio_seconds if audio_seconds is not None else self.audio_duration
+            record = {
+                'job_id': self.job_id,
+                'file': self.file_path,
+                'stage': stage,
+                'status': status,
+                'timestamp': time.time(),
+                'wall_seconds': wall,
+                # Process-wide CPU time, so it includes stages running concurrently
+                'cpu_seconds': time.process_time() - cpu_start,
+                'audio_seconds': audio,
+                'rtf': wall / audio if audio else None,
+                'peak_rss_bytes': sampler.peak,
+                'peak_gpu_bytes': None
+            }
+            if gpu:
+                # A new process-wide maximum during the stage is a peak the polling may have missed
+                gpu_max_end = torch.cuda.max_memory_allocated()
+                record['peak_gpu_bytes'] = max(sampler.gpu_peak, gpu_max_end if gpu_max_end > gpu_max_start else 0)
+            record.update(self.labels)
+            record.update(extra)
+            self._add(record)
+
+    def add_record(self, stage, wall_seconds, audio_seconds=None, **extra):
+        """Record a unit of work timed by the caller, e.g. one transcription chunk of a streaming loop."""
+        record = {
+            'job_id': self.job_id,
+            'file': self.file_path,
+            'stage': stage,
+            'status': 'ok',
+            'timestamp': time.time(),
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': None,
+            'audio_seconds': audio_seconds,
+            'rtf': wall_seconds / audio_seconds if audio_seconds else None,
+            'peak_rss_bytes': current_rss(),
+            'peak_gpu_bytes': None
+        }
+        record.update(self.labels)
+        record.update(extra)
+        self._add(record)
+
+    def _add(self, record):
+        with self._lock:
+            self.records.append(record)
+        if self.jsonl_path:
+            self._append_jsonl(record)
+
+    def _append_jsonl(self, record):
+        directory = os.path.dirname(self.jsonl_path)
+        with _write_lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.jsonl_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        """Fold this job's records into the process totals and rewrite the Prometheus file."""
+        with _write_lock:
+            for record in self.records:
+                if record['status'] != 'ok':
+                    continue
+                totals = _totals.setdefault(record['stage'], {'runs': 0, 'wall': 0.0, 'cpu': 0.0, 'audio': 0.0})
+                totals['runs'] += 1
+                totals['wall'] += record['wall_seconds']
+                totals['cpu'] += record['cpu_seconds'] or 0.0
+                totals['audio'] += record['audio_seconds'] or 0.0
+                totals['last'] = record
+            if self.prometheus_path:
+                write_prometheus(self.prometheus_path, _totals)
+
+def _prometheus_labels(labels):
+    return ','.join(f'{k}="{str(v).replace(chr(34), "")}"' for k, v in labels.items())
+
+def write_prometheus(path, totals):
+    """Write stage metrics in the Prometheus text exposition format (textfile collector style)."""
+    metrics = [
+        ('meetnote_stage_runs_total', 'counter', 'Completed runs of each pipeline stage.', lambda t: t['runs']),
+        ('meetnote_stage_wall_seconds_total', 'counter', 'Wall time spent in each pipeline stage.', lambda t: t['wall']),
+        ('meetnote_stage_cpu_seconds_total', 'counter', 'Process CPU time spent in each pipeline stage.', lambda t: t['cpu']),
+        ('meetnote_stage_audio_seconds_total', 'counter', 'Audio seconds processed by each pipeline stage.', lambda t: t['audio']),
+        ('meetnote_stage_last_rtf', 'gauge', 'Real-time factor of the last run of each stage.', lambda t: t['last']['rtf']),
+        ('meetnote_stage_last_peak_rss_bytes', 'gauge', 'Peak RSS during the last run of each stage.', lambda t: t['last']['peak_rss_bytes']),
+        ('meetnote_stage_last_peak_gpu_bytes', 'gauge', 'Peak GPU memory during the last run of each stage.', lambda t: t['last']['peak_gpu_bytes'])
+    ]
+    lines = []
+    for name, metric_type, help_text, value in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for stage, stage_totals in sorted(totals.items()):
+            sample = value(stage_totals)
+            if sample is not None:
+                lines.append(f"{name}{{{_prometheus_labels({'stage': stage})}}} {sample}")
+
+    # Scrapers must never see a half-written file
+    atomic_write_text(path, '\n'.join(lines) + '\n')
+
+def create_recorder(config, file_path, labels=None):
+    """Return a TelemetryRecorder if telemetry is enabled in the config, otherwise None."""
+    options = get_telemetry_options(config)
+    if not options['enabled']:
+        return None
+    return TelemetryRecorder(file_path, labels, options['jsonl_path'] or None, options['prometheus_path'] or None)
+
+@contextmanager
+def measure(recorder, stage, **kwargs):
+    """`recorder.measure(...)` that is a no-op when telemetry is disabled (recorder is None)."""
+    if recorder is None:
+        yield
+    else:
+        with recorder.measure(stage, **kwargs):
+            yield
@@ -0,0 +1,104 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cost, in nats of log-affinity, of changing speaker between two back-to-back segments
+SWITCH_PENALTY = 0.6
+# The switch cost halves for every this many seconds of silence between segments
+GAP_HALF_LIFE = 1.5
+# Floor for affinities so a segment with no overlap for a speaker is unlikely, not impossible
+AFFINITY_FLOOR = 1e-3
+
+def speaker_intervals(diarization):
+    """Per speaker, the sorted and merged (starts, ends) of its turns."""
+    turns = {}
+    for dia in diarization:
+        turns.setdefault(dia['speaker'], []).append((dia['start'], dia['end']))
+    intervals = {}
+    for speaker, spans in turns.items():
+        spans = np.array(sorted(spans), dtype=np.float64)
+        # Merge overlapping turns of the same speaker so no time is counted twice
+        ends = np.maximum.accumulate(spans[:, 1])
+        new_run = np.concatenate(([True], spans[1:, 0] > ends[:-1]))
+        run = np.cumsum(new_run) - 1
+        starts = spans[new_run, 0]
+        merged_ends = np.zeros(len(starts))
+        np.maximum.at(merged_ends, run, ends)
+        intervals[speaker] = (starts, merged_ends)
+    return intervals
+
+def _speech_before(times, starts, ends):
+    """Seconds a speaker has talked before each of `times`, given its merged turns."""
+    durations = ends - starts
+    cumulative = np.concatenate(([0.0], np.cumsum(durations)))
+    index = np.searchsorted(starts, times, side='right') - 1
+    inside = np.clip(times - starts[np.maximum(index, 0)], 0, durations[np.maximum(index, 0)])
+    return np.where(index >= 0, cumulative[np.maximum(index, 0)] + inside, 0.0)
+
+def affinity_matrix(transcription, diarization):
+    """Return (speakers, T x S matrix of seconds each speaker talks during each transcript segment).
+
+    Each column is the difference of the speaker's cumulative speech time at the segment
+    end and start, so building the matrix is O((T + D) log D) instead of O(T x D).
+    """
+    starts = np.array([trans['start'] for trans in transcription], dtype=np.float64)
+    ends = np.array([trans['end'] for trans in transcription], dtype=np.float64)
+    intervals = speaker_intervals(diarization)
+    speakers = sorted(intervals)
+    overlap = np.zeros((len(transcription), len(speakers)))
+    for column, speaker in enumerate(speakers):
+        speaker_starts, speaker_ends = intervals[speaker]
+        overlap[:, column] = (_speech_before(ends, speaker_starts, speaker_ends) -
+                              _speech_before(starts, speaker_starts, speaker_ends))
+    return speakers, overlap
+
+def decode(overlap, gaps, switch_penalty=SWITCH_PENALTY, gap_half_life=GAP_HALF_LIFE):
+    """Most likely speaker index per segment (Viterbi).
+
+    Emissions are the log of each speaker's share of the segment's speech; a segment
+    nobody overlaps is uniform and takes its speaker from its neighbours. Switching
+    speaker between segments t-1 and t costs `switch_penalty`, reduced by the silence
+    `gaps[t]` before segment t. Because every switch costs the same whatever the two
+    speakers are, the best predecessor is either the same speaker or the overall best,
+    so each step is O(S) rather than O(S^2).
+    """
+    count, speaker_count = overlap.shape
+    totals = overlap.sum(axis=1, keepdims=True)
+    share = np.divide(overlap, totals, out=np.full_like(overlap, 1.0 / speaker_count), where=totals > 0)
+    emissions = np.log(np.maximum(share, AFFINITY_FLOOR))
+    penalties = switch_penalty * np.exp2(-np.maximum(gaps, 0) / gap_half_life)
+
+    backpointers = np.zeros((count, speaker_count), dtype=np.intp)
+    scores = emissions[0].copy()
+    states = np.arange(speaker_count)
+    for t in range(1, count):
+        best = int(np.argmax(scores))
+        switch = scores[best] - penalties[t]
+        stay = scores >= switch
+        backpointers[t] = np.where(stay, states, best)
+        scores = np.where(stay, scores, switch) + emissions[t]
+
+    path = np.zeros(count, dtype=np.intp)
+    path[-1] = int(np.argmax(scores))
+    for t in range(count - 1, 0, -1):
+        path[t - 1] = backpointers[t, path[t]]
+    return path
+
+def combine(transcription, diarization, switch_penalty=SWITCH_PENALTY, gap_half_life=GAP_HALF_LIFE):
+    if not transcription:
+        return []
+    speakers, overlap = affinity_matrix(transcription, diarization)
+    if not speakers:
+        return [{'speaker': 'Unknown', 'text': trans['text'], 'start': trans['start'], 'end': trans['end']}
+                for trans in transcription]
+
+    starts = np.array([trans['start'] for trans in transcription], dtype=np.float64)
+    ends = np.array([trans['end'] for trans in transcription], dtype=np.float64)
+    gaps = np.concatenate(([0.0], starts[1:] - ends[:-1]))
+    path = decode(overlap, gaps, switch_penalty, gap_half_life)
+
+    logger.info(f"Viterbi combination assigned {len(speakers)} speakers with "
+                f"{int(np.count_nonzero(np.diff(path)))} speaker changes")
+    return [{'speaker': speakers[index], 'text': trans['text'], 'start': trans['start'], 'end': trans['end']}
+            for trans, index in zip(transcription, path)]
@@ -7,7 +7,8 @@ from pyannote.audio import Pipeline
 from faster_whisper import WhisperModel
 from pydub import AudioSegment
 import torch
-from src.utils.config_manager import ConfigManager
+from src.utils.config_manager import get_config_manager
+from src.transcription.autotune import probe_capabilities
 
 def test_env_variables():
     load_dotenv()
@@ -26,8 +27,11 @@ def test_env_variables():
 
 def test_config():
     try:
-        config = ConfigManager().config
-        print("✅ Config file loaded successfully")
+        problems = get_config_manager().validate_file()
+        if problems:
+            print(f"❌ Config file has invalid values: {'; '.join(problems)}")
+        else:
+            print("✅ Config file loaded successfully")
     except Exception as e:
         print(f"❌ Error loading config file: {str(e)}")
 
@@ -78,6 +82,24 @@ def test_whisper_model():
     except Exception as e:
         print(f"❌ Error loading Whisper model: {str(e)}")
 
+def test_whisper_capabilities():
+    try:
+        capabilities = probe_capabilities()
+        print(f"✅ Whisper can run on {', '.join(capabilities['devices'])} ({capabilities['cores']} CPU cores)")
+        for device, compute_types in capabilities['devices'].items():
+            print(f"   {device}: {', '.join(compute_types)}")
+        config = get_config_manager().config
+        local_model_options = config['model_options']['local']
+        device = 'cuda' if (config['use_cuda'] and local_model_options['device'] != 'cpu'
+                            and 'cuda' in capabilities['devices']) else 'cpu'
+        if local_model_options['compute_type'] not in capabilities['devices'][device]:
+            print(f"❌ compute_type {local_model_options['compute_type']} is not supported on {device}; "
+                  f"run `python run_autotune.py <clip>` to pick settings for this machine")
+        else:
+            print(f"✅ compute_type {local_model_options['compute_type']} is supported on {device}")
+    except Exception as e:
+        print(f"❌ Error probing Whisper devices: {str(e)}")
+
 def test_cuda_support():
     if torch.cuda.is_available():
         device_count = torch.cuda.device_count()
@@ -97,5 +119,6 @@ if __name__ == "__main__":
     test_groq_connection()
     test_huggingface_connection()
     test_whisper_model()
+    test_whisper_capabilities()
     test_cuda_support()
     print("Setup tests completed.")
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+import sys
+import shutil
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+# The config manager reads Config/config.json relative to the working directory and creates it from the
+# template; run the tests in a scratch directory so they neither touch nor depend on the user's config
+_workdir = tempfile.mkdtemp(prefix='meetnote_tests_')
+os.makedirs(os.path.join(_workdir, 'Config'))
+shutil.copy(os.path.join(ROOT, 'Config', 'config.template.json'), os.path.join(_workdir, 'Config'))
+os.chdir(_workdir)
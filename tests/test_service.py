@@ -0,0 +1,151 @@
+import json
+import time
+import threading
+import http.client
+import pytest
+import pipeline.runner as runner
+import pipeline.service as service_module
+import audio.file_processor as file_processor
+from pipeline.service import JobService, DONE, create_server
+
+
+@pytest.fixture
+def config(monkeypatch):
+    config = runner.config_manager.config
+    for section, values in {
+        'memory_budget': {'enabled': True, 'budget_mb': 5000, 'model_reserve_mb': 4096, 'window_seconds': 1800.0},
+        'job_history': {'enabled': False},
+        'checkpointing': {'enabled': False},
+        'search_index': {'enabled': False},
+        'two_pass': {'enabled': False}
+    }.items():
+        monkeypatch.setitem(config, section, dict(config.get(section, {}), **values))
+    return config
+
+
+class FakeModels:
+    def get_pipeline(self, name):
+        return name
+
+    def clear(self):
+        pass
+
+
+def wait_for(service, job, timeout=10):
+    deadline = time.time() + timeout
+    while service.get(job.id).status not in ('done', 'failed', 'cancelled'):
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return service.get(job.id)
+
+
+def test_tight_budget_runs_service_job_windowed(config, monkeypatch, tmp_path):
+    recording = tmp_path / 'meeting.mp3'
+    recording.write_bytes(b'\0' * 1024)
+    # Three hours of 44.1 kHz stereo: the full-file diarization estimate alone exceeds the 5000 MB budget
+    monkeypatch.setattr(file_processor, 'probe_audio', lambda path: (3 * 3600.0, 44100, 2))
+    calls = {}
+
+    def windowed(pipeline, audio_path, num_speakers, window_seconds, **kwargs):
+        calls['diarize'] = window_seconds
+        return [{'start': 0.0, 'end': 1.0, 'speaker': 'SPEAKER_00'}], 'cpu'
+
+    def whole_file(*args, **kwargs):
+        raise AssertionError("the whole-file diarization ran despite the low-memory plan")
+
+    def groq(audio_path, progress=None, cancel_token=None, telemetry=None, checkpoint=None, streaming=False):
+        calls['streaming'] = streaming
+        return [{'start': 0.0, 'end': 1.0, 'text': 'hello'}]
+
+    monkeypatch.setattr(runner, 'process_file', lambda path: path)
+    monkeypatch.setattr(runner, 'get_audio_duration', lambda path: 3 * 3600.0)
+    monkeypatch.setattr(runner, 'diarize_audio_windowed', windowed)
+    monkeypatch.setattr(runner, 'diarize_audio', whole_file)
+    monkeypatch.setattr(runner, 'transcribe_audio_with_groq', groq)
+    monkeypatch.setattr(runner, 'combine_transcription_diarization', lambda t, d, model, method: t)
+    monkeypatch.setattr(runner, 'create_pdf', lambda *args, **kwargs: str(tmp_path / 'meeting.pdf'))
+    monkeypatch.setattr(runner, 'export_transcript', lambda *args, **kwargs: {})
+
+    monkeypatch.setattr(service_module, 'ModelCache', FakeModels)
+    service = JobService(engines=runner.ModelEngines(), schedule='fifo')
+    service.start()
+    try:
+        job = service.submit(str(recording), {'transcription_method': 'groq', 'output_directory': str(tmp_path)})
+        job = wait_for(service, job)
+    finally:
+        service.stop()
+
+    assert job.status == DONE, job.error
+    assert job.result['memory']['low_memory'] is True
+    assert calls == {'diarize': 1800.0, 'streaming': True}
+
+
+@pytest.fixture
+def api(tmp_path):
+    """A service on a free port whose runner only records the jobs it is given."""
+    ran = []
+
+    def job_runner(file_path, options, models, **kwargs):
+        ran.append((file_path, options))
+        return {'final_transcription': [], 'output_pdf': None, 'exports': {}, 'timings': {}}
+
+    service = JobService(job_runner=job_runner, schedule='fifo')
+    service.start()
+    server = create_server(service, port=0)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    recording = tmp_path / 'meeting.wav'
+    recording.write_bytes(b'\0' * 1024)
+
+    def post(payload):
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        connection.request('POST', '/jobs', body, {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        result = response.status, json.loads(response.read())
+        connection.close()
+        return result
+
+    yield post, str(recording), service, ran
+    server.shutdown()
+    server.server_close()
+    service.stop()
+
+
+def test_post_queues_valid_job(api):
+    post, recording, service, ran = api
+    status, job = post({'file_path': recording, 'priority': 2,
+                        'options': {'transcription_method': 'local', 'combine_method': 'simple', 'formats': ['srt']}})
+    assert status == 202
+    assert wait_for(service, service.get(job['id'])).status == DONE
+    assert ran[0][1]['transcription_method'] == 'local'
+    assert ran[0][1]['formats'] == ['srt']
+
+
+# Replaced by the path of an existing recording
+RECORDING = '<recording>'
+
+
+@pytest.mark.parametrize('payload, error', [
+    (b'not json', 'expected a JSON body'),
+    ([1, 2], 'expected a JSON body'),
+    ({'priority': 1}, 'expected a JSON body'),
+    ({'file_path': '/no/such/recording.wav'}, 'file not found'),
+    ({'file_path': RECORDING, 'priority': 'high'}, 'priority must be an integer'),
+    ({'file_path': RECORDING, 'deadline': 'next week'}, 'deadline must be'),
+    ({'file_path': RECORDING, 'options': ['local']}, 'options must be a JSON object'),
+    ({'file_path': RECORDING, 'options': {'transcription_method': 'whisper'}}, 'transcription_method must be one of'),
+    ({'file_path': RECORDING, 'options': {'model': 'large-v3'}}, 'unknown option(s): model'),
+    ({'file_path': RECORDING, 'options': {'num_speakers': 0}}, 'num_speakers must be a positive integer'),
+    ({'file_path': RECORDING, 'options': {'combine_method': 'best'}}, 'combine_method must be one of'),
+    ({'file_path': RECORDING, 'options': {'formats': 'srt,vtt'}}, 'formats must be a list'),
+    ({'file_path': RECORDING, 'options': {'formats': ['pdf']}}, 'formats must be a list'),
+])
+def test_post_rejects_invalid_jobs(api, payload, error):
+    post, recording, service, ran = api
+    if isinstance(payload, dict) and payload.get('file_path') == RECORDING:
+        payload = dict(payload, file_path=recording)
+    status, body = post(payload)
+    assert status == 400
+    assert error in body['error']
+    assert service.list_jobs() == []
+    assert ran == []